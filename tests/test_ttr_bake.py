@@ -0,0 +1,48 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Animation baking tests
+#  (c) 2020 Andrey Sokolov (so_records)
+
+import numpy as np
+from ttr_bake import ttr_decimate, ttr_bake_keys, ttr_sim_range
+
+def test_decimate_line():
+    '''A straight line needs only its ends'''
+    assert ttr_decimate(np.arange(10)*0.5, 1e-9).tolist() == [0, 9]
+    assert ttr_decimate([3.0, 4.0], 0.0).tolist() == [0, 1]
+
+def test_decimate_tolerance():
+    values = np.sin(np.arange(50)/5)
+    for tolerance in (0.0, 0.001, 0.1):
+        keep = ttr_decimate(values, tolerance)
+        assert keep[0] == 0 and keep[-1] == len(values)-1
+        curve = np.interp(np.arange(len(values)), keep, values[keep])
+        assert np.max(np.abs(curve-values)) <= tolerance+1e-12
+    assert len(ttr_decimate(values, 0.1)) < len(ttr_decimate(values, 0.001))
+
+def test_bake_keys():
+    x, y = ttr_bake_keys([0.0, 1.0, 2.0, 2.0], 10)
+    assert x.tolist() == [10.0, 12.0, 13.0]
+    assert y.tolist() == [0.0, 2.0, 2.0]
+
+def test_sim_range():
+    assert ttr_sim_range([]) == (0, 0, 0, 0)
+    assert ttr_sim_range([1.0, 1.5, 2.0]) == (1, 2, 0, 0)
+    assert ttr_sim_range([1.0, 3.5, 2.0, 2.5]) == (1, 4, 1, 1)
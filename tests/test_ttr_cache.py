@@ -0,0 +1,84 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Render and thumbnail caches tests
+#  (c) 2020 Andrey Sokolov (so_records)
+
+import os
+from ttr_cache import (TTR_LRU, TTR_RenderCache, ttr_cache_frame,
+                       ttr_prefetch_order)
+
+def test_lru_eviction():
+    freed = []
+    lru = TTR_LRU(10, freed.append)
+    lru.put("a", "A", 4)
+    lru.put("b", "B", 4)
+    assert lru.get("a") == "A"      # "b" is the least recently used now
+    lru.put("c", "C", 4)
+    assert freed == ["B"]
+    assert "b" not in lru and "a" in lru and "c" in lru
+    assert lru.size == 8
+    lru.clear()
+    assert not len(lru) and lru.size == 0
+    assert sorted(freed) == ["A", "B", "C"]
+
+def test_lru_keeps_one_item():
+    lru = TTR_LRU(1)
+    lru.put("big", 1, 100)
+    assert lru.get("big") == 1
+    assert lru.get("missing") is None
+
+def test_cache_frame():
+    assert ttr_cache_frame(1.23456789) == 1.234568
+    assert ttr_cache_frame(1.3, steps=4) == 1.25
+
+def test_render_cache(tmp_path):
+    cache = TTR_RenderCache(str(tmp_path / "cache"), 2**20, "state", ".png")
+    src = tmp_path / "render.png"
+    src.write_bytes(b"image")
+    key = cache.key(1.5, [(0.5, 8)])
+    assert key == cache.key(1.5000000001, [(0.5, 8)])
+    assert key != cache.key(1.5, [(0.5, 4)])
+    dst = str(tmp_path / "out" / "0001.png")
+    assert not cache.get(key, dst)
+    assert cache.put(key, str(src))
+    assert cache.get(key, dst)
+    # ----- overwriting the output doesn't change the cached image
+    with open(dst, 'wb') as f:
+        f.write(b"other")
+    assert open(cache.path(key), 'rb').read() == b"image"
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.clear() == 1
+
+def test_render_cache_evict(tmp_path):
+    cache = TTR_RenderCache(str(tmp_path), 10, "state", ".png")
+    src = tmp_path / "render.png"
+    src.write_bytes(b"123456")
+    first, second = cache.key(1.0), cache.key(2.0)
+    cache.put(first, str(src))
+    os.utime(cache.path(first), (0, 0))     # least recently used
+    cache.put(second, str(src))
+    assert not os.path.exists(cache.path(first))
+    assert os.path.exists(cache.path(second))
+
+def test_prefetch_order():
+    order = ttr_prefetch_order(5, 10)
+    assert order[:2] == [6, 4]
+    assert len(order) == len(set(order))
+    assert all(0 <= n < 10 and n != 5 for n in order)
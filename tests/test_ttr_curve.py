@@ -0,0 +1,47 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  FCurve copy tests
+#  (c) 2020 Andrey Sokolov (so_records)
+
+from ttr_curve import TTR_Curve
+
+def key(x, y, ipo, handle=1.0):
+    return (x, y), (x-handle, y), (x+handle, y), ipo
+
+def test_linear_and_constant():
+    curve = TTR_Curve([key(1, 0, 'LINEAR'), key(5, 8, 'CONSTANT'),
+                       key(9, 0, 'LINEAR')])
+    assert curve.evaluate(3) == 4
+    assert curve.evaluate(7) == 8
+    assert curve.evaluate(9) == 0
+
+def test_extrapolation():
+    keys = [key(1, 0, 'LINEAR'), key(3, 4, 'LINEAR')]
+    assert TTR_Curve(keys).evaluate(5) == 4
+    assert TTR_Curve(keys, 'LINEAR').evaluate(5) == 8
+    assert TTR_Curve(keys, 'LINEAR').evaluate(0) == -2
+
+def test_bezier():
+    '''Flat handles: ends are kept, the middle is halfway, monotonic'''
+    curve = TTR_Curve([key(0, 0, 'BEZIER'), key(10, 10, 'BEZIER')])
+    assert abs(curve.evaluate(5)-5) < 1e-9
+    values = [curve.evaluate(x/4) for x in range(41)]
+    assert values[0] == 0 and abs(values[-1]-10) < 1e-9
+    assert values == sorted(values)
@@ -0,0 +1,54 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Render cost estimation tests
+#  (c) 2020 Andrey Sokolov (so_records)
+
+import numpy as np
+from ttr_estimate import (ttr_budget_samples, ttr_budget_scenes,
+                          ttr_table_stats)
+from ttr_table import TTR_Table, TTR_TableScene
+
+def test_budget_total_and_bounds():
+    weights = [1, 2, 3, 4, 100]
+    samples = ttr_budget_samples(weights, 40, low=2, high=16)
+    assert samples.sum() == 40
+    assert samples.min() >= 2 and samples.max() <= 16
+    assert list(samples) == sorted(samples)     # follows the weights
+
+def test_budget_clamped_total():
+    assert ttr_budget_samples([1, 1], 1000, 1, 8).tolist() == [8, 8]
+    assert ttr_budget_samples([1, 1], 0, 1, 8).tolist() == [1, 1]
+    assert not len(ttr_budget_samples([], 10))
+
+def test_budget_scenes_share_total():
+    '''Scenes split one total by their weights, not get one each'''
+    main, other = ttr_budget_scenes([[4, 4, 4], [2, 2, 2, 2, 2, 2]], 48, 1, 64)
+    assert main.sum() + other.sum() == 48
+    assert main.tolist() == [8, 8, 8] and other.tolist() == [4]*6
+    assert [len(s) for s in ttr_budget_scenes([[], []], 10)] == [0, 0]
+
+def test_table_stats():
+    table = TTR_Table([1.0, 1.0, 1.5],
+                      [TTR_TableScene("Main", [0.5]*3, [4, 8, 2])])
+    stats = ttr_table_stats(table)
+    assert stats["outputs"] == 3 and stats["unique"] == 2
+    assert stats["mb_samples"] == 14
+    assert stats["scenes"]["Main"]["max_index"] == 1
+    assert np.isclose(stats["scenes"]["Main"]["max_shutter"], 0.5)
@@ -0,0 +1,53 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Render farm helpers tests
+#  (c) 2020 Andrey Sokolov (so_records)
+
+from ttr_farm import (ttr_parse_indices, ttr_format_indices, ttr_chunks,
+                      ttr_progress)
+
+def test_indices():
+    assert ttr_parse_indices("0-3, 7,,9-9") == [0, 1, 2, 3, 7, 9]
+    assert ttr_format_indices([7, 0, 1, 2, 3, 9]) == "0-3,7,9"
+    assert ttr_parse_indices(ttr_format_indices(range(5))) == list(range(5))
+
+def test_chunks():
+    costs = [1, 1, 1, 1, 4, 4]
+    chunks = ttr_chunks(costs, 3)
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(costs)-1
+    assert all(b[0] == a[1]+1 for a, b in zip(chunks, chunks[1:]))
+    assert max(sum(costs[a:b+1]) for a, b in chunks) == 4
+    assert ttr_chunks([], 3) == []
+    assert ttr_chunks([1, 2], 5) == [(0, 0), (1, 1)]
+
+def test_chunks_count():
+    '''Exactly `count` chunks even when fewer fit the minimax capacity'''
+    for size, count in ((100, 30), (10, 6), (7, 7)):
+        chunks = ttr_chunks([1]*size, count)
+        assert len(chunks) == count
+        assert chunks[0][0] == 0 and chunks[-1][1] == size-1
+        assert all(b[0] == a[1]+1 for a, b in zip(chunks, chunks[1:]))
+        assert max(b-a+1 for a, b in chunks) == -(-size//count)
+
+def test_progress():
+    progress = ttr_progress([3, 0, 1, 1], 4, skip_start=10)
+    assert progress["count"] == 3 and not progress["complete"]
+    assert progress["indices"] == "0-1,3"
+    assert progress["outputs"] == "11-12,14"
@@ -0,0 +1,44 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Speed integration tests
+#  (c) 2020 Andrey Sokolov (so_records)
+
+import math
+from ttr_integrate import TTR_Sum, TTR_Integrator
+
+def test_compensated_sum():
+    plain, compensated = TTR_Sum(compensate=False), TTR_Sum()
+    for _ in range(100000):
+        plain.add(0.1)
+        compensated.add(0.1)
+    assert abs(compensated.value-10000.0) < 1e-9
+    assert abs(compensated.value-10000.0) < abs(plain.value-10000.0)
+
+def test_integral():
+    integrator = TTR_Integrator(math.sin, tolerance=1e-9)
+    total = sum(integrator.integral(n, n+1) for n in range(10))
+    assert abs(total-(1-math.cos(10))) < 1e-7
+
+def test_integral_reuses_frame_end():
+    integrator = TTR_Integrator(lambda x: 2*x)
+    integrator.integral(0, 1)
+    count = integrator.evaluations
+    assert abs(integrator.integral(1, 2)-3.0) < 1e-12
+    assert integrator.evaluations-count < count
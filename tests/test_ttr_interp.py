@@ -0,0 +1,61 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Frame interpolation tests
+#  (c) 2020 Andrey Sokolov (so_records)
+
+import numpy as np
+from ttr_interp import ttr_interp_keys, ttr_interpolate, ttr_interp_error
+
+def test_keys_stride():
+    frames = np.arange(10)*0.25
+    assert ttr_interp_keys(frames, 4) == [0, 4, 8, 9]
+    assert ttr_interp_keys([], 4) == []
+
+def test_keys_direction_change():
+    '''Frames between keys go one way'''
+    frames = [1.0, 1.2, 1.4, 1.2, 1.0]
+    assert ttr_interp_keys(frames, 4) == [0, 2, 4]
+
+def test_interpolate_static():
+    image = np.random.default_rng(1).random((4, 5, 4)).astype(np.float32)
+    vectors = np.zeros((4, 5, 4), dtype=np.float32)
+    result, error = ttr_interpolate(image, vectors, 1.0,
+                                    image, vectors, 2.0, 1.5)
+    assert error == 0.0
+    assert np.allclose(result, image)
+
+def test_interpolate_motion():
+    '''A column moving one pixel per frame is found halfway between'''
+    a = np.zeros((1, 8, 4), dtype=np.float32)
+    b = np.zeros((1, 8, 4), dtype=np.float32)
+    a[0, 2], b[0, 4] = 1, 1
+    vectors = np.zeros((1, 8, 4), dtype=np.float32)
+    vectors[..., 0] = vectors[..., 2] = 1
+    result, error = ttr_interpolate(a, vectors, 0.0, b, vectors, 2.0, 1.0)
+    assert error == 0.0
+    assert np.argmax(result[0, :, 0]) == 3
+
+def test_error_is_local():
+    '''A failed tile is found even if the image mean is small'''
+    diff = np.zeros((64, 70), dtype=np.float32)
+    diff[16:32, 32:48] = 0.5
+    assert np.isclose(ttr_interp_error(diff), 0.5)
+    assert diff.mean() < 0.05
+    assert ttr_interp_error(np.zeros((3, 5))) == 0.0
@@ -0,0 +1,41 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Render order tests
+#  (c) 2020 Andrey Sokolov (so_records)
+
+from ttr_order import ttr_render_order
+
+frames = [3.0, 1.0, 2.0, 5.0, 4.0]
+
+def test_output():
+    assert ttr_render_order(frames) == [0, 1, 2, 3, 4]
+
+def test_source():
+    assert ttr_render_order(frames, 'SOURCE') == [1, 2, 0, 4, 3]
+
+def test_minimal():
+    '''Sweep to the nearer end first, then to the other one'''
+    assert ttr_render_order(frames, 'MINIMAL', 2.0) == [1, 2, 0, 4, 3]
+    assert ttr_render_order(frames, 'MINIMAL', 4.0) == [4, 3, 0, 2, 1]
+
+def test_progressive():
+    queue = ttr_render_order(list(range(20)), 'PROGRESSIVE')
+    assert sorted(queue) == list(range(20))
+    assert queue[:2] == [0, 16]
@@ -0,0 +1,50 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Shared remap table tests
+#  (c) 2020 Andrey Sokolov (so_records)
+
+import numpy as np, pytest
+from ttr_shared import TTR_SharedTable, ttr_attach, ttr_shared_name
+from ttr_table import TTR_Table, TTR_TableScene
+
+def test_file_round_trip():
+    table = TTR_Table([1.0, 1.5, 2.0],
+                      [TTR_TableScene("Main", [0.5]*3, [4, 8, 2])],
+                      skip_start=3, fingerprint="shared_test")
+    with TTR_SharedTable(table, use_file=True) as shared:
+        attached = ttr_attach(shared.address)
+        assert attached.shared is not None
+        assert np.array_equal(attached.frames, table.frames)
+        assert attached.scene("Main").samples.tolist() == [4, 8, 2]
+        assert attached.skip_start == 3
+        assert not attached.frames.flags.writeable
+    assert not shared.path
+
+def test_names_are_per_job():
+    '''Another job publishing the same table never replaces this one'''
+    assert ttr_shared_name("abc") != ttr_shared_name("abc")
+    assert len(ttr_shared_name("f"*64)) <= 30
+    table = TTR_Table([1.0], [], fingerprint="same")
+    with TTR_SharedTable(table, use_file=True) as first:
+        with TTR_SharedTable(table, use_file=True) as second:
+            assert first.address != second.address
+        with pytest.raises(FileExistsError):
+            TTR_SharedTable(table, name=first.name, use_file=True)
+        assert ttr_attach(first.address).frames.tolist() == [1.0]
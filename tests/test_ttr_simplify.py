@@ -0,0 +1,38 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Adaptive Simplify tests
+#  (c) 2020 Andrey Sokolov (so_records)
+
+from ttr_simplify import TTR_Simplify
+
+def test_level_follows_frame_time():
+    simplify = TTR_Simplify(fps=25, patience=2)
+    assert simplify.settings() is None
+    slow = [simplify.frame(0.1) for _ in range(2)]
+    assert slow == [False, True] and simplify.level == 1
+    assert not simplify.frame(0.1)      # the first frame after a change
+    fast = [simplify.frame(0.001) for _ in range(2)]
+    assert fast == [False, True] and simplify.level == 0
+
+def test_level_bounds():
+    simplify = TTR_Simplify(fps=25, patience=1)
+    for _ in range(20):
+        simplify.frame(1.0)
+    assert simplify.level == len(simplify.levels)-1
@@ -0,0 +1,65 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Lazy frames tests
+#  (c) 2020 Andrey Sokolov (so_records)
+
+import math, numpy as np, pytest
+from ttr_sparse import TTR_Stream, TTR_Sparse
+
+def test_stream_index():
+    st = TTR_Stream(lambda n: n*10, 5)
+    assert len(st) == 5
+    assert st[0] == 0 and st[4] == 40 and st[-1] == 40
+    assert st[1:3] == [10, 20]
+    assert list(st) == [0, 10, 20, 30, 40]
+    with pytest.raises(IndexError):
+        st[5]
+
+def test_stream_pop():
+    '''Popped items are gone: indices are relative to the first left'''
+    st = TTR_Stream(lambda n: n*10, 5)
+    assert st.pop(0) == 0
+    assert st.pop() == 10
+    assert len(st) == 3
+    assert st[0] == 20 and st[-1] == 40
+    assert list(st) == [20, 30, 40]
+    with pytest.raises(IndexError):
+        st.pop(1)
+    for _ in range(3):
+        st.pop()
+    with pytest.raises(IndexError):
+        st.pop()
+
+def test_sparse_frames():
+    '''Frames are the start plus the steps of the previous frames'''
+    step = lambda frame: 0.5+0.4*math.sin(frame/7)
+    start = 1
+    sparse = TTR_Sparse(step, start, 40)
+    assert len(sparse)
+    frames = start + np.concatenate(([0.0], np.cumsum(
+                        [step(start+n) for n in range(len(sparse)-1)])))
+    assert np.allclose([sparse.frame(n) for n in range(len(sparse))],
+                       frames, atol=1e-6)
+    assert frames[-1]-start <= 40.01
+
+def test_sparse_stream():
+    sparse = TTR_Sparse(lambda frame: 1.0, 1, 10)
+    st = sparse.stream(sparse.frame, first=2, last=5)
+    assert [round(f, 6) for f in st] == [3.0, 4.0, 5.0]
@@ -0,0 +1,62 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Scene state applier and telemetry tests
+#  (c) 2020 Andrey Sokolov (so_records)
+
+from types import SimpleNamespace
+from ttr_state import TTR_State
+from ttr_telemetry import TTR_Telemetry
+
+def scene():
+    return SimpleNamespace(render=SimpleNamespace(motion_blur_shutter=0.5))
+
+def test_changed():
+    state = TTR_State()
+    assert state.changed("Scene", "frame", 1.5)
+    assert not state.changed("Scene", "frame", 1.5)
+    assert state.changed("Other", "frame", 1.5)
+    assert state.changed("Scene", "frame", 2.0)
+
+def test_set_writes_changed_values_only():
+    sc = scene()
+    state = TTR_State()
+    assert state.set("Scene", sc, "render.motion_blur_shutter", 0.25)
+    assert sc.render.motion_blur_shutter == 0.25
+    sc.render.motion_blur_shutter = 1.0     # changed outside of the state
+    assert not state.set("Scene", sc, "render.motion_blur_shutter", 0.25)
+    assert sc.render.motion_blur_shutter == 1.0
+
+def test_reset():
+    sc = scene()
+    state = TTR_State()
+    state.set("Scene", sc, "render.motion_blur_shutter", 0.25)
+    sc.render.motion_blur_shutter = 1.0
+    state.reset()
+    assert state.set("Scene", sc, "render.motion_blur_shutter", 0.25)
+    assert sc.render.motion_blur_shutter == 0.25
+
+def test_telemetry_counts():
+    telemetry = TTR_Telemetry()
+    state = TTR_State(telemetry)
+    for value in (1, 1, 2, 2, 2):
+        state.changed("Scene", "frame", value)
+    assert (telemetry.writes, telemetry.skipped) == (2, 3)
+    telemetry.reset()
+    assert (telemetry.writes, telemetry.skipped) == (0, 0)
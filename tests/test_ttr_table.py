@@ -0,0 +1,118 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Remap table tests
+#  (c) 2020 Andrey Sokolov (so_records)
+
+import numpy as np, pytest
+from ttr_table import (TTR_Table, TTR_TableScene, TTR_Prefix, TTR_ReverseIndex,
+                       TableError)
+
+def table():
+    frames = [1.0, 1.25, 1.5, 2.0, 1.5, 1.0]
+    scenes = [TTR_TableScene("Main", [0.5, 0.4, 0.3, 0.2, 0.3, 0.5],
+                             [8, 6, 4, 2, 4, 8]),
+              TTR_TableScene("Other")]
+    return TTR_Table(frames, scenes, skip_start=10, fingerprint="abc")
+
+def same(a, b):
+    assert len(a) == len(b)
+    assert a.skip_start == b.skip_start
+    assert a.fingerprint == b.fingerprint
+    assert np.array_equal(a.frames, b.frames)
+    assert [sc.name for sc in a.scenes] == [sc.name for sc in b.scenes]
+    for sa, sb in zip(a.scenes, b.scenes):
+        assert np.array_equal(sa.shutter, sb.shutter)
+        assert np.array_equal(sa.samples, sb.samples)
+
+def test_bytes_round_trip():
+    tb = table()
+    same(tb, TTR_Table.from_bytes(tb.to_bytes()))
+
+def test_bytes_views_are_read_only():
+    tb = TTR_Table.from_bytes(table().to_bytes(), copy=False)
+    same(tb, table())
+    with pytest.raises(ValueError):
+        tb.frames[0] = 0.0
+
+def test_bytes_errors():
+    with pytest.raises(TableError):
+        TTR_Table.from_bytes(b"short")
+    data = bytearray(table().to_bytes())
+    data[:4] = b"XXXX"
+    with pytest.raises(TableError):
+        TTR_Table.from_bytes(bytes(data))
+
+@pytest.mark.parametrize("ext", [".csv", ".json", ".npz"])
+def test_save_load(tmp_path, ext):
+    tb = table()
+    path = str(tmp_path / f"table{ext}")
+    tb.save(path)
+    loaded = TTR_Table.load(path)
+    assert np.allclose(loaded.frames, tb.frames)
+    assert loaded.skip_start == tb.skip_start
+    assert loaded.fingerprint == tb.fingerprint
+    main = loaded.scene("Main")
+    assert np.allclose(main.shutter, tb.scene("Main").shutter)
+    assert np.array_equal(main.samples, tb.scene("Main").samples)
+
+def test_save_unknown_format(tmp_path):
+    with pytest.raises(TableError):
+        table().save(str(tmp_path / "table.txt"))
+
+def test_check():
+    tb = table()
+    tb.check(6, 10, ["Main"])
+    with pytest.raises(TableError):
+        tb.check(7, 10, ["Main"])
+    with pytest.raises(TableError):
+        tb.check(6, 0, ["Main"])
+    with pytest.raises(TableError):
+        tb.check(6, 10, ["Other"])
+
+def test_outputs_and_rows():
+    tb = table()
+    assert tb.outputs().tolist() == [11, 12, 13, 14, 15, 16]
+    rows = list(tb.rows())
+    assert rows[0] == (0, 11, 1.0, {"Main" : (0.5, 8)})
+
+def test_prefix_fractional_keyframe():
+    '''The iteration whose frame holds a fractional keyframe is recomputed'''
+    keys = [((1.0, 1.0),), ((10.5, 2.0),), ((15.0, 1.0),)]
+    prefix = TTR_Prefix("base", keys, np.arange(1.0, 22.0),
+                        np.arange(2.0, 23.0)/2, np.arange(21.0), {})
+    edited = keys[:2] + [((15.0, 3.0),)]
+    assert prefix.resume_index(edited, 1, 100) == 9
+    assert prefix.resume_index(keys, 1, 100) == 20
+    assert prefix.resume_index(keys, 1, 5.0) == 6
+
+def test_reverse_outputs():
+    index = TTR_ReverseIndex([1.0, 1.25, 1.5, 2.0, 1.5, 1.0])
+    assert index.outputs(1.5, radius=0.1).tolist() == [2, 4]
+    assert index.range(1.0, 1.5).tolist() == [0, 1, 5]
+    assert not len(index.outputs(5.0))
+
+def test_reverse_step():
+    index = TTR_ReverseIndex([1.0, 1.25, 1.5, 2.0, 1.5, 1.0])
+    assert index.step(0, 1.0, radius=0.1) == 5
+    assert index.step(5, 1.0, radius=0.1) == 0              # wraps around
+    assert index.step(5, 1.0, radius=0.1, forward=False) == 0
+    assert index.step(0, 1.0, radius=0.1, forward=False) == 5
+    assert index.step(3, 2.0, radius=0.1) == 3              # the only one
+    assert index.step(0, 7.0) is None
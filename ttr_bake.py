@@ -0,0 +1,68 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Baked keyframes decimation and simulation ranges. Doesn't depend on bpy
+#  (c) 2020 Andrey Sokolov (so_records)
+
+import numpy as np
+
+def ttr_decimate(values, tolerance):
+    '''
+    Indices of the values to keep as linear keyframes (one per frame), so
+    the curve between them differs from all the values by <= tolerance
+    (Ramer-Douglas-Peucker with the error measured along the value axis)
+    '''
+    y = np.asarray(values, dtype=np.float64)
+    if len(y) < 3:
+        return np.arange(len(y))
+    keep = np.zeros(len(y), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(y)-1)]
+    while stack:
+        a, b = stack.pop()
+        if b-a < 2:
+            continue
+        x = np.arange(1, b-a)
+        error = np.abs(y[a+1:b] - (y[a] + (y[b]-y[a])*x/(b-a)))
+        m = int(np.argmax(error))
+        if error[m] > tolerance:
+            keep[a+1+m] = True
+            stack.append((a, a+1+m))
+            stack.append((a+1+m, b))
+    return np.flatnonzero(keep)
+
+def ttr_bake_keys(values, start, tolerance=0.0):
+    '''Keyframes (frames, values) of per frame values from the start frame'''
+    values = np.asarray(values, dtype=np.float64)
+    keep = ttr_decimate(values, tolerance)
+    return (start+keep).astype(np.float64), values[keep]
+
+def ttr_sim_range(frames):
+    '''
+    Frames range simulation caches need for subframes in render order and
+    the number of steps going backward or jumping over more than a frame.
+    Unbaked simulations are reset and re-simulated on each of those steps.
+    Returns (first, last, backward, jumps)
+    '''
+    f = np.asarray(frames, dtype=np.float64)
+    if not len(f):
+        return 0, 0, 0, 0
+    steps = np.diff(f)
+    return (int(np.floor(f.min())), int(np.ceil(f.max())),
+            int(np.sum(steps < 0)), int(np.sum(steps > 1)))
@@ -0,0 +1,105 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Benchmark of Speed mode integration. Runs without Blender:
+#  python ttr_bench.py [--frames N]
+#  (c) 2020 Andrey Sokolov (so_records)
+
+import argparse, math, time
+try: from .ttr_integrate import TTR_Sum, TTR_Integrator
+except ImportError: from ttr_integrate import TTR_Sum, TTR_Integrator
+
+#------------------------------- Speed Curves ----------------------------------
+# (name, speed in percents at frame x, its analytic antiderivative)
+
+# fast ramp up and down every 50 frames, continuous (and smooth) between periods
+
+def _ramps(x):
+    r = x % 50
+    return 100+450*(math.tanh(2*(r-12.5))-math.tanh(2*(r-37.5)))
+
+def _log_cosh(u):
+    return abs(u)+math.log1p(math.exp(-2*abs(u)))-math.log(2)
+
+def _ramps_period(r):
+    '''Integral of the ramps part over [0, r] of a period'''
+    return 450*(_log_cosh(2*(r-12.5))-_log_cosh(-25)
+                -_log_cosh(2*(r-37.5))+_log_cosh(-75))/2
+
+def _ramps_integral(x):
+    periods, r = divmod(x, 50)
+    return 100*x + periods*_ramps_period(50) + _ramps_period(r)
+
+ttr_curves = [
+    ("flat", lambda x: 100.0, lambda x: 100*x),
+    ("smooth", lambda x: 100+50*math.sin(2*math.pi*x/1000),
+        lambda x: 100*x-50*1000/(2*math.pi)*math.cos(2*math.pi*x/1000)),
+    ("fast ramps", _ramps, _ramps_integral),
+    ("3 frames wobble", lambda x: 100+90*math.sin(2*math.pi*x/3),
+        lambda x: 100*x-90*3/(2*math.pi)*math.cos(2*math.pi*x/3)),
+]
+
+#---------------------------------- Methods ------------------------------------
+
+def ttr_positions_sample(speed, start, frames, compensate=False):
+    '''Speed sampled once per timeline frame (Frame Samples)'''
+    position = TTR_Sum(float(start), compensate)
+    result = []
+    for n in range(frames):
+        result.append(position.value)
+        position.add(speed(start+n)/100)
+    return result, frames, 0.0
+
+def ttr_positions_adaptive(speed, start, frames, tolerance):
+    '''Speed integrated over each timeline frame (Adaptive)'''
+    integrator = TTR_Integrator(lambda x: speed(x)/100, tolerance)
+    position = TTR_Sum(float(start))
+    result = []
+    for n in range(frames):
+        result.append(position.value)
+        position.add(integrator.integral(start+n, start+n+1))
+    return result, integrator.evaluations, integrator.error
+
+def ttr_bench(frames, tolerances=(1e-4, 1e-6, 1e-8), start=1):
+    methods = [("samples", lambda s: ttr_positions_sample(s, start, frames)),
+               ("samples+compensated",
+                    lambda s: ttr_positions_sample(s, start, frames, True))]
+    for tol in tolerances:
+        methods.append((f"adaptive tol={tol:g}",
+            lambda s, tol=tol: ttr_positions_adaptive(s, start, frames, tol)))
+    print(f"TTR. Speed integration benchmark, {frames} timeline frames")
+    print(f"{'curve':<16}{'method':<24}{'time, s':>9}{'evals/fr':>10}"
+          f"{'max error':>12}{'end error':>12}{'est. error':>12}")
+    for name, speed, integral in ttr_curves:
+        exact = [start+(integral(start+n)-integral(start))/100
+                 for n in range(frames)]
+        for method, run in methods:
+            t1 = time.perf_counter()
+            positions, evaluations, estimate = run(speed)
+            t2 = time.perf_counter()
+            errors = [abs(p-e) for p, e in zip(positions, exact)]
+            print(f"{name:<16}{method:<24}{t2-t1:>9.3f}"
+                  f"{evaluations/frames:>10.2f}{max(errors):>12.3e}"
+                  f"{errors[-1]:>12.3e}{estimate:>12.3e}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=
+                                    "TTR Speed mode integration benchmark")
+    parser.add_argument("--frames", type=int, default=100000)
+    ttr_bench(parser.parse_args().frames)
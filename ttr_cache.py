@@ -0,0 +1,183 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Render and thumbnail caches. Doesn't depend on bpy
+#  (c) 2020 Andrey Sokolov (so_records)
+
+import os, shutil, hashlib
+from collections import OrderedDict
+
+TTR_CACHE_PREFIX = "ttr_"   # cache files names start with it
+TTR_CACHE_DECIMALS = 6      # subframes equal to this precision are the same
+
+def ttr_cache_frame(frame, steps=0):
+    '''Subframe quantized to 1/steps of a frame (or to the precision)'''
+    if steps:
+        return round(round(frame*steps)/steps, TTR_CACHE_DECIMALS)
+    return round(frame, TTR_CACHE_DECIMALS)
+
+class TTR_RenderCache():
+    '''
+    Rendered images by source subframe, Motion Blur settings and scene state.
+    Least recently used files are evicted above the size limit.
+    Hits are copied into place: a hard link would let an overwritten
+    output change the cached image too
+    '''
+
+    def __init__(self, directory, limit, state, extension, steps=0):
+        self.directory = directory  # cache folder
+        self.limit = limit          # max cache size in bytes
+        self.state = state          # scene state fingerprint
+        self.extension = extension  # image file extension
+        self.steps = steps          # subframe quantization, 0 for exact
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, frame, mb=()):
+        '''Cache key of the subframe rendered with Motion Blur settings'''
+        mb = [(shutter and round(shutter, TTR_CACHE_DECIMALS), samples)
+              for shutter, samples in mb]
+        data = repr((self.state, ttr_cache_frame(frame, self.steps), mb))
+        return hashlib.sha1(data.encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory,
+                            f"{TTR_CACHE_PREFIX}{key}{self.extension}")
+
+    def _place(self, src, dst):
+        os.makedirs(os.path.dirname(dst) or os.curdir, exist_ok=True)
+        if os.path.lexists(dst):
+            os.unlink(dst)
+        shutil.copy2(src, dst)
+
+    def get(self, key, dst):
+        '''Put cached image to `dst`. Returns False on a miss'''
+        src = self.path(key)
+        if not os.path.isfile(src):
+            self.misses += 1
+            return False
+        self._place(src, dst)
+        os.utime(src)   # most recently used
+        self.hits += 1
+        return True
+
+    def put(self, key, src):
+        '''Store rendered image (a copy, outputs can be overwritten later)'''
+        if not os.path.isfile(src):
+            return False
+        os.makedirs(self.directory, exist_ok=True)
+        dst = self.path(key)
+        tmp = dst + ".tmp"
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+        self.evict()
+        return True
+
+    def entries(self):
+        '''Cache files as (mtime, size, path), least recently used first'''
+        if not os.path.isdir(self.directory):
+            return []
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.startswith(TTR_CACHE_PREFIX):
+                st = entry.stat()
+                files.append((st.st_mtime, st.st_size, entry.path))
+        return sorted(files)
+
+    def evict(self):
+        '''Remove least recently used files above the size limit'''
+        files = self.entries()
+        size = sum(f[1] for f in files)
+        for mtime, fsize, path in files:
+            if size <= self.limit:
+                break
+            try: os.unlink(path)
+            except OSError: continue
+            size -= fsize
+
+    def clear(self):
+        '''Remove all the cache files. Returns their number'''
+        files = self.entries()
+        for mtime, fsize, path in files:
+            os.unlink(path)
+        return len(files)
+
+    def report(self):
+        total = self.hits+self.misses
+        if not total:
+            return ""
+        return f"Render cache: {self.hits} of {total} frames reused"
+
+#------------------------------- Memory Cache ----------------------------------
+
+class TTR_LRU():
+    '''
+    Memory bounded cache of values with known sizes. Least recently used
+    values are evicted above the limit and passed to `free`
+    '''
+
+    def __init__(self, limit, free=None):
+        self.limit = limit          # max total size
+        self.free = free            # function releasing an evicted value
+        self.items = OrderedDict()  # key: (value, size), most recent last
+        self.size = 0
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, key):
+        item = self.items.get(key)
+        if item is None:
+            return None
+        self.items.move_to_end(key)
+        return item[0]
+
+    def put(self, key, value, size):
+        if key in self.items:
+            self._remove(key)
+        self.items[key] = (value, size)
+        self.size += size
+        while self.size > self.limit and len(self.items) > 1:
+            self._remove(next(iter(self.items)))
+
+    def _remove(self, key):
+        value, size = self.items.pop(key)
+        self.size -= size
+        if self.free:
+            self.free(value)
+
+    def clear(self):
+        while self.items:
+            self._remove(next(iter(self.items)))
+
+def ttr_prefetch_order(index, length, steps=(1, 10, 50), radius=4):
+    '''
+    Output indices around the index to prefetch, nearest first for each
+    scroll step size
+    '''
+    order = []
+    for k in range(1, radius+1):
+        for step in steps:
+            for n in (index+k*step, index-k*step):
+                if 0 <= n < length and n not in order:
+                    order.append(n)
+    return order
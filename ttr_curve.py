@@ -0,0 +1,120 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  FCurve snapshot evaluation. Doesn't depend on bpy
+#  (c) 2020 Andrey Sokolov (so_records)
+
+import bisect
+
+TTR_INTERPOLATIONS = {'CONSTANT', 'LINEAR', 'BEZIER'}
+TTR_EXTRAPOLATIONS = {'CONSTANT', 'LINEAR'}
+
+class TTR_Curve():
+    '''
+    Plain copy of an FCurve keyframes evaluated the way Blender does,
+    so it can be used outside of the main thread.
+    Keys are (co, handle_left, handle_right, interpolation)
+    '''
+
+    def __init__(self, keys, extrapolation='CONSTANT', info=None):
+        self.keys = [(tuple(co), tuple(hl), tuple(hr), ipo)
+                     for co, hl, hr, ipo in keys]
+        self.extrapolation = extrapolation  # enum in TTR_EXTRAPOLATIONS
+        self.info = info                    # FCurve info it is copied from
+        self.x = [key[0][0] for key in self.keys]   # keyframes frames
+        self.y = [key[0][1] for key in self.keys]   # keyframes values
+        self.segments = [self._bezier(n) for n in range(len(self.keys)-1)]
+
+    @classmethod
+    def from_fcurve(cls, fc, info=None):
+        '''Snapshot of the FCurve or None if it can't be evaluated here'''
+        if (not fc or not len(fc.keyframe_points) or
+                any(not m.mute for m in fc.modifiers) or
+                fc.extrapolation not in TTR_EXTRAPOLATIONS):
+            return None
+        keys = [(kp.co[:], kp.handle_left[:], kp.handle_right[:],
+                 kp.interpolation) for kp in fc.keyframe_points]
+        if any(key[3] not in TTR_INTERPOLATIONS for key in keys):
+            return None
+        return cls(keys, fc.extrapolation, info)
+
+    def _bezier(self, n):
+        '''Segment control points, handles clamped to keep x(t) monotonic'''
+        (x1, y1), _, (x2, y2) = self.keys[n][:3]
+        (x4, y4), (x3, y3), _ = self.keys[n+1][:3]
+        h1x, h1y, h2x, h2y = x1-x2, y1-y2, x4-x3, y4-y3
+        length, len1, len2 = x4-x1, abs(h1x), abs(h2x)
+        if len1+len2 > length and len1+len2:
+            fac = length/(len1+len2)
+            x2, y2 = x1-fac*h1x, y1-fac*h1y
+            x3, y3 = x4-fac*h2x, y4-fac*h2y
+        return (x1, x2, x3, x4), (y1, y2, y3, y4)
+
+    def _extrapolate(self, frame, n, neighbour, handle):
+        '''Value beyond the key `n` using the neighbour key or the handle'''
+        y = self.y[n]
+        ipo = self.keys[n][3]
+        if (self.extrapolation != 'LINEAR' or ipo == 'CONSTANT'
+                                            or len(self.keys) == 1):
+            return y
+        x = self.x[n]
+        if ipo != 'BEZIER':
+            dx, dy = self.x[neighbour]-x, self.y[neighbour]-y
+        else:
+            hx, hy = self.keys[n][handle]
+            dx, dy = hx-x, hy-y
+        return y + dy/dx*(frame-x) if dx else y
+
+    def evaluate(self, frame):
+        '''Value at the frame'''
+        x = self.x
+        if frame <= x[0]:
+            return self._extrapolate(frame, 0, 1, 1)
+        if frame >= x[-1]:
+            return self._extrapolate(frame, len(x)-1, len(x)-2, 2)
+        n = bisect.bisect_right(x, frame)-1
+        ipo = self.keys[n][3]
+        if frame == x[n] or ipo == 'CONSTANT':
+            return self.y[n]
+        if ipo == 'LINEAR':
+            return self.y[n] + (self.y[n+1]-self.y[n])*(
+                                            (frame-x[n])/(x[n+1]-x[n]))
+        (x1, x2, x3, x4), (y1, y2, y3, y4) = self.segments[n]
+        t = self._solve(frame, x1, x2, x3, x4)
+        s = 1-t
+        return s*s*s*y1 + 3*s*s*t*y2 + 3*s*t*t*y3 + t*t*t*y4
+
+    def _solve(self, frame, x1, x2, x3, x4):
+        '''Bezier parameter t where x(t) == frame (x(t) is monotonic)'''
+        low, high = 0.0, 1.0
+        t = (frame-x1)/(x4-x1)
+        for _ in range(64):
+            s = 1-t
+            x = s*s*s*x1 + 3*s*s*t*x2 + 3*s*t*t*x3 + t*t*t*x4 - frame
+            if abs(x) < 1e-10:
+                break
+            if x > 0:
+                high = t
+            else:
+                low = t
+            dx = 3*(s*s*(x2-x1) + 2*s*t*(x3-x2) + t*t*(x4-x3))
+            t = t-x/dx if dx else -1
+            if not low < t < high:
+                t = (low+high)/2
+        return t
@@ -0,0 +1,146 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Render cost estimation. Doesn't depend on bpy
+#  (c) 2020 Andrey Sokolov (so_records)
+
+import datetime, numpy as np
+
+TTR_DECIMALS = 6    # subframes equal to this precision render the same
+
+def ttr_table_stats(table, decimals=TTR_DECIMALS):
+    '''Output frames, unique subframes and Motion Blur samples of the table'''
+    stats = {
+        "outputs" : len(table),
+        "unique" : len(np.unique(np.round(table.frames, decimals))),
+        "mb_samples" : 0,
+        "scenes" : {},
+    }
+    for sc in table.scenes:
+        if not len(table) or len(sc.samples) != len(table):
+            continue
+        index = int(np.argmax(sc.samples))
+        stats["scenes"][sc.name] = {
+            "samples" : int(sc.samples.sum()),
+            "max" : int(sc.samples[index]),
+            "max_index" : index,
+            "max_shutter" : float(sc.shutter.max()),
+        }
+        stats["mb_samples"] += int(sc.samples.sum())
+    return stats
+
+def ttr_calibration_indices(costs, count):
+    '''Representative output indices: frames at evenly spaced cost quantiles'''
+    if not count or not len(costs):
+        return []
+    order = np.argsort(costs, kind='stable')
+    picks = np.round(np.linspace(0, len(costs)-1, min(count, len(costs))))
+    return sorted(set(order[picks.astype(int)].tolist()))
+
+def ttr_fit(costs, indices, seconds, scale=1.0):
+    '''
+    Fit time = overhead + rate * cost on the calibration frames rendered
+    with `scale` of the full pixels count. Returns (overhead, rate)
+    '''
+    x = np.asarray(costs, dtype=np.float64)[list(indices)]*scale
+    y = np.asarray(seconds, dtype=np.float64)
+    rate, overhead = 0.0, 0.0
+    if len(x) > 1 and np.ptp(x) > 0:
+        rate, overhead = np.polyfit(x, y, 1)
+    if rate <= 0 or overhead < 0:
+        rate, overhead = (y.sum()/x.sum() if x.sum() else 0.0), 0.0
+        if not rate:
+            overhead = y.mean()
+    return float(overhead), float(rate)
+
+def ttr_extrapolate(costs, indices, seconds, scale=1.0):
+    '''Projected render seconds of all the frames'''
+    overhead, rate = ttr_fit(costs, indices, seconds, scale)
+    return float(np.sum(overhead + rate*np.asarray(costs, dtype=np.float64)))
+
+def ttr_estimate(table, costs, indices=(), seconds=(), scale=1.0):
+    '''Table stats, total cost and projected wall time if calibrated'''
+    estimate = ttr_table_stats(table)
+    estimate["cost"] = float(np.sum(costs))
+    estimate["calibration"] = [{"index" : int(n), "seconds" : float(s)}
+                               for n, s in zip(indices, seconds)]
+    estimate["projected"] = None
+    estimate["rate"] = 0.0
+    if len(seconds):
+        estimate["projected"] = ttr_extrapolate(costs, indices, seconds, scale)
+        estimate["rate"] = ttr_fit(costs, indices, seconds, scale)[1]
+    return estimate
+
+#------------------------------ Samples Budget ---------------------------------
+
+def ttr_budget_samples(weights, total, low=1, high=64):
+    '''
+    Distribute `total` Motion Blur samples over frames proportionally to
+    their weights within [low, high] per frame (water-filling).
+    Returns integer samples summing to the clamped total
+    '''
+    w = np.maximum(np.asarray(weights, dtype=np.float64), 1e-9)
+    if not len(w):
+        return np.zeros(0, dtype=np.int64)
+    low, high = min(low, high), max(low, high)
+    total = float(np.clip(total, low*len(w), high*len(w)))
+    lam_low, lam_high = 0.0, high/w.min()
+    for _ in range(100):
+        lam = (lam_low+lam_high)/2
+        if np.clip(lam*w, low, high).sum() < total:
+            lam_low = lam
+        else:
+            lam_high = lam
+    samples = np.clip(lam_high*w, low, high)
+    # ---------------- round keeping the total: largest remainders first ------
+    base = np.floor(samples)
+    extra = int(round(total-base.sum()))
+    order = np.argsort(base-samples, kind='stable')
+    order = order[base[order] < high][:max(0, extra)]
+    base[order] += 1
+    return base.astype(np.int64)
+
+def ttr_budget_scenes(weights, total, low=1, high=64):
+    '''
+    Share one `total` between scenes: frames of all the scenes are filled
+    together, so each scene gets the part its weights list is worth.
+    Returns samples list for each weights list
+    '''
+    sizes = [len(w) for w in weights]
+    if not sum(sizes):
+        return [np.zeros(0, dtype=np.int64) for _ in sizes]
+    samples = ttr_budget_samples(np.concatenate([np.asarray(w, dtype=
+                                np.float64) for w in weights]), total, low, high)
+    return np.split(samples, np.cumsum(sizes)[:-1])
+
+def ttr_estimate_report(estimate):
+    '''Estimate as short text lines'''
+    lines = [f'{estimate["outputs"]} output frames,'
+             f' {estimate["unique"]} unique subframes']
+    if estimate["scenes"]:
+        lines.append(f'{estimate["mb_samples"]} Motion Blur samples')
+        for name, sc in estimate["scenes"].items():
+            lines.append(f'{name}: {sc["samples"]} MB samples, max {sc["max"]}'
+                         f' at output frame index {sc["max_index"]},'
+                         f' max shutter {sc["max_shutter"]:.2f}')
+    if estimate["projected"] is not None:
+        time = str(datetime.timedelta(seconds=round(estimate["projected"])))
+        lines.append(f'Projected render time: {time}'
+                     f' ({len(estimate["calibration"])} calibration frames)')
+    return lines
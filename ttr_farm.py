@@ -0,0 +1,229 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Render farm job manifest. Doesn't depend on bpy
+#  (c) 2020 Andrey Sokolov (so_records)
+
+import json, os, shlex, subprocess, time, numpy as np
+from concurrent.futures import ThreadPoolExecutor
+try: from .ttr_table import TTR_Table
+except ImportError: from ttr_table import TTR_Table
+
+TTR_MANIFEST_VERSION = 1
+
+#---------------------------------- Indices ------------------------------------
+
+def ttr_parse_indices(text):
+    '''"0-3,7" -> [0, 1, 2, 3, 7]'''
+    indices = []
+    for part in text.replace(' ', '').split(','):
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        indices.extend(range(int(first), int(last or first)+1))
+    return indices
+
+def ttr_format_indices(indices):
+    '''[0, 1, 2, 3, 7] -> "0-3,7"'''
+    parts = []
+    for n in sorted(indices):
+        if parts and parts[-1][1] == n-1:
+            parts[-1][1] = n
+        else:
+            parts.append([n, n])
+    return ','.join(str(a) if a == b else f'{a}-{b}' for a, b in parts)
+
+#----------------------------------- Chunks ------------------------------------
+
+def ttr_frame_costs(table, samples=1, pixels=1):
+    '''
+    Estimated render cost of each output frame:
+    render samples * pixels * Motion Blur samples of all the scenes
+    '''
+    costs = np.full(len(table), float(samples*pixels))
+    mb = [sc.samples for sc in table.scenes if len(sc.samples) == len(table)]
+    if mb:
+        costs *= np.maximum(np.sum(mb, axis=0), 1)
+    return costs
+
+def ttr_chunks(costs, count):
+    '''
+    Split frames into `count` contiguous chunks (at most one per frame)
+    minimizing the most expensive chunk. Returns list of (first, last)
+    indices
+    '''
+    costs = np.asarray(costs, dtype=np.float64)
+    if not len(costs):
+        return []
+    count = max(1, min(count, len(costs)))
+    cumsum = np.cumsum(costs)
+
+    def split(capacity):
+        bounds, first, base = [], 0, 0.0
+        while first < len(costs):
+            last = int(np.searchsorted(cumsum, base+capacity, side='right'))-1
+            last = max(last, first)
+            bounds.append((first, last))
+            base = cumsum[last]
+            first = last+1
+        return bounds
+
+    low, high = costs.max(), cumsum[-1]
+    for _ in range(64):
+        if high-low <= high*1e-9:
+            break
+        mid = (low+high)/2
+        if len(split(mid)) <= count:
+            high = mid
+        else:
+            low = mid
+    chunks = split(high)
+    cost = lambda first, last: cumsum[last]-cumsum[first]+costs[first]
+    # fewer chunks fit the capacity: halve the most expensive ones
+    while len(chunks) < count:
+        n = max((n for n, (first, last) in enumerate(chunks) if last > first),
+                key=lambda n: cost(*chunks[n]))
+        first, last = chunks[n]
+        half = cumsum[last]-cost(first, last)/2
+        mid = int(np.searchsorted(cumsum, half, side='left'))
+        mid = min(max(mid, first), last-1)
+        chunks[n:n+1] = [(first, mid), (mid+1, last)]
+    return chunks
+
+#---------------------------------- Manifest -----------------------------------
+
+def ttr_command(blend, indices, table_path=None, blender="blender",
+                                                                shared=None):
+    '''
+    Self-contained background Blender command rendering output indices.
+    `shared` is the address of a table published with TTR_SharedTable
+    '''
+    args = f"indices={json.dumps(ttr_format_indices(indices))}"
+    if table_path:
+        args += f", table={json.dumps(table_path)}"
+    if shared:
+        args += f", shared={json.dumps(shared)}"
+    return [blender, "-b", blend, "--python-expr",
+            f"import bpy; bpy.ops.ttr.render_batch({args})"]
+
+def ttr_manifest(table, count, blend, samples=1, pixels=1,
+                            table_path=None, blender="blender", shared=None):
+    '''Job manifest of `count` render tasks balanced by estimated cost'''
+    costs = ttr_frame_costs(table, samples, pixels)
+    outputs = table.outputs()
+    tasks = []
+    for n, (first, last) in enumerate(ttr_chunks(costs, count)):
+        command = ttr_command(blend, range(first, last+1), table_path,
+                              blender, shared)
+        tasks.append({
+            "id" : n,
+            "indices" : [first, last],
+            "outputs" : [int(outputs[first]), int(outputs[last])],
+            "frames" : last-first+1,
+            "cost" : float(costs[first:last+1].sum()),
+            "command" : command,
+            "command_line" : ' '.join(shlex.quote(arg) for arg in command),
+        })
+    return {
+        "version" : TTR_MANIFEST_VERSION,
+        "blend" : blend,
+        "table" : table_path,
+        "fingerprint" : table.fingerprint,
+        "frames" : len(table),
+        "cost" : float(costs.sum()),
+        "tasks" : tasks,
+    }
+
+def ttr_manifest_save(manifest, filepath):
+    with open(filepath, 'w') as f:
+        json.dump(manifest, f, indent=1)
+
+def ttr_manifest_load(filepath):
+    with open(filepath) as f:
+        return json.load(f)
+
+#------------------------------ Render Progress --------------------------------
+
+def ttr_progress(done, total, skip_start=0, order="OUTPUT"):
+    '''Progress manifest of a render: which output indices are done'''
+    done = sorted(set(done))
+    return {
+        "version" : TTR_MANIFEST_VERSION,
+        "order" : order,
+        "total" : total,
+        "count" : len(done),
+        "complete" : len(done) >= total,
+        "indices" : ttr_format_indices(done),
+        "outputs" : ttr_format_indices(n+skip_start+1 for n in done),
+    }
+
+def ttr_progress_save(filepath, *args, **kwargs):
+    '''Write progress manifest atomically, so readers never get a partial one'''
+    tmp = filepath + ".tmp"
+    ttr_manifest_save(ttr_progress(*args, **kwargs), tmp)
+    os.replace(tmp, filepath)
+
+#------------------------------- Local Scheduler -------------------------------
+
+def ttr_run_local(manifest, workers=1, runner=None):
+    '''
+    Stand-in scheduler: run manifest tasks in parallel local processes.
+    `runner(command)` returns exit code, subprocess by default.
+    Returns {task id: (exit code, seconds)}
+    '''
+    if runner is None:
+        runner = lambda command: subprocess.run(command).returncode
+
+    def run(task):
+        t1 = time.perf_counter()
+        code = runner(task["command"])
+        return task["id"], (code, time.perf_counter()-t1)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return dict(pool.map(run, manifest["tasks"]))
+
+#--------------------------- For test purposes only ----------------------------
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="TTR render farm manifest")
+    parser.add_argument("table", help="exported remap table .csv/.json/.npz")
+    parser.add_argument("blend", help=".blend file to render")
+    parser.add_argument("-n", "--chunks", type=int, default=4)
+    parser.add_argument("-o", "--output", default="ttr_manifest.json")
+    parser.add_argument("--blender", default="blender")
+    parser.add_argument("--run", type=int, default=0,
+                                    help="run tasks locally in N processes")
+    parser.add_argument("--shared", action="store_true",
+                    help="publish the table once in shared memory for --run")
+    args = parser.parse_args()
+    table = TTR_Table.load(args.table)
+    shared = None
+    if args.shared and args.run:
+        from ttr_shared import TTR_SharedTable
+        shared = TTR_SharedTable(table)
+    manifest = ttr_manifest(table, args.chunks, args.blend,
+            table_path=args.table, blender=args.blender,
+            shared=shared and shared.address)
+    ttr_manifest_save(manifest, args.output)
+    try:
+        if args.run:
+            print(ttr_run_local(manifest, args.run))
+    finally:
+        if shared:
+            shared.close()
@@ -0,0 +1,93 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Speed curve integration. Doesn't depend on bpy
+#  (c) 2020 Andrey Sokolov (so_records)
+
+TTR_TOLERANCE = 1e-6    # default max integration error per frame (frames)
+TTR_MAX_DEPTH = 12      # max sub-frame refinement levels (1/4096 frame)
+
+class TTR_Sum():
+    '''
+    Running sum. Compensated (Neumaier) if `compensate`,
+    so rounding errors don't drift over hundreds of thousands of frames
+    '''
+
+    def __init__(self, value=0.0, compensate=True):
+        self.sum = value                # running sum
+        self.error = 0.0                # lost low-order bits
+        self.compensate = compensate    # use compensated summation
+
+    @property
+    def value(self):
+        return self.sum+self.error
+
+    def add(self, x):
+        '''Add x and return the new sum'''
+        if not self.compensate:
+            self.sum += x
+            return self.sum
+        total = self.sum+x
+        if abs(self.sum) >= abs(x):
+            self.error += (self.sum-total)+x
+        else:
+            self.error += (x-total)+self.sum
+        self.sum = total
+        return self.sum+self.error
+
+class TTR_Integrator():
+    '''
+    Adaptive Simpson integration of f(x) over consecutive frames.
+    Refines sub-frame sampling only where the curve changes quickly.
+    Reuses the frame end value as the next frame start value
+    '''
+
+    def __init__(self, f, tolerance=TTR_TOLERANCE, max_depth=TTR_MAX_DEPTH):
+        self.f = f                      # function to integrate
+        self.tolerance = tolerance      # max error per integrated interval
+        self.max_depth = max_depth      # max refinement levels
+        self.evaluations = 0            # number of f evaluations
+        self.error = 0.0                # estimated accumulated error
+        self._last = None               # (x, f(x)) of the last interval end
+
+    def _f(self, x):
+        self.evaluations += 1
+        return self.f(x)
+
+    def _simpson(self, a, fa, b, fb, fm, whole, tol, depth):
+        m = (a+b)/2
+        lm, rm = (a+m)/2, (m+b)/2
+        flm, frm = self._f(lm), self._f(rm)
+        left = (m-a)/6*(fa+4*flm+fm)
+        right = (b-m)/6*(fm+4*frm+fb)
+        delta = left+right-whole
+        if depth >= self.max_depth or abs(delta) <= 15*tol:
+            self.error += abs(delta)/15
+            return left+right+delta/15
+        return (self._simpson(a, fa, m, fm, flm, left, tol/2, depth+1) +
+                self._simpson(m, fm, b, fb, frm, right, tol/2, depth+1))
+
+    def integral(self, a, b):
+        '''Integral of f from a to b'''
+        fa = (self._last[1] if self._last and self._last[0] == a
+                            else self._f(a))
+        fb, fm = self._f(b), self._f((a+b)/2)
+        self._last = (b, fb)
+        whole = (b-a)/6*(fa+4*fm+fb)
+        return self._simpson(a, fa, b, fb, fm, whole, self.tolerance, 0)
@@ -0,0 +1,103 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Motion vectors frame interpolation. Doesn't depend on bpy
+#  (c) 2020 Andrey Sokolov (so_records)
+
+import numpy as np
+
+TTR_INTERP_SPAN = 1.0   # max source frames between two key frames
+TTR_INTERP_TILE = 16    # pixels: the error is the worst tile mean difference
+
+def _interpolable(frames, a, b, span):
+    '''Frames between a and b go one way within the span of source time'''
+    if abs(frames[b]-frames[a]) > span:
+        return False
+    steps = np.diff(frames[a:b+1])
+    return bool(np.all(steps >= 0) or np.all(steps <= 0))
+
+def ttr_interp_keys(frames, stride, span=TTR_INTERP_SPAN):
+    '''
+    Positions of the frames to render. Frames between two consecutive
+    key positions are interpolated from them
+    '''
+    frames = np.asarray(frames, dtype=np.float64)
+    keys = [0] if len(frames) else []
+    a = 0
+    while a < len(frames)-1:
+        b = min(a+max(1, stride), len(frames)-1)
+        while b > a+1 and not _interpolable(frames, a, b, span):
+            b -= 1
+        keys.append(b)
+        a = b
+    return keys
+
+#----------------------------------- Warping -----------------------------------
+# Images are (height, width, channels) arrays with rows from the bottom, as
+# Blender stores them. Vector pass XY is the motion from the previous frame,
+# ZW is the motion to the next frame, in pixels per frame
+
+def ttr_sample(image, x, y):
+    '''Bilinear sample of the image at pixel coordinates, clamped at edges'''
+    h, w = image.shape[:2]
+    x = np.clip(x, 0, w-1)
+    y = np.clip(y, 0, h-1)
+    x0 = np.floor(x).astype(np.int64)
+    y0 = np.floor(y).astype(np.int64)
+    x1 = np.minimum(x0+1, w-1)
+    y1 = np.minimum(y0+1, h-1)
+    fx = (x-x0)[..., None]
+    fy = (y-y0)[..., None]
+    bottom = image[y0, x0]*(1-fx) + image[y0, x1]*fx
+    top = image[y1, x0]*(1-fx) + image[y1, x1]*fx
+    return bottom*(1-fy) + top*fy
+
+def ttr_warp(image, vectors, dt):
+    '''Image moved by its motion vectors `dt` frames forward or backward'''
+    h, w = image.shape[:2]
+    y, x = np.mgrid[0:h, 0:w].astype(np.float32)
+    motion = (vectors[..., 2:4] if dt >= 0 else vectors[..., 0:2])*dt
+    return ttr_sample(image, x-motion[..., 0], y-motion[..., 1])
+
+def ttr_interp_error(diff, tile=TTR_INTERP_TILE):
+    '''
+    Largest mean of the per pixel difference over tile x tile blocks:
+    a small failed area isn't averaged away by the rest of the image
+    '''
+    h, w = diff.shape
+    rows, cols = np.arange(0, h, tile), np.arange(0, w, tile)
+    sums = np.add.reduceat(np.add.reduceat(diff, rows, axis=0), cols, axis=1)
+    counts = np.outer(np.diff(np.append(rows, h)), np.diff(np.append(cols, w)))
+    return float(np.max(sums/counts))
+
+def ttr_interpolate(a, vectors_a, frame_a, b, vectors_b, frame_b, frame):
+    '''
+    In-between image at the source `frame` from two rendered frames and
+    their Vector passes. Returns (image, error): error is the color
+    difference of the two warped images in their worst tile, high where
+    warping fails (occlusions, lighting changes, non-linear motion)
+    '''
+    if frame_a == frame_b:
+        return a.copy(), 0.0
+    t = (frame-frame_a)/(frame_b-frame_a)
+    warp_a = ttr_warp(a, vectors_a, frame-frame_a)
+    warp_b = ttr_warp(b, vectors_b, frame-frame_b)
+    error = ttr_interp_error(np.mean(np.abs(warp_a[..., :3]-warp_b[..., :3]),
+                                     axis=2))
+    return (1-t)*warp_a + t*warp_b, error
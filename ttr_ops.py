@@ -20,11 +20,20 @@
 #  Time remapping add-on Blender Operators
 #  (c) 2020 Andrey Sokolov (so_records)
 
-import bpy
+import bpy, os, threading, time
 from bpy.types import Operator
-from bpy.props import BoolProperty, StringProperty
+from bpy.props import BoolProperty, FloatProperty, IntProperty, StringProperty
 from .ttr_support import *
-from .ttr_setup import TTR_Setup, ttr_store
+from .ttr_setup import TTR_Setup, ttr_store, ttr_table_store
+from .ttr_table import TTR_Table, TableError
+from .ttr_farm import (ttr_manifest, ttr_manifest_save, ttr_parse_indices,
+                                        ttr_format_indices, ttr_frame_costs)
+from .ttr_estimate import (ttr_calibration_indices, ttr_estimate,
+                                                        ttr_estimate_report)
+from .ttr_cache import TTR_RenderCache
+from .ttr_shared import ttr_attach
+
+ttr_tick = .01 # deferred setup timer interval
 
 class TTR_Warning(Operator):
     '''Warning!'''
@@ -49,13 +58,155 @@ class TTR_Warning(Operator):
         context.window_manager.modal_handler_add(self)
         return {'RUNNING_MODAL'}
 
+#------------------------------- Deferred Setup --------------------------------
+
+class TTR_SetupWorker(threading.Thread):
+    '''Runs snapshotted setup frames computation off the main thread'''
+    
+    def __init__(self, job):
+        super().__init__(name="TTR setup", daemon=True)
+        self.job = job                      # frames computation generator
+        self.cancelled = threading.Event()  # set when a newer job starts
+        self.progress = 0.0                 # computation progress (0-1)
+        self.error = None                   # exception raised by the job
+    
+    def run(self):
+        try:
+            for progress in self.job:
+                if self.cancelled.is_set():
+                    return
+                self.progress = progress
+        except Exception as err:
+            self.error = err
+
+def ttr_worker_tick(op):
+    '''Publish the worker results when it is done. Main thread only'''
+    global ttr_store
+    worker = op.worker
+    op.progress = worker.progress
+    if worker.is_alive():
+        return
+    try:
+        op.store.publish(done=worker.error is None)
+        if worker.error is not None:
+            raise worker.error
+        ttr_store = op.store
+        print("TTR. Threaded setup finished")
+    except ttr_exceptions:
+        pass
+    except Exception as err:
+        print(f"TTR. Threaded setup failed: {err}")
+    op.cancel_job()
+
+def ttr_setup_tick():
+    '''
+    bpy.app.timers function. Compute next chunk of the deferred setup frames
+    or check the worker thread computing them.
+    Returns None to unregister itself when the setup is finished
+    '''
+    global ttr_store
+    op = TTR_SetupLaunch
+    if op.job is None:
+        return None
+    try:
+        if not op.store.resolve():
+            print("TTR. Deferred setup scene was removed")
+            op.cancel_job()
+            return None
+        if op.worker:
+            ttr_worker_tick(op)
+        else:
+            op.progress = next(op.job)
+    except StopIteration:
+        ttr_store = op.store
+        op.cancel_job()
+        print("TTR. Deferred setup finished")
+    except ttr_exceptions:
+        op.cancel_job()
+    except Exception as err:
+        print(f"TTR. Deferred setup failed: {err}")
+        op.cancel_job()
+    try: ttr_redraw_properties()
+    except: pass
+    return None if op.job is None else ttr_tick
+
 class TTR_SetupLaunch(TTR_Helpers, Operator):
     bl_idname = "ttr.setup"
     bl_label = "TTR Setup Launch"
     op : StringProperty(default='UPD')
+    deferred : BoolProperty(
+        default=False,
+        options={'SKIP_SAVE'},
+        description="Compute frames list in chunks on timer ticks\
+ instead of blocking the UI. Only for 'UPD'"
+    )
+    job = None      # deferred setup generator
+    store = None    # TTR_Setup instance computed by the deferred job
+    progress = 0.0  # deferred job progress (0-1)
+    worker = None   # TTR_SetupWorker running the job if it is threaded
+    
+    @classmethod
+    def cancel_job(cls):
+        if cls.worker:
+            cls.worker.cancelled.set()
+        cls.worker = None
+        cls.job = None
+        cls.store = None
+        cls.progress = 0.0
+        if bpy.app.timers.is_registered(ttr_setup_tick):
+            bpy.app.timers.unregister(ttr_setup_tick)
+    
+    @classmethod
+    def finish_job(cls):
+        '''
+        Finish the pending deferred setup instead of throwing its work away.
+        Its remap table is stored by fingerprint, so the blocking setup
+        reuses it if the inputs are still the same
+        '''
+        store, worker, job = cls.store, cls.worker, cls.job
+        try:
+            if not store.resolve():
+                return
+            if worker:
+                worker.join()
+                store.publish(done=worker.error is None)
+            else:
+                for progress in job:
+                    pass
+        except ttr_exceptions:
+            pass
+        except Exception as err:
+            print(f"TTR. Deferred setup failed: {err}")
+        finally:
+            cls.cancel_job()
+    
+    def start_job(self, context):
+        '''
+        (Re)start frames list computation on a worker thread or,
+        if it can't be snapshotted, spread over timer ticks
+        '''
+        global ttr_store
+        cls = TTR_SetupLaunch
+        cls.cancel_job()
+        ttr_store = None
+        cls.store = TTR_Setup(context, operator=self.op, deferred=True)
+        try: cls.job, threaded = cls.store.setup_job(context)
+        except ttr_exceptions:
+            cls.cancel_job()
+            return
+        if threaded:
+            cls.worker = TTR_SetupWorker(cls.job)
+            cls.worker.start()
+        bpy.app.timers.register(ttr_setup_tick, first_interval=0.0)
     
     def execute(self, context):
         global ttr_store
+        if self.deferred and self.op == 'UPD':
+            self.start_job(context)
+            return {'FINISHED'}
+        # ----------- Blocking operators force the pending setup to finish -----
+        if TTR_SetupLaunch.job is not None:
+            TTR_SetupLaunch.finish_job()
         ttr_store = None
         try: ttr_store = TTR_Setup(context, operator=self.op)
         except ttr_exceptions as err:
@@ -117,9 +268,14 @@ class TTR_UpdateFramesInfo(TTR_Helpers, Operator):
     '''Update frames info'''
     bl_idname = "ttr.update"
     bl_label = "Update Time Remapped Frames Info"
+    deferred : BoolProperty(
+        default=False,
+        options={'SKIP_SAVE'},
+        description="Update frames info in chunks without blocking the UI"
+    )
     
     def execute(self, context):
-        bpy.ops.ttr.setup(op='UPD')
+        bpy.ops.ttr.setup(op='UPD', deferred=self.deferred)
         self.frame_handler_remove()
         if context.scene.ttr.activate:
             self.frame_handler_add()
@@ -152,6 +308,7 @@ class TTR_ShowCurrent(TTR_ShowSupport, Operator):
     bl_idname = "ttr.show"
     bl_label = "Show Time Remapped Frame"
     attributes = [
+        "fingerprint",
         "frame_current",
         "frames",
         "index",
@@ -172,7 +329,7 @@ class TTR_ShowCurrent(TTR_ShowSupport, Operator):
         'PLUS','WHEELUPMOUSE', ']', 'PERIOD', 'EQUAL', 'NUMPAD_PLUS'}
     ev_const = {'TIMER', 'MOUSEMOVE'}
     msg = 'Preview mode: ESC/TAB to escape. MOUSE buttons/wheel to scroll\
- between frames'
+ between frames. J/Shift+J to the next/previous output of the same frame'
     ttr_store = None
     
     def execute(self, context):
@@ -210,6 +367,10 @@ class TTR_ShowCurrent(TTR_ShowSupport, Operator):
             self.step_left(fstep)
         elif event.type in self.ev_next and event.value == 'PRESS':
             self.step_right(fstep)
+        elif event.type == 'J' and event.value == 'PRESS':
+            self.step_same(forward=not event.shift)
+        elif event.type == 'TIMER':
+            self.thumb_tick()
         elif event.type not in self.ev_const and event.value == 'PRESS':
             bpy.ops.ttr.warning('INVOKE_DEFAULT', type='INFO', msg = self.msg)
         return {'RUNNING_MODAL'}
@@ -226,6 +387,7 @@ class TTR_Play(TTR_PlaySupport, Operator):
     attributes = [
         "op",
         "main_sc",
+        "scenes",
         "frames",
         "frame_current",
         "frame_len",
@@ -257,19 +419,21 @@ class TTR_Play(TTR_PlaySupport, Operator):
             self.timer_remove()
             if event.shift: # ---------------------------- stop at current frame
                 context.scene.frame_set(self.main_sc.frame_current, subframe=0.0)
-                bpy.ops.ttr.update()
+                bpy.ops.ttr.update(deferred=True)
             else: # ---------------------------- jump back to the starting frame
                 self.frame_set(self.main_sc, self.frame_current)
             self.op.instances_running = 0
             self.frame_handler_add()
+            self.profile_restore()
             self.main_sc.use_nodes = self.use_nodes
-            bpy.ops.ttr.setup(op='UPD')
+            ttr_state.reset()
+            bpy.ops.ttr.setup(op='UPD', deferred=True)
             return {'FINISHED'}
         elif event.type == 'TIMER':
             if self.counter == self.frame_len:
                 self.counter = 0
             self.frame = self.frames[self.counter]
-            self.frame_set(context.scene, self.frame)
+            self.profile_frame_set(context.scene, self.frame)
             self.counter += 1
         return {'PASS_THROUGH'}
     
@@ -328,6 +492,8 @@ class TTR_Render(TTR_RenderSupport, Operator):
                 self.restore_from_tmb(context)        
         if self.render_setup(context) == {'FINISHED'}:
             return {'CANCELLED'}
+        if self.animation and not len(self.frames):
+            return {'FINISHED'}     # all the frames are in the render cache
         self.wm.modal_handler_add(self)
         return {'RUNNING_MODAL'}
     
@@ -357,6 +523,8 @@ class TTR_Render(TTR_RenderSupport, Operator):
                 else:
                     ttr_store.ready = False
                     self.frame_prepare()
+                    if ttr_store.finished:  # the rest is interpolated
+                        return {'FINISHED'}
                     self.render()
             elif not ttr_store.started:
                 self.render()
@@ -409,6 +577,448 @@ class TTR_ViewportRender(TTR_OpenglSupport, Operator):
     def invoke(self, context, modal):
         return self.execute(context)
 
+#-------------------------------- Batch Render ---------------------------------### BATCH RENDER ###
+
+class TTR_RenderBatch(TTR_BatchSupport, Operator):
+    '''Render chosen Time Remapped output frames.
+Blocks the UI, works in background mode (blender -b)'''
+    bl_idname = "ttr.render_batch"
+    bl_label = "Render Time Remapped Frames"
+    indices : StringProperty(
+        name="Indices",
+        description='Output frames indices to render, e.g. "0-24,30".\
+ All frames if empty'
+    )
+    table : StringProperty(
+        name="Remap Table",
+        description="Exported remap table to use instead of computing it",
+        subtype='FILE_PATH'
+    )
+    render_profile : StringProperty(
+        name="Render Profile",
+        description="Name of the scene render profile to render with.\
+ The active one if Render Profile is enabled and it's empty"
+    )
+    shared : StringProperty(
+        name="Shared Table",
+        description="Shared memory name or mapped file of the remap table\
+ published by the coordinator. Used read-only, without copying"
+    )
+    attributes = ttr_common_attributes
+    ttr_store = None
+    
+    def _load_table(self, context):
+        path = self.shared or bpy.path.abspath(self.table)
+        try: ttr_table_store(context.scene.name, ttr_attach(path)
+                             if self.shared else TTR_Table.load(path))
+        except (TableError, OSError, ValueError, KeyError,
+                RuntimeError) as err:
+            print(f"TTR. Remap table {path} is ignored: {err}")
+    
+    def execute(self, context):
+        global ttr_store
+        if self.table or self.shared:
+            self._load_table(context)
+        if bpy.ops.ttr.setup(op="RENDER") == {'CANCELLED'} or not ttr_store:
+            return {'CANCELLED'}
+        self.ttr_store = ttr_store
+        self.ttr_set_attributes(self.attributes)
+        if self.tmb_enabled:
+            self.report({'ERROR'}, "TTR. Batch render with True Motion Blur\
+ add-on is not supported")
+            return {'CANCELLED'}
+        elif self.tmb:
+            self.restore_from_tmb(context)
+        try: indices = (ttr_parse_indices(self.indices) if self.indices
+                        else list(range(len(self.frames))))
+        except ValueError:
+            self.report({'ERROR'}, f"TTR. Wrong indices: {self.indices}")
+            return {'CANCELLED'}
+        wrong = [n for n in indices if not 0 <= n < len(self.frames)]
+        if wrong:
+            self.report({'ERROR'}, f"TTR. Indices out of 0-{len(self.frames)-1}\
+ range: {wrong[:10]}")
+            return {'CANCELLED'}
+        if (self.render_profile and
+                not self.main_sc.ttr.render_profiles.get(self.render_profile)):
+            self.report({'ERROR'}, f'TTR. No render profile\
+ "{self.render_profile}" in scene "{self.main_sc.name}"')
+            return {'CANCELLED'}
+        try: self.batch_setup(context)
+        except ttr_exceptions: return {'CANCELLED'}
+        self.render_profile_set()
+        try: self.batch_render(indices)
+        finally: self.batch_cleanup()
+        return {'FINISHED'}
+
+class TTR_FarmManifest(TTR_Helpers, Operator):
+    '''Split Time Remapped render into render farm tasks balanced by
+estimated render cost. Saves job manifest and remap table next to it'''
+    bl_idname = "ttr.farm_manifest"
+    bl_label = "Export Farm Manifest"
+    filepath : StringProperty(subtype='FILE_PATH', default="ttr_manifest.json")
+    filter_glob : StringProperty(default="*.json", options={'HIDDEN'})
+    chunks : IntProperty(
+        name="Tasks",
+        description="Number of render farm tasks",
+        default=10,
+        min=1
+    )
+    blender : StringProperty(
+        name="Blender",
+        description="Blender executable on the render farm.\
+ Current Blender if empty",
+        default=""
+    )
+    
+    def execute(self, context):
+        global ttr_store
+        if not bpy.data.filepath:
+            self.report({'ERROR'}, "TTR. Save the .blend file first")
+            return {'CANCELLED'}
+        if bpy.ops.ttr.setup(op="RENDER") == {'CANCELLED'} or not ttr_store:
+            return {'CANCELLED'}
+        path = bpy.path.abspath(self.filepath)
+        table_path = os.path.splitext(path)[0] + ".npz"
+        table = ttr_store.table()
+        sc = context.scene
+        try:
+            table.save(table_path)
+            manifest = ttr_manifest(table, self.chunks, bpy.data.filepath,
+                samples=self.get_samples(sc), pixels=self.get_pixels(sc),
+                table_path=table_path,
+                blender=self.blender or bpy.app.binary_path)
+            ttr_manifest_save(manifest, path)
+        except OSError as err:
+            self.report({'ERROR'}, f"TTR. {err}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"TTR. {len(manifest['tasks'])} tasks saved\
+ to {path}")
+        return {'FINISHED'}
+    
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+class TTR_Estimate(TTR_BatchSupport, Operator):
+    '''Estimate render cost of the Time Remapped animation: frames,
+unique subframes, Motion Blur samples and projected render time'''
+    bl_idname = "ttr.estimate"
+    bl_label = "Estimate Render Cost"
+    calibration : IntProperty(
+        name="Calibration Frames",
+        description="Number of representative frames to render at low\
+ resolution and time. 0 to only count frames and samples",
+        default=3,
+        min=0,
+        max=32
+    )
+    resolution : IntProperty(
+        name="Calibration Resolution",
+        description="Resolution of calibration renders",
+        default=25,
+        min=1,
+        max=100,
+        subtype='PERCENTAGE'
+    )
+    attributes = ttr_common_attributes
+    ttr_store = None
+    results = {}    # last estimate text lines by scene name
+    
+    def calibrate(self, context, indices):
+        '''
+        Render frames at low resolution without saving. Returns seconds.
+        Every registered scene is reduced, the pixels scale is weighted by
+        each scene's own resolution and samples
+        '''
+        scenes = {sc_obj.scene.name : sc_obj.scene for sc_obj in self.scenes}
+        scenes[self.main_sc.name] = self.main_sc
+        percentages = {name : sc.render.resolution_percentage
+                       for name, sc in scenes.items()}
+        weights = {name : self.get_pixels(sc)*self.get_samples(sc)
+                   for name, sc in scenes.items()}
+        self.batch_setup(context)
+        seconds = []
+        try:
+            for name, sc in scenes.items():
+                sc.render.resolution_percentage = max(1,
+                            round(percentages[name]*self.resolution/100))
+            full = sum(weights.values())
+            self.scale = (sum(self.get_pixels(sc)*self.get_samples(sc)
+                              for sc in scenes.values())/full if full else 1.0)
+            for index in indices:
+                self.batch_frame(index)
+                t1 = time.perf_counter()
+                bpy.ops.render.render(write_still=False)
+                seconds.append(time.perf_counter()-t1)
+                print(f"TTR. Calibration frame {index}: {seconds[-1]:.2f}s")
+        finally:
+            for name, sc in scenes.items():
+                sc.render.resolution_percentage = percentages[name]
+            self.batch_cleanup()
+        return seconds
+    
+    def execute(self, context):
+        global ttr_store
+        if bpy.ops.ttr.setup(op="RENDER") == {'CANCELLED'} or not ttr_store:
+            return {'CANCELLED'}
+        self.ttr_store = ttr_store
+        self.ttr_set_attributes(self.attributes)
+        table = ttr_store.table()
+        sc = self.main_sc
+        costs = ttr_frame_costs(table, self.get_samples(sc), self.get_pixels(sc))
+        indices, seconds, self.scale = [], [], 1.0
+        if self.calibration and not self.tmb_enabled:
+            indices = ttr_calibration_indices(costs, self.calibration)
+            try: seconds = self.calibrate(context, indices)
+            except ttr_exceptions: return {'CANCELLED'}
+        estimate = ttr_estimate(table, costs, indices, seconds, self.scale)
+        if estimate["rate"] and estimate["mb_samples"]:
+            # --------- seconds per MB sample for the Time Budget MB samples
+            sc.ttr.sample_time = (estimate["rate"]
+                                  *self.get_samples(sc)*self.get_pixels(sc))
+        lines = ttr_estimate_report(estimate)
+        TTR_Estimate.results[sc.name] = lines
+        for line in lines:
+            print(f"TTR. {line}")
+        self.report({'INFO'}, "TTR. " + ". ".join(lines))
+        return {'FINISHED'}
+
+#-------------------------- Jump to Same Source Frame --------------------------
+
+class TTR_Jump(TTR_Helpers, Operator):
+    '''Jump to the next output frame showing the same source frame.
+Ping-pong and looping remaps show one source frame several times'''
+    bl_idname = "ttr.jump"
+    bl_label = "Jump to Same Source Frame"
+    backward : BoolProperty(
+        name="Backward",
+        description="Jump to the previous output frame",
+        default=False
+    )
+    radius : FloatProperty(
+        name="Radius",
+        description="Subframes closer to the source frame show it",
+        default=0.5,
+        min=0.0001,
+        max=10.0
+    )
+    
+    def execute(self, context):
+        global ttr_store
+        if bpy.ops.ttr.setup(op="RENDER") == {'CANCELLED'} or not ttr_store:
+            return {'CANCELLED'}
+        sc = context.scene
+        first = ttr_store.frame_start+ttr_store.skip_start
+        index = min(max(0, sc.frame_current-first), len(ttr_store.frames)-1)
+        frame = ttr_store.frames[index]
+        reverse = ttr_store.reverse()
+        matches = reverse.outputs(frame, self.radius)
+        index = reverse.step(index, frame, self.radius, not self.backward)
+        if index is not None:
+            sc.frame_set(first+index)
+        self.report({'INFO'}, f"TTR. Source frame {frame:.2f} is shown by\
+ output indices {ttr_format_indices(matches.tolist())}")
+        return {'FINISHED'}
+
+#------------------------------ Remap Table Files ------------------------------### REMAP TABLE ###
+
+class TTR_TableExport(TTR_Helpers, Operator):
+    '''Export time remapped frames and Motion Blur settings table\
+ (.csv, .json or .npz) for render farm and compositing pipelines'''
+    bl_idname = "ttr.table_export"
+    bl_label = "Export Remap Table"
+    filepath : StringProperty(subtype='FILE_PATH', default="ttr_table.csv")
+    filter_glob : StringProperty(default="*.csv;*.json;*.npz",
+                                                        options={'HIDDEN'})
+    
+    def execute(self, context):
+        global ttr_store
+        if bpy.ops.ttr.setup(op="RENDER") == {'CANCELLED'} or not ttr_store:
+            return {'CANCELLED'}
+        path = bpy.path.abspath(self.filepath)
+        try: ttr_store.table().save(path)
+        except (TableError, OSError) as err:
+            self.report({'ERROR'}, f"TTR. {err}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"TTR. Remap table exported to {path}")
+        return {'FINISHED'}
+    
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+class TTR_TableImport(TTR_Helpers, Operator):
+    '''Import time remapped frames and Motion Blur settings table\
+ (.csv, .json or .npz) to use instead of computing it'''
+    bl_idname = "ttr.table_import"
+    bl_label = "Import Remap Table"
+    filepath : StringProperty(subtype='FILE_PATH')
+    filter_glob : StringProperty(default="*.csv;*.json;*.npz",
+                                                        options={'HIDDEN'})
+    force : BoolProperty(
+        name="Ignore Changes",
+        description="Use imported table even if Time Remapping settings\
+ have changed since it was exported",
+        default=False
+    )
+    
+    def execute(self, context):
+        global ttr_store
+        path = bpy.path.abspath(self.filepath)
+        try: table = TTR_Table.load(path)
+        except (TableError, OSError, ValueError, KeyError) as err:
+            self.report({'ERROR'}, f"TTR. Could not import {path}: {err}")
+            return {'CANCELLED'}
+        if bpy.ops.ttr.setup(op="RENDER") == {'CANCELLED'} or not ttr_store:
+            return {'CANCELLED'}
+        if table.fingerprint != ttr_store.fingerprint:
+            if not self.force:
+                self.report({'WARNING'}, "TTR. Remap table doesn't match\
+ current Time Remapping settings")
+                return {'CANCELLED'}
+            table.fingerprint = ttr_store.fingerprint
+        try: table.check(len(ttr_store.frames), ttr_store.skip_start,
+                    [sc_obj.name for sc_obj in ttr_store.scenes if sc_obj.mb])
+        except TableError as err:
+            self.report({'ERROR'}, f"TTR. Remap table doesn't fit current\
+ frames: {err}")
+            return {'CANCELLED'}
+        ttr_table_store(context.scene.name, table)
+        bpy.ops.ttr.update(deferred=True)
+        self.report({'INFO'}, f"TTR. Remap table imported from {path}")
+        return {'FINISHED'}
+    
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+#------------------------------------ Bake -------------------------------------### BAKE ###
+
+class TTR_Bake(TTR_BakeSupport, Operator):
+    '''Bake Time Remapped animation into new actions keyed at timeline
+frames, so it plays and renders natively without the add-on.
+Original actions are kept'''
+    bl_idname = "ttr.bake"
+    bl_label = "Bake Time Remapped Animation"
+    bl_options = {'REGISTER', 'UNDO'}
+    tolerance : FloatProperty(
+        name="Decimate",
+        description="Max value difference of baked curves from the remapped\
+ animation. 0 keeps only keyframes that are needed exactly",
+        default=0.0001,
+        min=0,
+        precision=5
+    )
+    
+    def execute(self, context):
+        global ttr_store
+        if bpy.ops.ttr.setup(op="RENDER") == {'CANCELLED'} or not ttr_store:
+            return {'CANCELLED'}
+        frames = list(ttr_store.frames)
+        start = ttr_store.frame_start+ttr_store.skip_start
+        ids, skipped = self.bake_ids([sc_obj.scene
+                                      for sc_obj in ttr_store.scenes])
+        baked = {}
+        for id in ids:
+            action = id.animation_data.action
+            if action not in baked:
+                baked[action] = self.bake_action(id, frames, start,
+                                                            self.tolerance)
+            elif baked[action]:
+                id.animation_data.action = baked[action]
+        baked = [action for action in baked.values() if action]
+        keys = sum(len(fc.keyframe_points) for action in baked
+                   for fc in action.fcurves)
+        context.scene.ttr.activate = False
+        self.report({'WARNING'} if skipped else {'INFO'},
+            f"TTR. {len(baked)} actions baked, {keys} keyframes"
+            + (f". Skipped with NLA tracks: {', '.join(skipped)}"
+               if skipped else ""))
+        return {'FINISHED'}
+
+class TTR_BakeRestore(TTR_BakeSupport, Operator):
+    '''Use original actions instead of baked ones in all the scenes,
+remove baked actions and enable Time Remapping again'''
+    bl_idname = "ttr.bake_restore"
+    bl_label = "Restore Original Animation"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    def execute(self, context):
+        ids = self.bake_restore(bpy.data.scenes)
+        context.scene.ttr.activate = True
+        self.report({'INFO'}, f"TTR. Original animation restored for\
+ {len(ids)} data-blocks")
+        return {'FINISHED'}
+
+class TTR_SimBake(TTR_SimSupport, Operator):
+    '''Bake simulations of the time remapped scenes once, so remapped
+subframes going backward or jumping read caches instead of re-simulating'''
+    bl_idname = "ttr.sim_bake"
+    bl_label = "Pre-bake Simulations"
+    
+    def execute(self, context):
+        global ttr_store
+        if bpy.ops.ttr.setup(op="RENDER") == {'CANCELLED'} or not ttr_store:
+            return {'CANCELLED'}
+        frames = list(ttr_store.frames)
+        queue = ttr_render_order(frames, context.scene.ttr.order,
+                                                    ttr_store.frame_current)
+        baked, fluids = self.sim_bake([sc_obj.scene for sc_obj in
+                            ttr_store.scenes], [frames[n] for n in queue])
+        msg = self.sim_report(baked, fluids)
+        self.report({'WARNING'} if fluids else {'INFO'},
+                    f"TTR. {msg or 'No simulations to pre-bake'}")
+        return {'FINISHED'}
+
+#-------------------------------- Render Profiles ------------------------------
+
+class TTR_RenderProfileAdd(Operator):
+    '''Add render profile with reduced settings for drafts and dailies'''
+    bl_idname = "ttr.render_profile_add"
+    bl_label = "Add Render Profile"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    def execute(self, context):
+        ttr = context.scene.ttr
+        ttr.render_profiles.add()
+        ttr.render_profile_index = len(ttr.render_profiles)-1
+        return {'FINISHED'}
+
+class TTR_RenderProfileRemove(Operator):
+    '''Remove the active render profile'''
+    bl_idname = "ttr.render_profile_remove"
+    bl_label = "Remove Render Profile"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    @classmethod
+    def poll(cls, context):
+        return len(context.scene.ttr.render_profiles) > 0
+    
+    def execute(self, context):
+        ttr = context.scene.ttr
+        ttr.render_profiles.remove(ttr.render_profile_index)
+        ttr.render_profile_index = max(0, min(ttr.render_profile_index,
+                                              len(ttr.render_profiles)-1))
+        return {'FINISHED'}
+
+#--------------------------------- Render Cache --------------------------------
+
+class TTR_CacheClear(Operator):
+    '''Remove all rendered frames from the render cache folder.
+Do it after changing anything in the scenes besides Time Remapping'''
+    bl_idname = "ttr.cache_clear"
+    bl_label = "Clear Render Cache"
+    
+    def execute(self, context):
+        path = bpy.path.abspath(context.scene.ttr.cache_dir)
+        try: count = TTR_RenderCache(path, 0, None, '').clear()
+        except OSError as err:
+            self.report({'ERROR'}, f"TTR. Could not clear {path}: {err}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"TTR. {count} cached frames removed")
+        return {'FINISHED'}
+
 #---------------------------------- Register -----------------------------------
 
 classes = [
@@ -423,6 +1033,18 @@ classes = [
     TTR_UpdateFramesInfo,
     TTR_RemoveUpdater,
     TTR_Store,
+    TTR_Jump,
+    TTR_TableExport,
+    TTR_TableImport,
+    TTR_RenderBatch,
+    TTR_FarmManifest,
+    TTR_Estimate,
+    TTR_CacheClear,
+    TTR_SimBake,
+    TTR_RenderProfileAdd,
+    TTR_RenderProfileRemove,
+    TTR_Bake,
+    TTR_BakeRestore,
 ]    
 
 def register():
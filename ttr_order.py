@@ -0,0 +1,69 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Render queue order. Doesn't depend on bpy
+#  (c) 2020 Andrey Sokolov (so_records)
+
+import numpy as np
+
+TTR_PROGRESSIVE = 16    # first progressive pass renders every 16th frame
+
+def ttr_order_source(frames):
+    '''Output indices sorted by source subframe (holds stay together)'''
+    return np.argsort(np.asarray(frames, dtype=np.float64), kind='stable')
+
+def ttr_order_minimal(frames, start):
+    '''
+    Output indices in the shortest source time travel from `start`:
+    sweep to the nearer end of the source range, then to the other one
+    '''
+    frames = np.asarray(frames, dtype=np.float64)
+    ascending = ttr_order_source(frames)
+    below = ascending[frames[ascending] < start]
+    above = ascending[frames[ascending] >= start]
+    if not len(below) or not len(above):
+        return ascending if len(above) else ascending[::-1]
+    if start-frames[below[0]] <= frames[above[-1]]-start:
+        return np.concatenate((below[::-1], above))
+    return np.concatenate((above, below[::-1]))
+
+def ttr_order_progressive(length, stride=TTR_PROGRESSIVE):
+    '''
+    Output indices interleaved: every `stride`-th first, then every
+    half of it and so on, so the whole length is covered early
+    '''
+    index = np.arange(length)
+    level = np.zeros(length, dtype=np.int64)
+    step = 2
+    while step <= stride:
+        level += (index % step == 0)
+        step *= 2
+    return np.lexsort((index, -level))
+
+def ttr_render_order(frames, order='OUTPUT', start=None):
+    '''Render queue: output indices of the frames in the chosen order'''
+    if order == 'SOURCE':
+        queue = ttr_order_source(frames)
+    elif order == 'MINIMAL':
+        queue = ttr_order_minimal(frames, frames[0] if start is None else start)
+    elif order == 'PROGRESSIVE':
+        queue = ttr_order_progressive(len(frames))
+    else:
+        queue = np.arange(len(frames))
+    return queue.tolist()
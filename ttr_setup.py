@@ -24,8 +24,20 @@
 
 import bpy, addon_utils, inspect, numpy as np
 from .ttr_support import *
+from .ttr_table import (TTR_Table, TTR_TableScene, TTR_Prefix, TableError,
+                                        TTR_ReverseIndex, ttr_fingerprint)
+from .ttr_sparse import TTR_Sparse, TTR_Stream
+from .ttr_integrate import TTR_Sum, TTR_Integrator
+from .ttr_curve import TTR_Curve
+from .ttr_estimate import ttr_budget_scenes
 global ttr_store
 ttr_store = None
+ttr_chunk = 2000    # frames computed per deferred setup timer tick
+ttr_tables = {}     # computed remap tables lists by scene name
+ttr_tables_max = 4  # remap tables kept in memory per scene
+ttr_prefixes = {}   # Speed mode TTR_Prefix by scene name
+ttr_reverse = {}    # (fingerprint, TTR_ReverseIndex) by scene name
+ttr_table_prop = "ttr_table" # scene ID property to save remap table into
 
 #--------------------- Supporting Functions and Operators ----------------------### SETUP ###
 
@@ -34,6 +46,7 @@ class TTR_Scene():
     
     def __init__(self, scene):
         self.scene = scene                              # scene
+        self.name = scene.name                          # scene name
         self.engine = scene.render.engine               # scene render engine
         self.start_frame = scene.frame_current_final    # scene current frame        
         self.type = None        # enum in {'TMB', 'CYCLES', 'BLENDER_EEVEE'}
@@ -45,6 +58,24 @@ class TTR_Scene():
         self.tmb = None         # True Motion Blur (TMB) add-on enabled in scene
         self.tmb_shutter = None # TMB Shutter FCurve
         self.tmb_samples = None # TMB Samples FCurve
+
+class TTR_Props():
+    '''Plain copy of the scene TTR properties used by frames computation'''
+    
+    attributes = ('speed', 'mb', 'integration', 'tolerance', 'sparse',
+                  'budget', 'budget_samples', 'budget_time', 'sample_time',
+                  'samples_min', 'samples_max',
+                  'number', 'actual', 'update', 'mb_samples')
+    results = ('number', 'actual', 'update', 'mb_samples')
+    
+    def __init__(self, props):
+        for attr in self.attributes:
+            setattr(self, attr, getattr(props, attr))
+    
+    def apply(self, props):
+        '''Copy computed frames info back to the scene properties'''
+        for attr in self.results:
+            setattr(props, attr, getattr(self, attr))
     
 class TTR_Setup(TTR_Helpers):
     '''
@@ -52,13 +83,15 @@ class TTR_Setup(TTR_Helpers):
     Set list length to `ttr.update` value to show in `ttr.frames`
     '''
     
-    def __init__(self, context, operator="RENDER", animation=False):
-        self._context = context
+    def __init__(self, context, operator="RENDER", animation=False,
+                                                            deferred=False):
         self._operator = operator
         self._animation = animation
         self.wm = None               # context Window Manager
         self.win = None              # context Window
         self.main_sc = None          # active scene
+        self.scene_name = ""         # active scene name
+        self.props = None            # active scene TTR props or TTR_Props
         self.sc_obj = None           # active scene storage object
         self.path = None             # render filepath
         self.ttr_type = None         # enum in {'SPEED', 'FRAMES'}
@@ -74,7 +107,8 @@ class TTR_Setup(TTR_Helpers):
         self.compensate = None       # MB Stretch Fcurve
         self.frames = []             # remapped frames list
         self.indicies = []           # remapped frames indicies list
-        self.scenes = []             # scenes classes
+        self.scenes = []             # scenes classes in evaluation order
+        self.registry = {}           # scenes classes by scene
         self.composites = []         # Compositor Composite nodes list
         self.fo_paths = []           # File Outputs paths
         self.fpth_prefix = "ttr.tmp."# File paths prefix
@@ -102,8 +136,16 @@ class TTR_Setup(TTR_Helpers):
         self.tmb_enabled = None         # TMB enabled for some scenes
         self.tmb_version = None         # TMB version
         self.tmb_launch = None          # Confirmation of launching TMB render
+        # deferred setup
+        self.chunk = ttr_chunk          # frames computed between two yields
+        self.progress = 0.0             # frames list computation progress
+        self.fingerprint = ""           # remap table inputs hash
+        self.sparse = None              # TTR_Sparse if frames are on demand
+        self.threaded = False           # computed from snapshot on a thread
+        self.pending = []               # main thread calls made by the thread
         
-        self.setup(context, operator, animation) # execute initialization
+        if not deferred:
+            self.setup(context, operator, animation) # execute initialization
     
     #------------------------------ check_enabled ------------------------------
     
@@ -149,6 +191,8 @@ class TTR_Setup(TTR_Helpers):
     
     def _project_info(self, context):
         self.main_sc = context.scene
+        self.scene_name = self.main_sc.name
+        self.props = self.main_sc.ttr
         self._check_drivers()
         self.tmb = True if hasattr(bpy.types, "TMB_RENDER_OT_render") else False
         self.tmb_version = self._check_tmb_version() if self.tmb else None
@@ -174,12 +218,25 @@ class TTR_Setup(TTR_Helpers):
     #------------------------------- get_scenes --------------------------------
         
     def _get_scenes(self, context):
-        self.scenes = [TTR_Scene(self.main_sc)]
+        '''
+        Register each scene to evaluate once: scenes of active Render Layers
+        nodes first as the main scene Compositor depends on them, main last
+        '''
+        self.registry = {}
         if (self.main_sc.use_nodes and self.main_sc.node_tree
         and self.main_sc.node_tree.nodes):
             for node in self.main_sc.node_tree.nodes:
-                if node.type == 'R_LAYERS' and node.scene not in self.scenes:
-                    self.scenes.append(TTR_Scene(node.scene))
+                if (node.type == 'R_LAYERS' and not node.mute and node.scene
+                and node.scene != self.main_sc
+                and node.scene not in self.registry and self._layer_used(node)):
+                    self.registry[node.scene] = TTR_Scene(node.scene)
+        self.registry[self.main_sc] = TTR_Scene(self.main_sc)
+        self.scenes = list(self.registry.values())
+    
+    def _layer_used(self, node):
+        '''Render Layers node View Layer is enabled for rendering'''
+        layer = node.scene.view_layers.get(node.layer)
+        return layer is None or layer.use
     
     #----------------------------- get_scenes_info -----------------------------
     
@@ -251,8 +308,14 @@ class TTR_Setup(TTR_Helpers):
             
     def _get_mb_info(self, sc_obj, step, frame):
         '''Get Scene motion Blur Info'''
+        shutter, samples = self._mb_value(sc_obj, step, frame)
+        sc_obj.shutter_list.append(shutter)
+        sc_obj.samples_list.append(samples)
+    
+    def _mb_value(self, sc_obj, step, frame):
+        '''Scene Motion Blur shutter and samples at the frame'''
         mb = (self.compensate.evaluate(frame)
-                if self.compensate else self.main_sc.ttr.mb)
+                if self.compensate else self.props.mb)
         fac = 1-((1-abs(step))*mb)
         if sc_obj.tmb: # ----------------------- for True Motion Blur add-on
             shutter = (fac * sc_obj.shutter if not sc_obj.tmb_shutter
@@ -262,13 +325,104 @@ class TTR_Setup(TTR_Helpers):
         else: # --------------------------------------- for original Motion Blur
             shutter = fac * sc_obj.shutter
             samples = fac * sc_obj.samples
-        sc_obj.shutter_list.append(shutter)
-        sc_obj.samples_list.append(max(1,round(samples)))
+        return shutter, max(1,round(samples))
+    
+    def _budget_total(self):
+        '''Total MB samples of all the scenes the budget allows or None'''
+        ttr = self.props
+        if ttr.budget == 'SAMPLES':
+            return ttr.budget_samples
+        if ttr.budget == 'TIME' and ttr.sample_time > 0:
+            return ttr.budget_time*len(self.frames)/ttr.sample_time
+        return None
+    
+    def _mb_budget(self):
+        '''
+        Redistribute MB samples of all the scenes to fit the budget together,
+        weighted by the linearly scaled samples within the per frame bounds
+        '''
+        total = self._budget_total()
+        if total is None:
+            return
+        ttr = self.props
+        # ------------------------------------- Cycles MB has no samples to fit
+        scenes = [sc_obj for sc_obj in self.scenes
+                  if sc_obj.mb and sc_obj.samples]
+        budget = ttr_budget_scenes([sc_obj.samples_list for sc_obj in scenes],
+                                   total, ttr.samples_min, ttr.samples_max)
+        for sc_obj, samples in zip(scenes, budget):
+            sc_obj.samples_list = samples.tolist()
+    
+    def _mb_cost(self):
+        '''Show total MB samples of the remapped frames'''
+        # ----- Cycles samples_list is all 1s, it has no MB samples to count
+        self.props.mb_samples = sum(sum(sc_obj.samples_list)
+                for sc_obj in self.scenes if sc_obj.mb and sc_obj.samples)
+    
+    def _evaluate(self, fc, frames, cache):
+        '''FCurve values at all the frames as array, once per FCurve'''
+        if fc not in cache:
+            cache[fc] = np.fromiter(map(fc.evaluate, frames),
+                                    dtype=np.float64, count=len(frames))
+        return cache[fc]
+    
+    def _mb_values(self, sc_obj, steps, frames, cache):
+        '''Scene Motion Blur shutter and samples arrays for all the frames'''
+        mb = (self._evaluate(self.compensate, frames, cache)
+                if self.compensate else self.props.mb)
+        fac = 1-((1-np.abs(steps))*mb)
+        if sc_obj.tmb: # ----------------------- for True Motion Blur add-on
+            shutter = (fac * sc_obj.shutter if not sc_obj.tmb_shutter
+                else fac * self._evaluate(sc_obj.tmb_shutter, frames, cache))
+            samples = (fac * sc_obj.samples if not sc_obj.tmb_samples
+                else fac * self._evaluate(sc_obj.tmb_samples, frames, cache))
+        else: # --------------------------------------- for original Motion Blur
+            shutter = fac * sc_obj.shutter
+            samples = fac * sc_obj.samples
+        return shutter, np.maximum(1, np.round(samples)).astype(int)
 
-    def _speed(self, context):
+    def _prefix_base(self):
+        '''Hash of Speed mode inputs except speed keyframes and range end'''
+        ttr = self.props
+        info = self._fcurve_info(self.fcurve)
+        return ttr_fingerprint(
+            bpy.app.version, self.frame_start, ttr.speed, ttr.mb,
+            ttr.integration, ttr.tolerance, info and (info[0], info[2]),
+            self._fcurve_info(self.compensate),
+            [(sc_obj.name, sc_obj.type, sc_obj.mb, sc_obj.shutter,
+              sc_obj.samples, self._fcurve_info(sc_obj.tmb_shutter),
+              self._fcurve_info(sc_obj.tmb_samples))
+             for sc_obj in self.scenes])
+    
+    def _speed_resume(self, base, keys, frame_range):
+        '''Get stored Speed mode prefix and the index to resume from'''
+        prefix = ttr_prefixes.get(self.scene_name)
+        if not prefix or prefix.base != base:
+            return None
+        index = prefix.resume_index(keys, self.frame_start, frame_range)
+        return (index, prefix) if index else None
+    
+    def _step_function(self):
+        '''
+        Speed mode step of a timeline frame: speed/100 taken at the frame
+        or integrated over the whole frame if Integration is Adaptive
+        '''
+        ttr = self.props
+        if not self.fcurve:
+            return lambda frame: (1/100)*ttr.speed
+        fc = self.fcurve
+        if ttr.integration != 'ADAPTIVE':
+            return lambda frame: (1/100)*fc.evaluate(frame)
+        integrator = TTR_Integrator(lambda x: (1/100)*fc.evaluate(x),
+                                                                ttr.tolerance)
+        return lambda frame: integrator.integral(frame, frame+1)
+        
+    def _speed(self):
         '''
         Calculate Frames and motion blur (if needed) values lists,
         if Time Remapping type is set to Speed.
+        Generator: yields computation progress every `self.chunk` frames.
+        Reuses the frames before the first edited keyframe if possible.
         '''
         frames = self.frames
         start = self.frame_start
@@ -278,19 +432,46 @@ class TTR_Setup(TTR_Helpers):
         frame_range = self.frame_end - self.frame_start
         remapped_range = 0
         gotcurrent = False
+        # ------------------- Reuse unchanged part of the frames ---------------
+        base = self._prefix_base()
+        keys = self._fcurve_info(self.fcurve)
+        keys = keys[1] if keys else None
+        actual, remapped = [], []   # state before each iteration
+        resumed = self._speed_resume(base, keys, frame_range)
+        if resumed:
+            index, prefix = resumed
+            frames.extend(prefix.current[:index].tolist())
+            actual = prefix.actual[:index].tolist()
+            remapped = prefix.remapped[:index].tolist()
+            for sc_obj in self.scenes:
+                if sc_obj.mb and sc_obj.name in prefix.mb:
+                    shutter, samples = prefix.mb[sc_obj.name]
+                    sc_obj.shutter_list.extend(shutter[:index])
+                    sc_obj.samples_list.extend(samples[:index])
+            current_frame = float(prefix.current[index])
+            actual_frame = float(prefix.actual[index])
+            remapped_range = float(prefix.remapped[index])
+            speed_frame = start+index
+            print(f"TTR. Reused {index} of previously computed frames")
+        # ------ Compensated sums don't drift over huge Adaptive ranges --------
+        step_of = self._step_function()
+        compensate = self.props.integration == 'ADAPTIVE'
+        current_sum = TTR_Sum(current_frame, compensate)
+        actual_sum = TTR_Sum(actual_frame, compensate)
+        remapped_sum = TTR_Sum(remapped_range, compensate)
         
         # --------------------------- Get Frames List --------------------------
         while remapped_range <= (frame_range+0.01):
             frames.append(current_frame)
+            actual.append(actual_frame)
+            remapped.append(remapped_range)
             # ------------------- Get next actual frame step -------------------
-            step = ((1/100)*self.fcurve.evaluate(speed_frame)
-                    if self.fcurve else
-                    (1/100)*self.main_sc.ttr.speed)            
+            step = step_of(speed_frame)
             # -------- Prevent Freezing when the Speed is close to Zero --------
             zero_step = step
             if abs(step) < .01:
                 next = ( self.fcurve.evaluate(actual_frame+0.011)
-                        if self.fcurve else self.main_sc.ttr.speed )
+                        if self.fcurve else self.props.speed )
                 if next < 0:
                     step = -0.01
                 elif not step and not next:
@@ -304,12 +485,12 @@ class TTR_Setup(TTR_Helpers):
                     self._get_mb_info(sc_obj, zero_step, speed_frame)
             # ------------ Increment While loop values to continue -------------                    
             if abs(step) <= .01:
-                current_frame += zero_step
+                current_frame = current_sum.add(zero_step)
             else:
-                current_frame += step
+                current_frame = current_sum.add(step)
             
-            actual_frame += abs(step)
-            remapped_range += abs(step)
+            actual_frame = actual_sum.add(abs(step))
+            remapped_range = remapped_sum.add(abs(step))
             fstep = 1
             speed_frame += fstep
             #----------------------- Update Actual Frame -----------------------
@@ -318,35 +499,41 @@ class TTR_Setup(TTR_Helpers):
                 gotcurrent = True
                 #----------------------- if in cropped frame range -------------
                 if len(frames) >= self.skip_start:                   
-                    self.main_sc.ttr.number = len(frames)-self.skip_start+1
-                    self.main_sc.ttr.actual = frames[-1] + zero_step
+                    self.props.number = len(frames)-self.skip_start+1
+                    self.props.actual = frames[-1] + zero_step
                 #----------------------- if before frame range -----------------
                 else: 
-                    self.main_sc.ttr.number = 0
-                    self.main_sc.ttr.actual = frames[-1]
+                    self.props.number = 0
+                    self.props.actual = frames[-1]
             #------------ if not caught during the full frame range ------------
             elif remapped_range >= (frame_range+0.01) and not gotcurrent:
                 #----------------------- if earlier than cropped frame range ---
                 if len(frames) <= self.skip_start:
                     pass
                 elif self.frame_current <= frames[self.skip_start]:
-                    self.main_sc.ttr.number = 0
-                    self.main_sc.ttr.actual = frames[self.skip_start]
+                    self.props.number = 0
+                    self.props.actual = frames[self.skip_start]
                 #----------------------- if later than cropped frame range -----
                 else:
-                    self.main_sc.ttr.number = len(frames)-self.skip_start+1
-                    self.main_sc.ttr.actual = frames[-1]
+                    self.props.number = len(frames)-self.skip_start+1
+                    self.props.actual = frames[-1]
+            #------------------------- Yield progress --------------------------
+            if not len(frames) % self.chunk:
+                self.progress = min(remapped_range/(frame_range+0.01), 1.0)
+                yield self.progress
 
+        # ----------------------- Store state for reuse ------------------------
+        ttr_prefixes[self.scene_name] = TTR_Prefix(base, keys,
+            frames+[current_frame], actual+[actual_frame],
+            remapped+[remapped_range],
+            {sc_obj.name : (sc_obj.shutter_list[:], sc_obj.samples_list[:])
+             for sc_obj in self.scenes if sc_obj.mb})
         # ----------------- Check if there are frames to render ----------------
         total=len(frames)-self.skip_start+(self.skip_end if self.skip_end else 0)
         if total <= 0:
-            msg = "No frames to render"
-            bpy.ops.ttr.warning('INVOKE_DEFAULT', type="WARNING", msg=msg)
-            self.main_sc.ttr.update = 0
-            self.main_sc.update_tag()
-            raise NoFramesError(msg)
+            self._no_frames()
         # ------------------------ Correct frames list -------------------------
-        self.main_sc.ttr.update = total
+        self.props.update = total
         self.frames[:] = frames[self.skip_start:self.skip_end]
         for sc_obj in self.scenes:
             if sc_obj.mb:
@@ -355,17 +542,119 @@ class TTR_Setup(TTR_Helpers):
                 sc_obj.samples_list = (
                             sc_obj.samples_list[self.skip_start:self.skip_end])
         frames = self.frames
-        if gotcurrent and self.main_sc.ttr.actual<frames[0]:
-            self.main_sc.ttr.actual = frames[0]
-        if self.main_sc.ttr.number >= total:
-            self.main_sc.ttr.number=total
-            self.main_sc.ttr.actual=frames[-1]
-        return True
+        if gotcurrent and self.props.actual<frames[0]:
+            self.props.actual = frames[0]
+        if self.props.number >= total:
+            self.props.number=total
+            self.props.actual=frames[-1]
+        if resumed:
+            self._current_info()
+            
+    def _no_frames(self):
+        msg = "No frames to render"
+        self._on_main(bpy.ops.ttr.warning, 'INVOKE_DEFAULT',
+                                                type="WARNING", msg=msg)
+        self.props.update = 0
+        self._on_main(self.main_sc.update_tag)
+        raise NoFramesError(msg)
+    
+    def _on_main(self, func, *args, **kwargs):
+        '''Call now or postpone until `publish` if computed on a thread'''
+        if self.threaded:
+            self.pending.append((func, args, kwargs))
+        else:
+            func(*args, **kwargs)
+    
+    def _frame_step(self, fr, n):
+        '''Frames mode step at the frame `n` of the frames list `fr`'''
+        if n == 0:
+            return abs(fr[n+1]-fr[n])
+        elif n == (len(fr)-1):
+            return abs(fr[n]-fr[n-1])
+        elif fr[n-1]<fr[n]<fr[n+1] or fr[n-1]>fr[n]>fr[n+1]:
+            return abs(fr[n+1]-fr[n-1])/2
+        return 0
+    
+    def _frame_steps(self, fr):
+        '''
+        Frames mode steps of the whole frames list at once: one-sided
+        differences at the ends, central ones where frames are monotonic
+        '''
+        fr = np.asarray(fr, dtype=np.float64)
+        steps = np.zeros(len(fr))
+        if len(fr) < 2:
+            return steps
+        diff = np.diff(fr)
+        steps[0] = abs(diff[0])
+        steps[-1] = abs(diff[-1])
+        monotonic = (diff[:-1] > 0) & (diff[1:] > 0) | (
+                                            (diff[:-1] < 0) & (diff[1:] < 0))
+        steps[1:-1] = np.where(monotonic, np.abs(fr[2:]-fr[:-2])/2, 0)
+        return steps
+    
+    #----------------------------- sparse frames -------------------------------
+    
+    def _mb_streams(self, frame_of, step_of, count):
+        '''On demand Motion Blur lists for the frames `frame_of(index)`'''
+        for sc_obj in self.scenes:
+            if not sc_obj.mb:
+                continue
+            mb = lambda n, sc_obj=sc_obj: self._mb_value(sc_obj, step_of(n),
+                                                                frame_of(n))
+            sc_obj.shutter_list = TTR_Stream(lambda n, mb=mb: mb(n)[0], count)
+            sc_obj.samples_list = TTR_Stream(lambda n, mb=mb: mb(n)[1], count)
+    
+    def _speed_sparse(self):
+        '''
+        Speed mode frames and Motion Blur lists computed on demand
+        from polynomial segments between keyframes. For huge frame ranges
+        '''
+        breaks = ([kp.co[0] for kp in self.fcurve.keyframe_points]
+                  if self.fcurve else [])
+        sparse = TTR_Sparse(self._step_function(), self.frame_start,
+                                    self.frame_end-self.frame_start, breaks)
+        self.progress = 1.0
+        yield self.progress
+        first = self.skip_start
+        last = len(sparse)+(self.skip_end if self.skip_end else 0)
+        if last-first <= 0:
+            self._no_frames()
+        self.sparse = sparse
+        self.frames = sparse.stream(sparse.frame, first, last)
+        self._mb_streams(lambda n: sparse.start+first+n,
+                         lambda n: sparse.step(first+n), last-first)
+        self.props.update = last-first
+        self._current_info()
+    
+    def _frame_sparse(self):
+        '''Frames mode frames and Motion Blur lists computed on demand'''
+        if not self.fcurve:
+            msg = '"Frame" parameter needs to be keyframed in "Frames" mode'
+            bpy.ops.ttr.warning( 'INVOKE_DEFAULT',type='WARNING',msg=msg)
+            raise NoKeyframesError(msg)
+        fc = self.fcurve
+        start = self.frame_start+self.skip_start
+        count = (self.frame_end+1+(self.skip_end if self.skip_end else 0)
+                                                                    -start)
+        if count <= 0:
+            self._no_frames()
+        self.progress = 1.0
+        yield self.progress
+        frame = lambda n: fc.evaluate(start+n)
+        self.frames = TTR_Stream(frame, count)
+        # ----- the render queue pops self.frames, MB reads absolute indices
+        curve = TTR_Stream(frame, count)
+        self._mb_streams(frame, lambda n: self._frame_step(curve, n), count)
+        self.props.update = count
+        self._current_info()
+    
+    #------------------------------ frames lists -------------------------------
             
-    def _frame(self, context):
+    def _frame(self):
         '''
         Calculate Frames and motion blur (if needed) values lists,
         if Time Remapping Type is set to Frames.
+        Generator: yields computation progress every `self.chunk` frames.
         '''
         # --------------- Check that Frame is animated or Cancel ---------------        
         if not self.fcurve:
@@ -378,62 +667,287 @@ class TTR_Setup(TTR_Helpers):
         start = self.frame_start+self.skip_start
         end = self.frame_end+sub_step+(0 if not self.skip_end else self.skip_end)
         if start >= end:
-            msg = "No frames to render"
-            bpy.ops.ttr.warning('INVOKE_DEFAULT', type="WARNING", msg=msg)
-            self.main_sc.ttr.update = 0
-            self.main_sc.update_tag()
-            raise NoFramesError(msg)
+            self._no_frames()
         # ------------------------- Get Frames List ----------------------------
         frames = np.arange(start, end, sub_step)
-        self.frames = np.vectorize(self.fcurve.evaluate)(frames)
-        self.frames = list(self.frames)
+        fr_len = len(frames)
+        mb_len = len([sc_obj for sc_obj in self.scenes if sc_obj.mb])
+        work = fr_len*(1+mb_len)
+        self.frames = []
+        for n in range(0, fr_len, self.chunk):
+            self.frames.extend(map(self.fcurve.evaluate,frames[n:n+self.chunk]))
+            self.progress = len(self.frames)/work
+            yield self.progress
         fr = self.frames
-        fr_len = len(fr)
-        self.main_sc.ttr.update = fr_len
-        for sc_obj in self.scenes:
-            if not sc_obj.mb:
-                continue
-            # ------- Store new Shutter and Samples/Steps for Motion Blur ------           
-            for n in range(fr_len):
-                if n == 0:
-                    step = abs(fr[n+1]-fr[n])
-                elif n == (fr_len-1):
-                    step = abs(fr[n]-fr[n-1])
-                else:                
-                    if fr[n-1]<fr[n]<fr[n+1] or fr[n-1]>fr[n]>fr[n+1]:
-                        step = abs(fr[n+1]-fr[n-1])/2
-                    else:
-                        step = 0
-                self._get_mb_info(sc_obj, step, fr[n])
+        self.props.update = fr_len
+        done = fr_len
+        # --- Steps and Motion Blur FCurves are evaluated in batch per chunk ---
+        steps = self._frame_steps(fr) if mb_len else None
+        mb_scenes = [sc_obj for sc_obj in self.scenes if sc_obj.mb]
+        for n in range(0, fr_len if mb_len else 0, self.chunk):
+            chunk = fr[n:n+self.chunk]
+            cache = {}  # FCurves shared by the scenes are evaluated once
+            for sc_obj in mb_scenes:
+                # ----- Store new Shutter and Samples/Steps for Motion Blur ----
+                shutter, samples = self._mb_values(sc_obj,
+                                    steps[n:n+self.chunk], chunk, cache)
+                sc_obj.shutter_list.extend(shutter.tolist())
+                sc_obj.samples_list.extend(samples.tolist())
+            done += len(chunk)*mb_len
+            self.progress = done/work
+            yield self.progress
         # ----------------------- Update Actual Frame --------------------------        
         if self.frame_current < start:
-            self.main_sc.ttr.number = self.frame_current-start+self.frame_start
-            self.main_sc.ttr.actual = -1
+            self.props.number = self.frame_current-start+self.frame_start
+            self.props.actual = -1
         elif self.frame_current > end:
-            self.main_sc.ttr.number = len(fr)
-            self.main_sc.ttr.actual = fr[-1]
+            self.props.number = len(fr)
+            self.props.actual = fr[-1]
         else:
             for n in range(len(fr)):
                 if frames[n] == int(self.frame_current):
-                    self.main_sc.ttr.actual = fr[n]
-                    self.main_sc.ttr.number = n+1
+                    self.props.actual = fr[n]
+                    self.props.number = n+1
         
-    def _get_frames(self, context):
-        if self.ttr_type == "SPEED":
-            self._speed(context)
+    #------------------------------- remap_table -------------------------------
+    
+    def _rna_info(self, struct):
+        '''Values of all plain RNA properties of a struct'''
+        info = []
+        for prop in struct.bl_rna.properties:
+            if prop.identifier == 'rna_type' or prop.type not in (
+                                'BOOLEAN', 'INT', 'FLOAT', 'ENUM', 'STRING'):
+                continue
+            value = getattr(struct, prop.identifier)
+            info.append(value if isinstance(value, (bool, int, float, str, set))
+                              else tuple(value))
+        return info
+    
+    def _fcurve_info(self, fc):
+        '''Everything that affects FCurve evaluation'''
+        if not fc:
+            return None
+        if isinstance(fc, TTR_Curve):
+            return fc.info
+        return (fc.extrapolation,
+                [(kp.co[:], kp.handle_left[:], kp.handle_right[:],
+                  kp.interpolation, kp.easing, kp.back, kp.amplitude, kp.period)
+                 for kp in fc.keyframe_points],
+                [self._rna_info(m) for m in fc.modifiers])
+    
+    def _fingerprint(self):
+        '''Hash of all the inputs the frames list is computed from'''
+        ttr = self.props
+        return ttr_fingerprint(
+            bpy.app.version, self.ttr_type, self.frame_start, self.frame_end,
+            self.skip_start, self.skip_end, ttr.speed, ttr.mb,
+            ttr.integration, ttr.tolerance, self._fcurve_info(self.fcurve),
+            self._fcurve_info(self.compensate), ttr.budget, ttr.budget_samples,
+            ttr.budget_time, ttr.sample_time, ttr.samples_min, ttr.samples_max,
+            [(sc_obj.name, sc_obj.type, sc_obj.mb, sc_obj.shutter,
+              sc_obj.samples, self._fcurve_info(sc_obj.tmb_shutter),
+              self._fcurve_info(sc_obj.tmb_samples))
+             for sc_obj in self.scenes])
+    
+    def table(self):
+        '''Get computed frames and Motion Blur lists as TTR_Table'''
+        return TTR_Table(list(self.frames),
+            [TTR_TableScene(sc_obj.name, list(sc_obj.shutter_list),
+                        list(sc_obj.samples_list)) for sc_obj in self.scenes],
+            self.skip_start, self.fingerprint)
+    
+    def reverse(self):
+        '''Reverse index from source subframes to output indices'''
+        fingerprint, index = ttr_reverse.get(self.scene_name, ("", None))
+        if (index is None or fingerprint != self.fingerprint
+                                        or len(index) != len(self.frames)):
+            index = TTR_ReverseIndex(np.fromiter(self.frames,
+                                dtype=np.float64, count=len(self.frames)))
+            ttr_reverse[self.scene_name] = (self.fingerprint, index)
+        return index
+    
+    def _stored_table(self):
+        '''Get remap table from memory or from the saved .blend file'''
+        for table in ttr_tables.get(self.scene_name, ()):
+            if table.fingerprint == self.fingerprint:
+                return table
+        data = self.main_sc.get(ttr_table_prop)
+        if not isinstance(data, bytes):
+            return None
+        try: table = TTR_Table.from_bytes(data)
+        except TableError as err:
+            print(f"TTR. Stored remap table is ignored: {err}")
+            return None
+        if table.fingerprint != self.fingerprint:
+            return None
+        ttr_table_store(self.scene_name, table)
+        return table
+    
+    def _current_info(self):
+        '''Update actual frame and its number at the current frame'''
+        fr = self.frames
+        n = int(self.frame_current)-self.frame_start-self.skip_start
+        if n < 0:
+            self.props.number = 0
+            self.props.actual = fr[0]
+        elif n >= len(fr):
+            self.props.number = len(fr)
+            self.props.actual = fr[-1]
         else:
-            self._frame(context)
+            self.props.number = n+1
+            self.props.actual = fr[n]
+    
+    def _load_table(self):
+        '''Use stored remap table instead of computing if inputs match'''
+        table = self._stored_table()
+        if not table or not len(table):
+            return False
+        # shared table arrays are read in place, not copied to every worker
+        as_list = ((lambda a: TTR_Stream(lambda n: a[n].item(), len(a)))
+                   if table.shared else (lambda a: a.tolist()))
+        self.frames = as_list(table.frames)
+        for sc_obj in self.scenes:
+            tsc = table.scene(sc_obj.name)
+            if sc_obj.mb and tsc:
+                sc_obj.shutter_list = as_list(tsc.shutter)
+                sc_obj.samples_list = as_list(tsc.samples)
+        self.props.update = len(self.frames)
+        self._mb_cost()
+        self._current_info()
+        self.progress = 1.0
         self.main_sc.update_tag()
         return True
     
-    def setup(self, context, operator, animation):
+    #------------------------------- get_frames --------------------------------
+    
+    def _get_frames(self):
+        if self.props.sparse:
+            if self.ttr_type == "SPEED":
+                yield from self._speed_sparse()
+            else:
+                yield from self._frame_sparse()
+            self.props.mb_samples = 0
+            self.main_sc.update_tag()
+            return
+        if self._load_table():
+            return
+        yield from self._compute_frames()
+        self.publish()
+    
+    def _compute_frames(self):
+        '''Frames computation. Reads only plain data if snapshotted'''
+        if self.ttr_type == "SPEED":
+            yield from self._speed()
+        else:
+            yield from self._frame()
+        if self.props.budget != 'NONE':
+            self._mb_budget()
+        self._mb_cost()
+        self.progress = 1.0
+    
+    #-------------------------------- threading --------------------------------
+    
+    def _snapshot(self):
+        '''
+        Replace everything the frames computation reads from bpy with
+        plain copies, so it can run on a worker thread.
+        Returns False if some FCurve can't be evaluated without bpy
+        '''
+        if self.ttr_type == "FRAMES" and not self.fcurve:
+            return False
+        curves = {}
+        for fc in [self.fcurve, self.compensate] + [fc for sc_obj in
+                self.scenes for fc in (sc_obj.tmb_shutter, sc_obj.tmb_samples)]:
+            if fc and fc not in curves:
+                curves[fc] = TTR_Curve.from_fcurve(fc, self._fcurve_info(fc))
+                if not curves[fc]:
+                    return False
+        self.fcurve = curves.get(self.fcurve)
+        self.compensate = curves.get(self.compensate)
+        for sc_obj in self.scenes:
+            sc_obj.tmb_shutter = curves.get(sc_obj.tmb_shutter)
+            sc_obj.tmb_samples = curves.get(sc_obj.tmb_samples)
+        self.props = TTR_Props(self.props)
+        self.threaded = True
+        return True
+    
+    def publish(self, done=True):
+        '''
+        Apply thread computation results: copied properties and postponed
+        main thread calls. Stores the remap table if `done`. Main thread only
+        '''
+        if self.threaded:
+            self.props.apply(self.main_sc.ttr)
+        pending, self.pending = self.pending, []
+        for func, args, kwargs in pending:
+            func(*args, **kwargs)
+        if done:
+            ttr_table_store(self.scene_name, self.table())
+            self.main_sc.update_tag()
+    
+    def _prepare(self, context):
         self._check_enabled(context)
         self._project_info(context)
         self._get_scenes(context)
         self._get_scenes_info(context)
-        self._get_frames(context)
+        self.fingerprint = self._fingerprint()
+    
+    def resolve(self):
+        '''
+        Get the active scene and its props again by name: the context
+        the deferred setup started in is gone by the next timer tick.
+        Returns False if the scene was removed
+        '''
+        sc = bpy.data.scenes.get(self.scene_name)
+        if sc is None:
+            return False
+        self.main_sc = sc
+        if not self.threaded:
+            self.props = sc.ttr
+        return True
+    
+    def setup_job(self, context):
+        '''
+        Main thread part of the deferred setup, the only one using the
+        context. Returns (generator, threaded): frames computation progress
+        generator and whether it reads only snapshot data, so it can run
+        on a worker thread
+        '''
+        self._prepare(context)
+        if (not self.props.sparse and not self._stored_table()
+                                  and self._snapshot()):
+            return self._compute_frames(), True
+        return self._get_frames(), False
+    
+    def setup_iter(self, context):
+        '''
+        Resumable setup. Yields frames list computation progress (0-1),
+        so it could be spread over several `bpy.app.timers` ticks
+        '''
+        self._prepare(context)
+        yield from self._get_frames()
+    
+    def setup(self, context, operator, animation):
+        for progress in self.setup_iter(context):
+            pass
 
 #--------------------- Supporting Functions and Operators ----------------------### SETUP ###
         
+def ttr_table_store(scene_name, table):
+    '''Keep remap table in memory as the latest one for the scene'''
+    tables = [tb for tb in ttr_tables.get(scene_name, ())
+              if tb.fingerprint != table.fingerprint]
+    ttr_tables[scene_name] = tables[-(ttr_tables_max-1):] + [table]
+
+def ttr_table_save(self, context):
+    '''save_pre handler: store computed remap tables inside the .blend'''
+    for sc in bpy.data.scenes:
+        tables = ttr_tables.get(sc.name)
+        if not sc.ttr.activate or not tables:
+            continue
+        try: sc[ttr_table_prop] = tables[-1].to_bytes()
+        except Exception as err:
+            print(f"TTR. Could not store remap table in {sc.name}: {err}")
+
 def ttr_setup_prop(self, context):
-    bpy.ops.ttr.setup(op='UPD')
\ No newline at end of file
+    bpy.ops.ttr.setup(op='UPD', deferred=True)
\ No newline at end of file
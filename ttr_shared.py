@@ -0,0 +1,113 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+#  TRUE TIME REMAPPING
+#  Remap table shared between processes. Doesn't depend on bpy
+#  (c) 2020 Andrey Sokolov (so_records)
+
+import os, mmap, tempfile, uuid
+try: from multiprocessing import shared_memory
+except ImportError: shared_memory = None    # Python < 3.8
+try: from .ttr_table import TTR_Table
+except ImportError: from ttr_table import TTR_Table
+
+TTR_SHARED_PREFIX = "ttr_"      # shared memory segment / file names prefix
+TTR_SHARED_EXTENSION = ".ttrt"  # memory mapped table file extension
+
+def ttr_shared_name(fingerprint):
+    '''
+    Name unique to the publishing job: another coordinator publishing the
+    same table gets its own segment. Short enough for macOS (31 chars)
+    '''
+    return (f"{TTR_SHARED_PREFIX}{fingerprint[:8] or 'table'}"
+            f"_{os.getpid()}_{uuid.uuid4().hex[:6]}")
+
+class TTR_SharedTable():
+    '''
+    Remap table published once by the coordinator for worker processes.
+    Named shared memory segment, or a memory mapped file where it's
+    unavailable or `use_file`. `address` is passed to the workers.
+    An existing segment or file of the name is never replaced
+    '''
+
+    def __init__(self, table, name=None, use_file=False):
+        data = table.to_bytes()
+        self.name = name or ttr_shared_name(table.fingerprint)
+        self.memory = None  # shared memory segment
+        self.path = None    # memory mapped file
+        if shared_memory and not use_file:
+            self.memory = shared_memory.SharedMemory(
+                                    self.name, create=True, size=len(data))
+            self.memory.buf[:len(data)] = data
+        else:
+            self.path = os.path.join(tempfile.gettempdir(),
+                                     self.name + TTR_SHARED_EXTENSION)
+            with open(self.path, 'xb') as f:    # fails if the name is taken
+                f.write(data)
+
+    @property
+    def address(self):
+        return self.path or self.name
+
+    def close(self):
+        '''Remove the published table, attached workers keep their views'''
+        if self.memory:
+            self.memory.close()
+            try: self.memory.unlink()
+            except FileNotFoundError: pass
+            self.memory = None
+        if self.path:
+            try: os.remove(self.path)
+            except OSError: pass
+            self.path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def _attach_memory(name):
+    '''Shared memory segment not removed when this process exits'''
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:                               # Python < 3.13
+        memory = shared_memory.SharedMemory(name)
+        if os.name == 'posix':
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(memory._name, "shared_memory")
+        return memory
+
+def ttr_attach(address):
+    '''
+    Read-only table from a published address without copying its arrays.
+    The table keeps the mapping open in `table.shared`
+    '''
+    if address.endswith(TTR_SHARED_EXTENSION):
+        with open(address, 'rb') as f:
+            handle = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = handle
+    else:
+        if not shared_memory:
+            raise RuntimeError("Shared memory isn't supported, use a file")
+        handle = _attach_memory(address)
+        buffer = handle.buf
+    table = TTR_Table.from_bytes(buffer, copy=False)
+    table.shared = handle
+    return table
@@ -0,0 +1,72 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Playback simplify level control. Doesn't depend on bpy
+#  (c) 2020 Andrey Sokolov (so_records)
+
+# (max subdivision, child particles, hide heavy collection) by level,
+# None keeps the scene settings
+TTR_SIMPLIFY_LEVELS = (
+    None,
+    (2, 0.5, False),
+    (1, 0.2, False),
+    (0, 0.0, False),
+    (0, 0.0, True),
+)
+
+class TTR_Simplify():
+    '''
+    Simplify level adjusted from measured frame evaluation times:
+    raised while frames are slower than the target fps, lowered while
+    they are much faster. Waits `patience` frames after each change,
+    the first frame after it re-evaluates everything and isn't counted
+    '''
+
+    def __init__(self, fps, smoothing=0.3, patience=3,
+                                            levels=TTR_SIMPLIFY_LEVELS):
+        self.target = 1/fps         # seconds per frame to keep up with
+        self.smoothing = smoothing  # exponential moving average factor
+        self.patience = patience    # frames measured before a change
+        self.levels = levels
+        self.level = 0
+        self.mean = None            # average frame evaluation seconds
+        self.count = 0              # frames measured since the last change
+        self.changed = False        # the next frame is the first after change
+
+    def settings(self):
+        return self.levels[self.level]
+
+    def frame(self, seconds):
+        '''Add frame evaluation time. Returns True if the level changed'''
+        if self.changed:
+            self.changed = False
+            return False
+        self.mean = (seconds if self.mean is None
+                     else self.mean + self.smoothing*(seconds-self.mean))
+        self.count += 1
+        if self.count < self.patience:
+            return False
+        if self.mean > self.target*1.05 and self.level < len(self.levels)-1:
+            self.level += 1
+        elif self.mean < self.target*0.5 and self.level > 0:
+            self.level -= 1
+        else:
+            return False
+        self.mean, self.count, self.changed = None, 0, True
+        return True
@@ -0,0 +1,226 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Sparse Speed mode frames list. Doesn't depend on bpy
+#  (c) 2020 Andrey Sokolov (so_records)
+
+import bisect, math, numpy as np
+from numpy.polynomial import Polynomial
+
+TTR_DEGREE = 5          # segment step polynomial degree
+TTR_TOLERANCE = 1e-8    # max step error of a segment polynomial (frames)
+TTR_MIN_STEP = .01      # steps closer to zero are counted as this in range
+
+class TTR_Stream():
+    '''
+    Lazy read-only sequence: items are computed on demand by `get(index)`.
+    Supports pop(0) to be consumed as the render queue
+    '''
+
+    def __init__(self, get, length):
+        self._get = get         # function returning item by index
+        self._first = 0         # number of popped items
+        self._length = length   # total number of items
+
+    def __len__(self):
+        return self._length-self._first
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[n] for n in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("TTR_Stream index out of range")
+        return self._get(self._first+index)
+
+    def __iter__(self):
+        for n in range(self._first, self._length):
+            yield self._get(n)
+
+    def pop(self, index=0):
+        if index != 0:
+            raise IndexError("TTR_Stream can pop only the first item")
+        item = self[0]
+        self._first += 1
+        return item
+
+class TTR_Segment():
+    '''
+    Frames with steps given by a polynomial (frame offset -> step).
+    Sums of steps are exact for degree <= 5 by Euler-Maclaurin formula
+    '''
+
+    def __init__(self, first, count, poly, sign, position, remapped):
+        self.first = first          # first frame offset
+        self.count = count          # number of frames
+        self.poly = poly            # numpy Polynomial of steps
+        self.integ = poly.integ()   # its antiderivative
+        self.derivs = [poly.deriv(m) for m in (1, 3, 5)] # its odd derivatives
+        self.sign = sign            # 1/-1 for steps sign, 0 if near zero
+        self.position = position    # position at the first frame
+        self.remapped = remapped    # remapped range at the first frame
+
+    def step(self, n):
+        return float(self.poly(n))
+
+    def sum(self, n):
+        '''Sum of the n first steps'''
+        if not n:
+            return 0.0
+        total = self.integ(n)-self.integ(0)-(self.poly(n)-self.poly(0))/2
+        for fac, deriv in zip((1/12, -1/720, 1/30240), self.derivs):
+            total += fac*(deriv(n)-deriv(0))
+        return float(total)
+
+    def range_sum(self, n):
+        '''Remapped range of the n first frames'''
+        return TTR_MIN_STEP*n if not self.sign else self.sign*self.sum(n)
+
+class TTR_Sparse():
+    '''
+    Speed mode frames as polynomial segments between keyframes.
+    Each timeline frame adds step=speed/100 to the position, so position at
+    output index I is start + sum of the steps of the I previous frames.
+    Memory is O(segments), lookups are O(log segments)
+    '''
+
+    def __init__(self, evaluate, start, frame_range, breaks=(),
+                        degree=TTR_DEGREE, tolerance=TTR_TOLERANCE):
+        self._evaluate = evaluate       # step at timeline frame
+        self.start = start              # first timeline frame
+        self.degree = degree            # max segment polynomial degree
+        self.tolerance = tolerance      # max polynomial step error
+        self.segments = []              # TTR_Segment list
+        self._firsts = []               # segments first frames offsets
+        self.length = 0                 # number of frames
+        self._build(frame_range, breaks)
+
+    def __len__(self):
+        return self.length
+
+    #--------------------------------- build -----------------------------------
+
+    def _step(self, n):
+        return self._evaluate(self.start+n)
+
+    def _fit(self, first, count):
+        '''
+        Fit step polynomial of the frames piece. Exact for short pieces.
+        Returns (polynomial, steps at nodes) or None if error is too big
+        '''
+        if count <= self.degree+1:
+            nodes = np.arange(count)
+        else:
+            nodes = np.unique(np.round((count-1)/2*(1-np.cos(
+                        np.linspace(0, np.pi, self.degree+1)))).astype(int))
+        values = np.array([self._step(first+n) for n in nodes])
+        poly = Polynomial.fit(nodes, values, len(nodes)-1,
+                                            domain=[0, max(count-1, 1)])
+        if count > self.degree+1:
+            checks = np.unique(np.round((nodes[1:]+nodes[:-1])/2).astype(int))
+            error = max(abs(poly(n)-self._step(first+n)) for n in checks)
+            if error > self.tolerance:
+                return None
+        return poly, values
+
+    def _sign(self, poly, values, count):
+        '''Common steps sign state or None if it changes inside'''
+        if count > self.degree+1:
+            for level in (TTR_MIN_STEP, -TTR_MIN_STEP, 0.0):
+                roots = (poly-level).roots() if poly.degree() else []
+                if any(abs(r.imag) < 1e-9 and 0 <= r.real <= count-1
+                       for r in roots):
+                    return None
+            values = values[:1]
+        near = np.abs(values) < TTR_MIN_STEP
+        if near.all():
+            return 0
+        if near.any() or (values > 0).any() and (values < 0).any():
+            return None
+        return 1 if values[0] > 0 else -1
+
+    def _pieces(self, first, count):
+        '''Yield (first, count, polynomial, sign) splitting where needed'''
+        fit = self._fit(first, count)
+        sign = None if fit is None else self._sign(*fit, count)
+        if sign is None and count > 1:
+            half = count//2
+            yield from self._pieces(first, half)
+            yield from self._pieces(first+half, count-half)
+            return
+        poly, values = fit
+        if sign is None:
+            sign = 1 if values[0] > 0 else -1
+        yield first, count, poly, sign
+
+    def _build(self, frame_range, breaks):
+        limit = frame_range + 0.01
+        last = int(math.ceil(limit/TTR_MIN_STEP))+2
+        bounds = sorted({0, last} | {int(math.ceil(b-self.start)) for b in breaks
+                                     if 0 < b-self.start < last})
+        position = float(self.start)
+        remapped = 0.0
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            for first, count, poly, sign in self._pieces(a, b-a):
+                seg = TTR_Segment(first, count, poly, sign, position, remapped)
+                self.segments.append(seg)
+                self._firsts.append(first)
+                grow = seg.range_sum(count)
+                if remapped + grow > limit:
+                    self.length = first + self._range_end(seg, limit-remapped)
+                    return
+                position += seg.sum(count)
+                remapped += grow
+        self.length = last
+
+    def _range_end(self, seg, limit):
+        '''Number of frames of the segment until remapped range > limit'''
+        low, high = 0, seg.count
+        while high-low > 1:
+            mid = (low+high)//2
+            if seg.range_sum(mid) <= limit:
+                low = mid
+            else:
+                high = mid
+        return high
+
+    #--------------------------------- lookup ----------------------------------
+
+    def _segment(self, index):
+        return self.segments[bisect.bisect_right(self._firsts, index)-1]
+
+    def frame(self, index):
+        '''Subframe at output index (not cropped)'''
+        seg = self._segment(index)
+        return seg.position + seg.sum(index-seg.first)
+
+    def step(self, index):
+        '''Step from the frame at output index to the next one'''
+        seg = self._segment(index)
+        return seg.step(index-seg.first)
+
+    def index(self, frame):
+        '''Output index (not cropped) shown at timeline frame'''
+        return min(max(int(frame)-self.start, 0), self.length-1)
+
+    def stream(self, get, first=0, last=None):
+        '''`get(index)` for output indices from first to last as TTR_Stream'''
+        last = self.length if last is None else min(last, self.length)
+        return TTR_Stream(lambda n: get(first+n), max(0, last-first))
@@ -0,0 +1,57 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+#  TRUE TIME REMAPPING
+#  Minimal-diff scene state applier. Doesn't depend on bpy
+#  (c) 2020 Andrey Sokolov (so_records)
+
+class TTR_State():
+    '''
+    Last applied values of scene properties by scene. Values equal to the
+    applied ones aren't written again, so unchanged scenes aren't tagged
+    for update. Written and skipped counts go to the telemetry
+    '''
+
+    def __init__(self, telemetry=None):
+        self.applied = {}           # {scene key: {property path: value}}
+        self.telemetry = telemetry  # TTR_Telemetry counting writes
+
+    def reset(self):
+        '''Forget applied values: scenes could be changed since then'''
+        self.applied = {}
+
+    def changed(self, key, path, value):
+        '''Record the value as applied. False if it already was (skipped)'''
+        state = self.applied.setdefault(key, {})
+        changed = path not in state or state[path] != value
+        state[path] = value
+        if self.telemetry:
+            self.telemetry.write(changed)
+        return changed
+
+    def set(self, key, root, path, value):
+        '''Write root's property at the dotted path if changed'''
+        if not self.changed(key, path, value):
+            return False
+        *names, attr = path.split('.')
+        owner = root
+        for name in names:
+            owner = getattr(owner, name)
+        setattr(owner, attr, value)
+        return True
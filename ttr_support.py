@@ -20,7 +20,17 @@
 #  Time remapping add-on support module
 #  (c) 2020 Andrey Sokolov (so_records)
 
-import bpy, inspect, time, datetime, pathlib
+import bpy, inspect, time, datetime, pathlib, shutil, tempfile, numpy as np
+from .ttr_sparse import TTR_Stream
+from .ttr_telemetry import ttr_telemetry
+from .ttr_state import TTR_State
+from .ttr_order import ttr_render_order
+from .ttr_farm import ttr_progress_save
+from .ttr_table import ttr_fingerprint
+from .ttr_cache import TTR_RenderCache, TTR_LRU, ttr_prefetch_order
+from .ttr_interp import ttr_interp_keys, ttr_interpolate
+from .ttr_bake import ttr_bake_keys, ttr_sim_range
+from .ttr_simplify import TTR_Simplify
 
 class StatusError(Exception): pass
 class DriversError(Exception): pass
@@ -29,9 +39,60 @@ class NoFramesError(Exception): pass
 class NoKeyframesError(Exception): pass
 ttr_exceptions = (
     StatusError, DriversError, TMBVersionError, NoFramesError, NoKeyframesError) 
+ttr_bake_prop = "ttr_original"  # baked action property: original action name
+ttr_fake_prop = "ttr_fake_user" # baked action property: original's fake user
+ttr_linear = 1                  # LINEAR keyframe interpolation enum value
+ttr_thumbs = None   # TTR_LRU of Show mode viewport thumbnails (GPUOffScreen)
+ttr_settle = .25    # seconds without scrolling before full frame evaluation
+ttr_state = TTR_State(ttr_telemetry)    # scenes state applied while rendering
+ttr_rna_limit = 256 # longer collections are in content fingerprint by length
+ttr_rna_skip = {    # RNA properties that don't change rendered images
+    "rna_type", "name_full", "users", "use_fake_user", "use_extra_user", "tag",
+    "is_evaluated", "original", "session_uid", "is_runtime_data", "is_missing",
+    "is_embedded_data", "is_library_indirect", "library_weak_reference",
+    "preview", "pixels", "select", "is_editmode", "animation_data",
+    "matrix_world", "matrix_local", "matrix_basis", "dimensions", "bound_box"}
         
+def ttr_redraw_properties():
+    '''Redraw Properties Editors to show updated TTR info'''
+    for win in bpy.context.window_manager.windows:
+        for area in win.screen.areas:
+            if area.type == 'PROPERTIES':
+                area.tag_redraw()
+
 def ttr_frame_info_update(self, context):
-    bpy.ops.ttr.update()
+    bpy.ops.ttr.update(deferred=True)
+
+def ttr_rna_values(struct, animated=(), depth=2):
+    '''
+    RNA property values of the struct for content fingerprints: nested
+    structs and collections down to `depth`, IDs by name. Values of the
+    `animated` paths depend on the current frame, their FCurves count instead
+    '''
+    try: base = struct.path_from_id()
+    except Exception: base = ''
+    values = []
+    for prop in struct.bl_rna.properties:
+        name = prop.identifier
+        if (name in ttr_rna_skip or
+                (f"{base}.{name}" if base else name) in animated):
+            continue
+        try: value = getattr(struct, name)
+        except Exception: continue
+        if prop.type == 'POINTER':
+            if isinstance(value, bpy.types.ID):
+                value = value.name
+            elif value is not None:
+                value = depth and ttr_rna_values(value, animated, depth-1)
+        elif prop.type == 'COLLECTION':
+            value = ([ttr_rna_values(item, animated, depth-1) for item in value]
+                     if depth and len(value) <= ttr_rna_limit else len(value))
+        elif getattr(prop, 'is_array', False):
+            value = np.asarray(value, dtype=np.float64).tobytes()
+        elif isinstance(value, set):
+            value = sorted(value)
+        values.append((name, value))
+    return values
 
 class TTR_Helpers():
      
@@ -53,21 +114,80 @@ class TTR_Helpers():
     def frame_set(self, sc, frame):
         sc.frame_set(int(frame), subframe=frame-int(frame))
         
-    def set_mb(self, sc_obj, shutter, samples):
+    def set_mb(self, sc_obj, shutter, samples, state=None):
+        '''
+        Set scene Motion Blur. With TTR_State only values changed since
+        the last frame are written, and the scene is tagged only then
+        '''
         sc = sc_obj.scene
         if sc_obj.type == 'CYCLES':
-            sc.render.motion_blur_shutter = shutter
+            values = (("render.motion_blur_shutter", shutter),)
         elif sc_obj.type == 'TMB':
-            sc.true_mb.shutter = shutter
-            sc.true_mb.samples = samples
+            values = (("true_mb.shutter", shutter), ("true_mb.samples", samples))
         elif sc_obj.type == 'BLENDER_EEVEE':
-            sc.eevee.motion_blur_shutter = shutter
-            if bpy.app.version_string.startswith("2.8"):
-                sc.eevee.motion_blur_samples = samples
-            else:
-                sc.eevee.motion_blur_steps = samples
-        sc.update_tag()
+            values = (("eevee.motion_blur_shutter", shutter),
+                      ("eevee.motion_blur_samples"
+                       if bpy.app.version_string.startswith("2.8")
+                       else "eevee.motion_blur_steps", samples))
+        else:
+            values = ()
+        if state is None:
+            state = TTR_State()
+        changed = [state.set(sc.name, sc, path, value)
+                   for path, value in values]
+        if not values or any(changed):
+            sc.update_tag()
+    
+    def state_frame_set(self, sc, frame):
+        '''Set scene subframe unless it's already set while rendering'''
+        if ttr_state.changed(sc.name, "frame", frame):
+            self.frame_set(sc, frame)
         
+    def get_samples(self, sc):
+        '''Render samples of the scene render engine'''
+        if sc.render.engine == 'CYCLES':
+            return sc.cycles.samples
+        elif sc.render.engine.startswith('BLENDER_EEVEE'):
+            return sc.eevee.taa_render_samples
+        return 1
+    
+    def get_pixels(self, sc):
+        '''Number of pixels in the rendered image'''
+        r = sc.render
+        return r.resolution_x*r.resolution_y*(r.resolution_percentage/100)**2
+        
+    def scene_ids(self, sc):
+        '''
+        IDs the scene renders: the scene, world, objects, their data, shape
+        keys, materials, particle settings and node trees (shader,
+        compositing, geometry nodes and groups inside them). Has repeats
+        '''
+        
+        def trees(tree, seen):
+            '''The node tree and node groups used in it'''
+            if not tree or tree in seen:
+                return []
+            seen.add(tree)
+            items = [tree]
+            for nd in tree.nodes:
+                items += trees(getattr(nd, 'node_tree', None), seen)
+            return items
+        
+        seen = set()
+        items = [sc, sc.world] + trees(sc.node_tree, seen)
+        items += trees(sc.world and sc.world.node_tree, seen)
+        for obj in sc.objects:
+            items += [obj, obj.data, getattr(obj.data, 'shape_keys', None)]
+            items += trees(getattr(obj.data, 'node_tree', None), seen)
+            for slot in obj.material_slots:
+                items += [slot.material]
+                items += trees(slot.material and slot.material.node_tree,
+                               seen)
+            for md in obj.modifiers:
+                items += trees(getattr(md, 'node_group', None), seen)
+            items += [ps.settings for ps in obj.particle_systems]
+        return items
+    
     def ttr_set_attributes(self, attributes):
         '''Set attributes from ttr_store as Operator self attributes'''
         all_atrs = [at for at in dir(self.ttr_store) if not at.startswith('_')
@@ -78,9 +198,56 @@ class TTR_Helpers():
             else:            
                 raise StatusError(f'{at} for {self.bl_idname} is not in storage')
 
-class TTR_ShowSupport(TTR_Helpers):
+class TTR_ProfileSupport(TTR_Helpers):
+    '''Playback simplify profile of Show and Play, restored on exit'''
+    
+    def profile_set(self):
+        self.profile = None
+        ttr = self.main_sc.ttr
+        if not ttr.profile:
+            return
+        r = self.main_sc.render
+        self.profile = TTR_Simplify(r.fps/r.fps_base)
+        self.profile_scenes = {sc_obj.scene : (sc_obj.scene.render.use_simplify,
+                                sc_obj.scene.render.simplify_subdivision,
+                                sc_obj.scene.render.simplify_child_particles)
+                               for sc_obj in self.scenes}
+        coll = ttr.profile_collection
+        self.profile_hidden = (coll, coll.hide_viewport) if coll else None
+    
+    def profile_apply(self):
+        '''Set simplify settings of the current level'''
+        settings = self.profile.settings()
+        for sc, (use, subdivision, particles) in self.profile_scenes.items():
+            r = sc.render
+            r.use_simplify = use or bool(settings)
+            r.simplify_subdivision = (subdivision if not settings else
+                settings[0] if not use else min(subdivision, settings[0]))
+            r.simplify_child_particles = (particles if not settings else
+                settings[1] if not use else min(particles, settings[1]))
+        if self.profile_hidden:
+            coll, hidden = self.profile_hidden
+            coll.hide_viewport = hidden or bool(settings and settings[2])
+        print(f"TTR. Playback simplify level {self.profile.level}")
+    
+    def profile_frame_set(self, sc, frame):
+        '''Set frame, adjust simplify level by its evaluation time'''
+        t1 = time.perf_counter()
+        self.frame_set(sc, frame)
+        if self.profile and self.profile.frame(time.perf_counter()-t1):
+            self.profile_apply()
+    
+    def profile_restore(self):
+        if not getattr(self, 'profile', None):
+            return
+        self.profile.level = 0
+        self.profile_apply()
+        self.profile = None
+
+class TTR_ShowSupport(TTR_ProfileSupport):
 
     def preview_quit(self, context, type='BACK'):
+        self.thumb_quit()
         if type == 'BACK':
             frame = self.frame_current
             self.frame_set(self.main_sc, frame)
@@ -93,53 +260,181 @@ class TTR_ShowSupport(TTR_Helpers):
         bpy.ops.ttr.warning('INVOKE_DEFAULT', type='INFO', msg = msg)
         self.frame_handler_add()
         self.timer_remove()
+        self.profile_restore()
         self.main_sc.use_nodes = self.use_nodes
-        bpy.ops.ttr.setup(op='UPD')
-            
-    def step_left(self, fstep):
-        self.index = self.index-fstep if self.index >= fstep > 0 else 0
-        self.main_sc.ttr.number = self.index+1
-        self.main_sc.ttr.actual = self.frames[self.index]
-        self.frame_set(self.main_sc, self.frames[self.index])
+        ttr_state.reset()
+        bpy.ops.ttr.setup(op='UPD', deferred=True)
+    
+    def show_frame(self, index, profile=True):
+        '''Evaluate the output index subframe with its Motion Blur'''
+        if profile:
+            self.profile_frame_set(self.main_sc, self.frames[index])
+        else:
+            self.frame_set(self.main_sc, self.frames[index])
         if self.sc_obj.mb:
-            samples = self.sc_obj.samples_list[self.index] if self.sc_obj.samples_list else None
-            shutter = self.sc_obj.shutter_list[self.index] if self.sc_obj.shutter_list else None
+            samples = self.sc_obj.samples_list[index] if self.sc_obj.samples_list else None
+            shutter = self.sc_obj.shutter_list[index] if self.sc_obj.shutter_list else None
             self.set_mb(self.sc_obj, shutter, samples)
+    
+    def show_index(self):
+        '''Cached thumbnail of the index while scrolling, else evaluate it'''
+        self.main_sc.ttr.number = self.index+1
+        self.main_sc.ttr.actual = self.frames[self.index]
+        thumb = (ttr_thumbs.get((self.fingerprint, self.index))
+                 if self.thumb_check() else None)
+        self.thumb_show(thumb)
+        if thumb:
+            self.thumb_step = time.perf_counter()
+        else:
+            self.show_frame(self.index)
+            self.thumb_capture(self.index)
+        self.thumb_idle = time.perf_counter()
         bpy.ops.ttr.warning('INVOKE_DEFAULT', type='INFO', msg = self.msg)
+            
+    def step_left(self, fstep):
+        self.index = self.index-fstep if self.index >= fstep > 0 else 0
+        self.show_index()
         
     def step_right(self, fstep):
         self.index = (  self.index+fstep
                         if self.index+fstep < len(self.frames)
                         else len(self.frames)-1 )
-        self.main_sc.ttr.number = self.index+1
-        self.main_sc.ttr.actual = self.frames[self.index]
-        self.frame_set(self.main_sc, self.frames[self.index])
-        if self.sc_obj.mb:
-            samples = self.sc_obj.samples_list[self.index] if self.sc_obj.samples_list else None
-            shutter = self.sc_obj.shutter_list[self.index] if self.sc_obj.shutter_list else None
-            self.set_mb(self.sc_obj, shutter, samples)
-        bpy.ops.ttr.warning('INVOKE_DEFAULT', type='INFO', msg = self.msg)    
+        self.show_index()
+    
+    def step_same(self, forward=True):
+        '''Step to the next output index showing the same source frame'''
+        index = self.ttr_store.reverse().step(self.index,
+                                    self.frames[self.index], forward=forward)
+        if index is not None:
+            self.index = index
+        self.show_index()
+    
+    #------------------------------- thumbnails --------------------------------
+    
+    def thumb_setup(self, context):
+        '''Thumbnails of the largest 3D Viewport drawn while scrolling'''
+        global ttr_thumbs
+        self.thumb_view = None
+        self.thumb_viewpoint = None # viewport the thumbnails are drawn from
+        self.thumb_step = None  # time of the step shown as a thumbnail
+        self.thumb_idle = time.perf_counter()
+        ttr = self.main_sc.ttr
+        areas = [area for area in context.window.screen.areas
+                 if area.type == 'VIEW_3D']
+        if not ttr.thumbs or not areas or bpy.app.background:
+            return
+        from gpu_extras.presets import draw_texture_2d   # not in background
+        area = max(areas, key=lambda area: area.width*area.height)
+        region = next(r for r in area.regions if r.type == 'WINDOW')
+        self.thumb_view = (area, region, area.spaces.active)
+        if ttr_thumbs is None:
+            ttr_thumbs = TTR_LRU(0, lambda offscreen: offscreen.free())
+        ttr_thumbs.clear()      # scenes could be edited since the last Show
+        ttr_thumbs.limit = ttr.thumbs_size*2**20
+        shown = self.thumb_shown = [None]
+        
+        def draw():
+            offscreen = shown[0]
+            if offscreen and bpy.context.region == region:
+                texture = (getattr(offscreen, 'texture_color', None)
+                           or offscreen.color_texture)
+                draw_texture_2d(texture, (0, 0), region.width, region.height)
+        
+        self.thumb_handler = bpy.types.SpaceView3D.draw_handler_add(
+                                            draw, (), 'WINDOW', 'POST_PIXEL')
+    
+    def thumb_show(self, offscreen):
+        if self.thumb_view:
+            self.thumb_shown[0] = offscreen
+            self.thumb_view[0].tag_redraw()
+    
+    def thumb_check(self):
+        '''
+        Drop thumbnails drawn from another viewpoint (the viewport was
+        orbited, zoomed, resized or its shading changed).
+        Returns False without thumbnails
+        '''
+        if not self.thumb_view:
+            return False
+        area, region, space = self.thumb_view
+        r3d = space.region_3d
+        viewpoint = (tuple(map(tuple, r3d.view_matrix)),
+                     tuple(map(tuple, r3d.window_matrix)),
+                     region.width, region.height, space.shading.type)
+        if viewpoint != self.thumb_viewpoint:
+            if self.thumb_step is not None:     # shown thumbnail is stale
+                self.thumb_step = None
+                self.thumb_show(None)
+                self.show_frame(self.index)
+            ttr_thumbs.clear()
+            self.thumb_viewpoint = viewpoint
+        return True
+    
+    def thumb_capture(self, index):
+        '''Draw evaluated scene into a low resolution offscreen thumbnail'''
+        if not self.thumb_check():
+            return
+        import gpu
+        area, region, space = self.thumb_view
+        width = max(1, min(region.width, self.main_sc.ttr.thumbs_width))
+        height = max(1, round(width*region.height/region.width))
+        offscreen = gpu.types.GPUOffScreen(width, height)
+        r3d = space.region_3d
+        offscreen.draw_view3d(self.main_sc, bpy.context.view_layer, space,
+                              region, r3d.view_matrix, r3d.window_matrix)
+        ttr_thumbs.put((self.fingerprint, index), offscreen, width*height*4)
+    
+    def thumb_tick(self):
+        '''
+        Timer: evaluate the shown index fully once scrolling stops,
+        then prefetch thumbnails around it one per tick
+        '''
+        if not self.thumb_check():
+            return
+        now = time.perf_counter()
+        if self.thumb_step is not None:
+            if now-self.thumb_step > ttr_settle:
+                self.thumb_step = None
+                self.show_frame(self.index)
+                self.thumb_show(None)
+                self.thumb_idle = now
+            return
+        if now-self.thumb_idle < ttr_settle:
+            return
+        for index in ttr_prefetch_order(self.index, len(self.frames)):
+            if (self.fingerprint, index) not in ttr_thumbs:
+                self.show_frame(index, profile=False)
+                self.thumb_capture(index)
+                self.show_frame(self.index, profile=False)
+                return
+    
+    def thumb_quit(self):
+        if not getattr(self, 'thumb_view', None):
+            return
+        bpy.types.SpaceView3D.draw_handler_remove(self.thumb_handler, 'WINDOW')
+        self.thumb_show(None)
+        self.thumb_view = None
     
     def show_setup(self, context):
+        ttr_state.reset()   # scenes could be changed outside of it since then
         self.frame_handler_remove()
         self.use_nodes = self.main_sc.use_nodes
         self.main_sc.use_nodes = False
+        self.profile_set()
         self.index = self.main_sc.ttr.number-1        
         #------------------- jump to the start if the coursor is below the start
         self.index = self.index if self.index >= 0 else 0
         self.main_sc.ttr.number = self.index+1
         self.main_sc.ttr.actual = self.frames[self.index]
         self.started = False
-        self.frame_set(self.main_sc, self.frames[self.index])
-        if self.sc_obj.mb:
-            samples = self.sc_obj.samples_list[self.index] if self.sc_obj.samples_list else None
-            shutter = self.sc_obj.shutter_list[self.index] if self.sc_obj.shutter_list else None
-            self.set_mb(self.sc_obj, shutter, samples)
+        self.show_frame(self.index, profile=False)
+        self.thumb_setup(context)
+        self.thumb_capture(self.index)
         self.wm = context.window_manager
         self.win = context.window
         self.timer_add()
 
-class TTR_PlaySupport(TTR_Helpers):
+class TTR_PlaySupport(TTR_ProfileSupport):
 
     def play_setup(self, context):
         self.op = bpy.types.TTR_OT_play
@@ -149,6 +444,8 @@ class TTR_PlaySupport(TTR_Helpers):
             raise StatusError ()
         self.use_nodes = self.main_sc.use_nodes
         self.main_sc.use_nodes = False
+        self.profile_set()
+        ttr_state.reset()
         self.frame_handler_remove()
         self.frame_len = len(self.frames)
         self.counter = 0
@@ -157,10 +454,275 @@ class TTR_PlaySupport(TTR_Helpers):
         self.win = context.window
         self.timer_add(tick = self.step)
 
-class TTR_CommonSupport(TTR_Helpers):
+class TTR_BakeSupport(TTR_Helpers):
+    '''Remapped animation baked into new actions keyed at timeline frames'''
+    
+    def bake_ids(self, scenes, baked=False):
+        '''
+        Animated IDs of the scenes (see scene_ids) with original
+        (or `baked`) actions.
+        Returns (ids, skipped): IDs with NLA tracks can't be baked
+        '''
+        ids, skipped = {}, []
+        for sc in scenes:
+            for id in self.scene_ids(sc):
+                ad = id and id.animation_data
+                if (not ad or not ad.action or id in ids or
+                        (ttr_bake_prop in ad.action) != baked):
+                    continue
+                if not baked and any(not t.mute for t in ad.nla_tracks):
+                    skipped.append(id.name)
+                    continue
+                ids[id] = ad.action
+        return list(ids), skipped
+    
+    def bake_action(self, id, frames, start, tolerance):
+        '''
+        New action of the ID action FCurves evaluated at remapped frames.
+        None if there is nothing to bake (only TTR curves of the scene)
+        '''
+        action = id.animation_data.action
+        fcurves = [fc for fc in action.fcurves if not fc.mute and not
+                   (isinstance(id, bpy.types.Scene)
+                    and fc.data_path.startswith("ttr."))]
+        if not fcurves:
+            return None
+        baked = bpy.data.actions.new(f"{action.name}.TTR")
+        baked[ttr_bake_prop] = action.name
+        for fc in fcurves:
+            values = np.fromiter(map(fc.evaluate, frames), dtype=np.float64,
+                                 count=len(frames))
+            x, y = ttr_bake_keys(values, start, tolerance)
+            bfc = baked.fcurves.new(fc.data_path, index=fc.array_index,
+                            action_group=fc.group.name if fc.group else "")
+            bfc.keyframe_points.add(len(x))
+            bfc.keyframe_points.foreach_set("co", np.column_stack((x, y)).ravel())
+            bfc.keyframe_points.foreach_set("interpolation", [ttr_linear]*len(x))
+            bfc.update()
+        baked[ttr_fake_prop] = action.use_fake_user
+        action.use_fake_user = True     # kept while the baked one is used
+        id.animation_data.action = baked
+        return baked
+    
+    def bake_restore(self, scenes):
+        '''Assign original actions back and remove baked ones'''
+        ids, skipped = self.bake_ids(scenes, baked=True)
+        for id in ids:
+            baked = id.animation_data.action
+            original = bpy.data.actions.get(baked[ttr_bake_prop])
+            if original:
+                id.animation_data.action = original
+                original.use_fake_user = bool(baked.get(ttr_fake_prop,
+                                                        original.use_fake_user))
+                if not baked.users:
+                    bpy.data.actions.remove(baked)
+        return ids
+
+class TTR_SimSupport(TTR_Helpers):
+    '''Simulation caches baked before rendering out of order subframes'''
+    
+    def sim_caches(self, scenes):
+        '''
+        (scene, name, point cache) of the scenes simulations: rigid body
+        worlds, cloth, soft bodies, dynamic paint and particles.
+        Returns (caches, fluids): Fluid domains have their own bake
+        '''
+        caches, fluids, seen = [], [], set()
+        
+        def add(sc, name, pc):
+            if pc and pc.as_pointer() not in seen:
+                seen.add(pc.as_pointer())
+                caches.append((sc, name, pc))
+        
+        for sc in scenes:
+            rbw = sc.rigidbody_world
+            if rbw and rbw.enabled:
+                add(sc, f"{sc.name}: Rigid Body World", rbw.point_cache)
+            for obj in sc.objects:
+                for md in obj.modifiers:
+                    if md.type == 'FLUID' and md.fluid_type == 'DOMAIN':
+                        fluids.append(f"{obj.name}: {md.name}")
+                    elif md.type == 'DYNAMIC_PAINT' and md.canvas_settings:
+                        for surface in md.canvas_settings.canvas_surfaces:
+                            add(sc, f"{obj.name}: {surface.name}",
+                                surface.point_cache)
+                    else:   # cloth, soft body
+                        add(sc, f"{obj.name}: {md.name}",
+                            getattr(md, 'point_cache', None))
+                for ps in obj.particle_systems:
+                    if ps.settings.type == 'HAIR' and not ps.use_hair_dynamics:
+                        continue
+                    add(sc, f"{obj.name}: {ps.name}", ps.point_cache)
+        return caches, fluids
+    
+    def sim_bake(self, scenes, frames):
+        '''
+        Bake unbaked simulation caches forward once over their own frame
+        range if the frames go backward or jump. Caches hold whole frames
+        only: each one is cached (step 1, the cache's step is restored
+        after the bake) and Blender interpolates remapped subframes between
+        them. Frames past the cache end keep its last state, as unbaked.
+        Returns (baked, fluids) names that would be re-simulated
+        '''
+        first, last, backward, jumps = ttr_sim_range(frames)
+        if not backward and not jumps:
+            return [], []
+        caches, fluids = self.sim_caches(scenes)
+        baked = []
+        for sc, name, pc in caches:
+            if pc.is_baked or pc.use_external:
+                continue
+            step = pc.frame_step
+            pc.frame_step = 1
+            try:
+                if hasattr(bpy.context, 'temp_override'):
+                    with bpy.context.temp_override(scene=sc, point_cache=pc):
+                        bpy.ops.ptcache.bake(bake=True)
+                else:
+                    bpy.ops.ptcache.bake({'scene': sc, 'point_cache': pc},
+                                                                    bake=True)
+            finally:
+                pc.frame_step = step
+            baked.append(name)
+        return baked, fluids
+    
+    def sim_report(self, baked, fluids):
+        '''Pre-bake result as a message, empty if nothing re-simulates'''
+        msg = []
+        if baked:
+            msg.append(f"Simulations baked instead of re-simulating at\
+ out of order frames: {', '.join(baked)}")
+        if fluids:
+            msg.append(f"Bake Fluid domains to avoid re-simulating them:\
+ {', '.join(fluids)}")
+        return '. '.join(msg)
+    
+    def sim_prebake(self, frames):
+        '''Pre-bake simulations for the render if enabled'''
+        if not self.main_sc.ttr.sim_bake:
+            return
+        msg = self.sim_report(*self.sim_bake(
+                            [sc_obj.scene for sc_obj in self.scenes], frames))
+        if msg:
+            print(f"TTR. {msg}")
+
+class TTR_CommonSupport(TTR_SimSupport):
+    
+    def persistent_data_set(self):
+        '''Keep Cycles scenes data between remapped frames if enabled'''
+        self.persistent_data = {}
+        if self.main_sc.ttr.persistent:
+            for sc_obj in self.scenes:
+                if sc_obj.engine == 'CYCLES':
+                    r = sc_obj.scene.render
+                    self.persistent_data[sc_obj.scene] = r.use_persistent_data
+                    r.use_persistent_data = True
+        ttr_telemetry.reset(persistent=bool(self.persistent_data))
+        ttr_state.reset()
+    
+    def persistent_data_restore(self):
+        '''Restore user's Persistent Data settings'''
+        for sc, use in getattr(self, 'persistent_data', {}).items():
+            sc.render.use_persistent_data = use
+        self.persistent_data = {}
+    
+    #----------------------------- render profile ------------------------------
+    
+    def render_profile_get(self):
+        '''Render profile named by the operator, else the active one if used'''
+        ttr = self.main_sc.ttr
+        name = getattr(self, 'render_profile', "")
+        if name:
+            return ttr.render_profiles.get(name)
+        if (ttr.use_render_profile and
+                0 <= ttr.render_profile_index < len(ttr.render_profiles)):
+            return ttr.render_profiles[ttr.render_profile_index]
+        return None
+    
+    def render_profile_set(self):
+        '''Apply the render profile to all the scenes for the whole render'''
+        self.render_profile_data = []   # (owner, attribute, original value)
+        self.mb_cap = 0
+        profile = self.render_profile_get()
+        if not profile:
+            return
+        
+        def set(owner, attr, value):
+            self.render_profile_data.append((owner, attr, getattr(owner, attr)))
+            setattr(owner, attr, value)
+        
+        for sc_obj in self.scenes:
+            sc = sc_obj.scene
+            set(sc.render, "resolution_percentage", profile.resolution)
+            if profile.samples and sc_obj.engine == 'CYCLES':
+                set(sc.cycles, "samples", profile.samples)
+            elif profile.samples and sc_obj.engine.startswith('BLENDER_EEVEE'):
+                set(sc.eevee, "taa_render_samples", profile.samples)
+            if profile.simplify:
+                set(sc.render, "use_simplify", True)
+                set(sc.render, "simplify_subdivision_render",
+                                                profile.simplify_subdivision)
+                set(sc.render, "simplify_child_particles_render",
+                                                profile.simplify_particles)
+        if profile.suffix:
+            set(self.main_sc.render, "filepath", self.path+profile.suffix)
+            set(self, "path", self.path+profile.suffix)
+        self.mb_cap = profile.mb_samples
+        print(f"TTR. Render profile: {profile.name}")
+    
+    def render_profile_samples(self, samples):
+        '''Motion Blur samples capped by the render profile'''
+        cap = getattr(self, 'mb_cap', 0)
+        return min(samples, cap) if cap and samples else samples
+    
+    def render_profile_restore(self):
+        '''Restore render settings changed by the render profile'''
+        for owner, attr, value in reversed(
+                                    getattr(self, 'render_profile_data', [])):
+            setattr(owner, attr, value)
+        self.render_profile_data = []
+        self.mb_cap = 0
+    
+    def telemetry_handler_add(self):
+        '''Time scene sync and sampling of each remapped frame render'''
+        _ttr_store = self.ttr_store
+        def start(scene, *args):
+            ttr_telemetry.frame_start(_ttr_store.index,
+                                                    scene.frame_current_final)
+        
+        def stats(text, *args):
+            ttr_telemetry.stats(str(text))
+        
+        def end(scene, *args):
+            fr = ttr_telemetry.frame_end()
+            if fr:
+                print(f"TTR. Output index {fr.index}: sync {fr.sync:.2f}s,\
+ render {fr.render:.2f}s")
+        
+        self.telemetry = (start, stats, end)
+        bpy.app.handlers.render_pre.append(start)
+        bpy.app.handlers.render_stats.append(stats)
+        bpy.app.handlers.render_complete.append(end)
+    
+    def telemetry_handler_remove(self):
+        if not getattr(self, 'telemetry', None):
+            return
+        start, stats, end = self.telemetry
+        for handlers, func in ((bpy.app.handlers.render_pre, start),
+                               (bpy.app.handlers.render_stats, stats),
+                               (bpy.app.handlers.render_complete, end)):
+            while func in handlers:
+                handlers.remove(func)
+        self.telemetry = None
+        report = ttr_telemetry.report()
+        if report:
+            print(f"TTR. {report}")
     
     def structure(self, context):
-        self.indicies = list(range(len(self.frames)))
+        ttr_state.reset()   # scenes could be changed outside of it since then
+        self.indicies = (TTR_Stream(lambda n: n, len(self.frames))
+                         if isinstance(self.frames, TTR_Stream) else
+                         list(range(len(self.frames))))
         self.use_nodes = self.main_sc.use_nodes
         self.path = self.main_sc.render.filepath
         self.wm = context.window_manager
@@ -179,12 +741,217 @@ class TTR_CommonSupport(TTR_Helpers):
                 try: bpy.ops.ttr.fixnames(clear=True)
                 except: print("TTR Render. Could not clear files")
                 self.render_handler_remove()
+        if type == "render":
+            self.persistent_data_restore()
+            self.interp_cleanup()
         self.main_sc.render.filepath = self.path
+        self.render_profile_restore()
+        ttr_state.reset()
         self.frame_handler_add()
         if type == "viewport":
-            bpy.ops.ttr.update()
+            bpy.ops.ttr.update(deferred=True)
+    
+    def render_queue(self, indices):
+        '''Output indices reordered by the chosen Render Order'''
+        indices = list(indices)
+        queue = ttr_render_order([self.frames[n] for n in indices],
+                                 self.main_sc.ttr.order, self.frame_current)
+        return [indices[n] for n in queue]
+    
+    def _queued(self, items, queue):
+        if isinstance(items, TTR_Stream):
+            return TTR_Stream(lambda n: items[queue[n]], len(queue))
+        return [items[n] for n in queue]
+    
+    def _requeue(self, queue):
+        '''Frames, their output indices and Motion Blur lists in queue order'''
+        self.frames = self._queued(self.frames, queue)
+        self.indicies = self._queued(self.indicies, queue)
+        for sc_obj in self.scenes:
+            if sc_obj.shutter_list:
+                sc_obj.shutter_list = self._queued(sc_obj.shutter_list, queue)
+                sc_obj.samples_list = self._queued(sc_obj.samples_list, queue)
+    
+    def render_order(self):
+        '''
+        Reorder the animation render queue: frames, their output indices
+        and Motion Blur lists are permuted together
+        '''
+        self.queue_len = len(self.frames)
+        self.done = []
+        if not self.animation or self.main_sc.ttr.order == 'OUTPUT':
+            return
+        self._requeue(self.render_queue(range(len(self.frames))))
+    
+    def progress_done(self, index):
+        '''Record rendered output index in the render progress manifest'''
+        order = self.main_sc.ttr.order
+        if order == 'OUTPUT':
+            return
+        self.done.append(index)
+        path = pathlib.Path(bpy.path.abspath(self.path)).parent
+        try: ttr_progress_save(str(path / "ttr_progress.json"), self.done,
+                               self.main_sc.ttr.update, self.skip_start, order)
+        except OSError as err:
+            print(f"TTR. Could not save render progress: {err}")
+    
+    #------------------------------- render cache ------------------------------
+    
+    def output_file(self, index):
+        '''Absolute path of the main render output of the output index'''
+        r = self.main_sc.render
+        return (bpy.path.abspath(self.path+f'{int(index+self.skip_start+1):04d}')
+                + (r.file_extension if r.use_file_extension else ''))
+    
+    def cache_content(self):
+        '''
+        Fingerprint of what the scenes render: settings, geometry and
+        animation of their IDs except the scenes themselves (their settings
+        are in the cache state) and TTR curves of the scene actions.
+        Saving the file or editing the speed curve keeps it
+        '''
+        items, seen = [], set()
+        for sc_obj in self.scenes:
+            for id in self.scene_ids(sc_obj.scene):
+                if id is None or id in seen:
+                    continue
+                seen.add(id)
+                ad = id.animation_data
+                fcurves = [fc for fc in (ad.action.fcurves if ad and ad.action
+                           else ()) if not (isinstance(id, bpy.types.Scene)
+                                            and fc.data_path.startswith("ttr."))]
+                drivers = list(ad.drivers) if ad else []
+                items.append((type(id).__name__, id.name))
+                for fc in fcurves + drivers:
+                    items.append((fc.data_path, fc.array_index, fc.mute,
+                                  len(fc.modifiers), fc.driver and
+                                  (fc.driver.type, fc.driver.expression,
+                                   ttr_rna_values(fc.driver, depth=3))))
+                    items += self.cache_arrays(fc.keyframe_points,
+                                    ("co", "handle_left", "handle_right"), 2)
+                if isinstance(id, bpy.types.Scene):
+                    continue
+                animated = {fc.data_path for fc in fcurves + drivers}
+                tree = isinstance(id, bpy.types.NodeTree)
+                mesh = isinstance(id, bpy.types.Mesh)
+                items.append(ttr_rna_values(id, animated,
+                                            3 if tree else 1 if mesh else 2))
+                if mesh:
+                    items += self.cache_arrays(id.vertices, ("co",), 3)
+                    items += self.cache_arrays(id.loops, ("vertex_index",), 1,
+                                                  np.int32)
+                    items += self.cache_arrays(id.polygons,
+                                ("loop_start", "material_index"), 1, np.int32)
+                    for uv in id.uv_layers:
+                        items += self.cache_arrays(uv.data, ("uv",), 2)
+        return ttr_fingerprint(*items)
+    
+    def cache_arrays(self, items, attrs, size, dtype=np.float32):
+        '''Raw bytes of the collection attributes for content fingerprints'''
+        arrays = []
+        for attr in attrs:
+            array = np.empty(len(items)*size, dtype=dtype)
+            items.foreach_get(attr, array)
+            arrays.append(array.tobytes())
+        return arrays
+    
+    def cache_state(self):
+        '''Fingerprint of the scenes state rendered images depend on'''
+        r = self.main_sc.render
+        im = r.image_settings
+        return ttr_fingerprint(bpy.data.filepath, self.cache_content(),
+            r.resolution_x,
+            r.resolution_y, r.resolution_percentage, r.use_compositing,
+            im.file_format, im.color_mode, im.color_depth,
+            [(sc_obj.name, sc_obj.engine, self.get_samples(sc_obj.scene),
+              sc_obj.scene.render.use_simplify and
+              (sc_obj.scene.render.simplify_subdivision_render,
+               sc_obj.scene.render.simplify_child_particles_render),
+              sc_obj.scene.camera and sc_obj.scene.camera.name,
+              [vl.name for vl in sc_obj.scene.view_layers if vl.use])
+             for sc_obj in self.scenes])
+    
+    def cache_open(self):
+        '''
+        Render cache of the main output if enabled. File Output nodes
+        write files the cache doesn't know about, so they disable it
+        '''
+        self.cache = None
+        self.cache_keys = {}
+        ttr = self.main_sc.ttr
+        if not ttr.cache:
+            return
+        if (self.main_sc.use_nodes and self.main_sc.node_tree and
+                any(nd.type == 'OUTPUT_FILE' and not nd.mute
+                    for nd in self.main_sc.node_tree.nodes)):
+            print("TTR. Render cache is off: File Output nodes are used")
+            return
+        r = self.main_sc.render
+        self.cache = TTR_RenderCache(bpy.path.abspath(ttr.cache_dir),
+            ttr.cache_size*2**20, self.cache_state(),
+            r.file_extension if r.use_file_extension else '', ttr.cache_steps)
+    
+    def cache_lookup(self, index, frame, mb):
+        '''Place cached image of the output index. Returns True on a hit'''
+        if not self.cache:
+            return False
+        key = self.cache.key(frame, mb)
+        dst = self.output_file(index)
+        try: hit = self.cache.get(key, dst)
+        except OSError as err:
+            print(f"TTR. Render cache read failed: {err}")
+            hit = False
+        if hit:
+            print(f"TTR. Output frame {int(index+self.skip_start+1):04d}\
+ reused from render cache")
+            return True
+        self.cache_keys[index] = key
+        return False
+    
+    def cache_store(self, index):
+        '''Copy rendered image of the output index into the render cache'''
+        key = self.cache_keys.pop(index, None) if self.cache else None
+        if key is None:
+            return
+        try: self.cache.put(key, self.output_file(index))
+        except OSError as err:
+            print(f"TTR. Render cache write failed: {err}")
+    
+    def cache_mb(self, n):
+        '''Motion Blur settings of all the scenes at the queue position'''
+        return [(sc_obj.shutter_list[n],
+                 self.render_profile_samples(sc_obj.samples_list[n]))
+                for sc_obj in self.scenes if sc_obj.shutter_list]
+    
+    def cache_queue(self):
+        '''Leave only output indices missing in the render cache queued'''
+        self.cache, self.cache_keys = None, {}
+        if self.animation:
+            self.cache_open()
+        if not self.cache:
+            return
+        misses = []
+        for n, index in enumerate(self.indicies):
+            if self.cache_lookup(index, self.frames[n], self.cache_mb(n)):
+                self.progress_done(index)
+            else:
+                misses.append(n)
+        if len(misses) == len(self.frames):
+            return
+        self._requeue(misses)
+        self.queue_len = len(self.frames)
+        print(f"TTR. {self.cache.report()}")
     
     def frame_prepare(self):        
+        # ---- File Outputs of the rendered frame get its output index ---------
+        if self.bl_idname == 'TTR_OT_render' and self.ttr_store.index is not None:
+            bpy.ops.ttr.fixnames()
+            if self.animation:
+                self.cache_store(self.ttr_store.index)
+                self.progress_done(self.ttr_store.index)
+        if getattr(self, 'interp', None) and not self.interp_next():
+            self.ttr_store.finished = True  # the rest is interpolated
+            return
         if self.animation:
             self.frame = self.frames.pop(0)
             self.ttr_store.index = self.indicies.pop(0)
@@ -193,10 +960,12 @@ class TTR_CommonSupport(TTR_Helpers):
             self.frame = self.frames[num-1] if num else self.frames[0]
             self.ttr_store.index = num-1 if num else 0
         self.main_sc.render.filepath = self.path + f'{int(self.ttr_store.index+self.skip_start+1):04d}'
-        if self.bl_idname == 'TTR_OT_render' and self.ttr_store.index:
-            bpy.ops.ttr.fixnames()
+        if self.bl_idname == 'TTR_OT_render' and self.animation:
+            print(f"TTR. Rendering {self.queue_len-len(self.frames)} of\
+ {self.queue_len}: output frame {int(self.ttr_store.index+self.skip_start+1):04d},\
+ actual frame {self.frame:.3f}")
+        # -- Motion Blur is set first, so each scene is evaluated only once ---
         for sc_obj in self.scenes:
-            self.frame_set(sc_obj.scene, self.frame)
             if sc_obj.shutter_list:
                 if self.animation:
                     shutter = sc_obj.shutter_list.pop(0)
@@ -204,7 +973,21 @@ class TTR_CommonSupport(TTR_Helpers):
                 else:
                     shutter = sc_obj.shutter_list[self.ttr_store.index]
                     samples = sc_obj.samples_list[self.ttr_store.index]
-                self.set_mb(sc_obj, shutter, samples)
+                self.set_mb(sc_obj, shutter,
+                            self.render_profile_samples(samples), ttr_state)
+            self.state_frame_set(sc_obj.scene, self.frame)
+                    
+    def restore_from_tmb(self, context):
+        '''Prepare project for instant native render'''
+        
+        sc = context.scene
+        ttr_state.reset()
+        if not self.main_sc.node_tree or not self.main_sc.node_tree.nodes:
+            return
+        #------------------------------- Turn off all TMB Mix (Alpha Over) nodes
+        for node in self.main_sc.node_tree.nodes:
+            if node.name.startswith('TMB_Mix') and node.type == 'ALPHAOVER':
+                node.inputs[0].default_value = 0
                     
     def setup_and_abort(self, context):
         if self.main_sc.render.image_settings.file_format in (
@@ -221,6 +1004,189 @@ class TTR_CommonSupport(TTR_Helpers):
             bpy.ops.ttr.warning('INVOKE_DEFAULT', type = 'ERROR', msg=msg)
             raise StatusError(msg)
 
+    #-------------------------- interpolated frames ----------------------------
+    
+    def interp_setup(self):
+        '''
+        Write the Vector pass of rendered frames with a temporary File Output
+        node if Interpolation is on. Returns False if it can't be used
+        '''
+        self.interp = None
+        sc = self.main_sc
+        if not sc.ttr.interpolate or self.tmb:
+            return False
+        if sc.render.engine == 'CYCLES' and sc.render.use_motion_blur:
+            print("TTR. Interpolation is off: no Vector pass with Motion Blur")
+            return False
+        self.interp_restore = (sc.use_nodes, sc.render.use_compositing, None)
+        sc.use_nodes = True
+        sc.render.use_compositing = True
+        tree = sc.node_tree
+        rl = next((nd for nd in tree.nodes if nd.type == 'R_LAYERS'
+                   and not nd.mute and nd.scene in (None, sc)), None)
+        vl = rl and sc.view_layers.get(rl.layer)
+        if vl:
+            self.interp_restore = self.interp_restore[:2]+(
+                                                (vl, vl.use_pass_vector),)
+            vl.use_pass_vector = True
+        socket = rl and rl.outputs.get("Vector")
+        if not socket or not socket.enabled:
+            print("TTR. Interpolation is off: render engine has no Vector pass")
+            self.interp_cleanup()
+            return False
+        node = tree.nodes.new('CompositorNodeOutputFile')
+        node.name = node.label = "TTR_Vectors"
+        node.base_path = tempfile.mkdtemp(prefix="ttr_vectors_")
+        node.format.file_format = 'OPEN_EXR'
+        node.format.color_depth = '32'
+        node.format.color_mode = 'RGBA'
+        node.file_slots[0].path = "vectors_"
+        tree.links.new(socket, node.inputs[0])
+        self.interp = node
+        return True
+    
+    def interp_cleanup(self):
+        sc = self.main_sc
+        if getattr(self, 'interp', None):
+            shutil.rmtree(self.interp.base_path, ignore_errors=True)
+            sc.node_tree.nodes.remove(self.interp)
+            self.interp = None
+        if not getattr(self, 'interp_restore', None):
+            return
+        use_nodes, use_compositing, layer = self.interp_restore
+        if layer:
+            layer[0].use_pass_vector = layer[1]
+        sc.render.use_compositing = use_compositing
+        sc.use_nodes = use_nodes
+        self.interp_restore = None
+    
+    def interp_load(self, path):
+        '''Image pixels as (height, width, 4) array and whether it is float'''
+        try: img = bpy.data.images.load(path, check_existing=False)
+        except RuntimeError:
+            return None, False
+        try:
+            w, h = img.size
+            pixels = np.empty(w*h*img.channels, dtype=np.float32)
+            img.pixels.foreach_get(pixels)
+            pixels = pixels.reshape(h, w, img.channels)
+            if img.channels < 4:
+                pad = np.ones((h, w, 4-img.channels), dtype=np.float32)
+                pixels = np.concatenate((pixels, pad), axis=2)
+            return pixels, img.is_float
+        finally:
+            bpy.data.images.remove(img)
+    
+    def interp_save(self, pixels, is_float, path):
+        '''
+        Save pixels with the render output image settings (format, depth,
+        color mode, codec). They are read from rendered files, so the view
+        transform is already applied: Standard view while saving
+        '''
+        sc = self.main_sc
+        view = sc.view_settings
+        restore = (view.view_transform, view.look, view.exposure, view.gamma,
+                   view.use_curve_mapping)
+        h, w = pixels.shape[:2]
+        img = bpy.data.images.new("TTR_Interpolated", w, h, alpha=True,
+                                  float_buffer=is_float)
+        try:
+            img.pixels.foreach_set(pixels.astype(np.float32).ravel())
+            view.view_transform, view.look = 'Standard', 'None'
+            view.exposure, view.gamma, view.use_curve_mapping = 0, 1, False
+            img.save_render(path, scene=sc)
+        finally:
+            (view.view_transform, view.look, view.exposure, view.gamma,
+             view.use_curve_mapping) = restore
+            bpy.data.images.remove(img)
+    
+    def interp_vectors(self):
+        '''
+        Vector pass of the last render. The File Output node names files by
+        its own frame format and File Output names are fixed afterwards,
+        so it is whatever the node wrote into its own folder
+        '''
+        files = sorted(pathlib.Path(self.interp.base_path).glob('*'),
+                       key=lambda f: f.stat().st_mtime)
+        vectors = self.interp_load(str(files[-1]))[0] if files else None
+        for f in files:
+            f.unlink()
+        return vectors
+    
+    def interp_data(self, index, vectors):
+        '''Rendered key frame as (pixels, is_float, vectors) or None'''
+        pixels, is_float = self.interp_load(self.output_file(index))
+        if pixels is None or vectors is None or pixels.shape != vectors.shape:
+            return None
+        return pixels, is_float, vectors
+    
+    def interp_frame(self, index, frame, key_a, key_b):
+        '''
+        Save output index at the source frame interpolated from key frames
+        (frame, data). Returns False if it has to be rendered
+        '''
+        (frame_a, data_a), (frame_b, data_b) = key_a, key_b
+        if not data_a or not data_b:
+            return False
+        pixels, error = ttr_interpolate(data_a[0], data_a[2], frame_a,
+                                        data_b[0], data_b[2], frame_b, frame)
+        if error > self.main_sc.ttr.interp_error:
+            print(f"TTR. Interpolation error {error:.4f}, rendering")
+            return False
+        self.interp_save(pixels, data_a[1], self.output_file(index))
+        return True
+    
+    def interp_queue(self):
+        '''
+        Modal render queue: key frames in output order, each followed by
+        the frames between it and the previous key
+        '''
+        order = sorted(range(len(self.frames)), key=lambda n: self.indicies[n])
+        self.interp_frames = {self.indicies[n] : self.frames[n] for n in order}
+        keys = ttr_interp_keys([self.frames[n] for n in order],
+                               self.main_sc.ttr.interp_stride)
+        self.interp_keys = {}   # last two rendered keys (frame, data) by index
+        self.interp_pairs = {}  # keys output indices by in-between index
+        queue = keys[:1]
+        for a, b in zip(keys, keys[1:]):
+            queue.append(b)
+            for n in range(a+1, b):
+                queue.append(n)
+                self.interp_pairs[self.indicies[order[n]]] = (
+                        self.indicies[order[a]], self.indicies[order[b]])
+        self._requeue([order[n] for n in queue])
+        self.queue_len = len(self.frames)
+    
+    def interp_next(self):
+        '''
+        Modal render step: keep the key frame just rendered, interpolate
+        queued frames between rendered keys. False if nothing is left to render
+        '''
+        index = self.ttr_store.index
+        vectors = self.interp_vectors()
+        if index is not None and index not in self.interp_pairs:
+            self.interp_keys[index] = (self.interp_frames[index],
+                                       self.interp_data(index, vectors))
+            while len(self.interp_keys) > 2:
+                del self.interp_keys[next(iter(self.interp_keys))]
+        while len(self.frames) and self.indicies[0] in self.interp_pairs:
+            index, frame = self.indicies[0], self.frames[0]
+            a, b = self.interp_pairs[index]
+            if not self.interp_frame(index, frame, self.interp_keys[a],
+                                     self.interp_keys[b]):
+                break   # rendered next
+            self.cache_keys.pop(index, None)
+            self.progress_done(index)
+            print(f"TTR. Interpolated output frame\
+ {int(index+self.skip_start+1):04d}, actual frame {frame:.3f}")
+            self.frames.pop(0)
+            self.indicies.pop(0)
+            for sc_obj in self.scenes:
+                if sc_obj.shutter_list:
+                    sc_obj.shutter_list.pop(0)
+                    sc_obj.samples_list.pop(0)
+        return bool(len(self.frames))
+
 class TTR_FoSupport(TTR_Helpers):
         
     def fix_prefix(self, fo):
@@ -248,7 +1214,7 @@ class TTR_FoNamesSupport(TTR_CommonSupport):
     def fix_fp_name(self, name): # ----------- TTR fix index in file name  ---------------
         '''Change filepath according to True Time Remapping add-on settings'''
         name_list = name.split('.')
-        name_list[-2] = name_list[-2][:-4]+f'{int(self.ttr_store.index+self.skip_start):04d}'
+        name_list[-2] = name_list[-2][:-4]+f'{int(self.ttr_store.index+self.skip_start+1):04d}'
         new_name = ''
         for i in name_list:
             new_name+=i
@@ -285,6 +1251,104 @@ class TTR_FoNamesSupport(TTR_CommonSupport):
                 if child.is_file() and self.fpth_prefix in ch_path:
                     child.unlink()
 
+class TTR_BatchSupport(TTR_FoNamesSupport):
+    '''Blocking render of chosen output frames. Works in background mode'''
+    
+    def batch_setup(self, context):
+        self.setup_and_abort(context)
+        self.path = self.main_sc.render.filepath
+        self.frame_handler_remove()
+        bpy.ops.ttr.fo_prefixes()
+        self.done = []
+        self.persistent_data_set()
+        self.telemetry_handler_add()
+    
+    def batch_frame(self, index):
+        '''Set scenes frame, Motion Blur and filepath for output index'''
+        self.frame = self.frames[index]
+        self.main_sc.render.filepath = self.path + f'{int(index+self.skip_start+1):04d}'
+        for sc_obj in self.scenes:
+            if sc_obj.shutter_list:
+                self.set_mb(sc_obj, sc_obj.shutter_list[index],
+                    self.render_profile_samples(sc_obj.samples_list[index]),
+                    ttr_state)
+            self.state_frame_set(sc_obj.scene, self.frame)
+    
+    def batch_index(self, index):
+        '''Render the output index and store it in the render cache'''
+        self.batch_frame(index)
+        bpy.ops.render.render(write_still=True)
+        self.ttr_store.index = index
+        self.fix_files_names()
+        self.cache_store(index)
+    
+    def batch_render(self, indices):
+        indices = self.render_queue(indices)
+        self.cache_open()
+        self.sim_prebake([self.frames[n] for n in indices])
+        if self.interp_setup():
+            try: self.interp_render(sorted(indices))
+            finally: self.interp_cleanup()
+            return
+        for n, index in enumerate(indices):
+            if self.cache_lookup(index, self.frames[index], self.cache_mb(index)):
+                self.progress_done(index)
+                continue
+            self.batch_index(index)
+            self.progress_done(index)
+            print(f"TTR. Rendered {n+1} of {len(indices)}: output frame\
+ {int(index+self.skip_start+1):04d}, actual frame {self.frame:.3f}")
+    
+    #-------------------------- interpolated frames ----------------------------
+    
+    def interp_key(self, index):
+        '''Render key frame. Returns (frame, data) for interp_frame'''
+        self.batch_index(index)
+        self.progress_done(index)
+        print(f"TTR. Rendered key output frame\
+ {int(index+self.skip_start+1):04d}, actual frame {self.frame:.3f}")
+        return self.frames[index], self.interp_data(index, self.interp_vectors())
+    
+    def interp_between(self, index, key_a, key_b):
+        '''Interpolate output index from key frames (frame, data) or render'''
+        frame = self.frames[index]
+        if self.cache_lookup(index, frame, self.cache_mb(index)):
+            self.progress_done(index)
+            return
+        interpolated = self.interp_frame(index, frame, key_a, key_b)
+        if not interpolated:
+            self.batch_index(index)
+        self.progress_done(index)
+        print(f"TTR. {'Interpolated' if interpolated else 'Rendered'}\
+ output frame {int(index+self.skip_start+1):04d}, actual frame {frame:.3f}")
+    
+    def interp_render(self, indices):
+        '''Render key frames, interpolate output frames between them'''
+        keys = ttr_interp_keys([self.frames[n] for n in indices],
+                               self.main_sc.ttr.interp_stride)
+        prev, prev_key = None, None
+        for k in keys:
+            key = self.interp_key(indices[k])
+            if prev is not None:
+                for n in range(prev+1, k):
+                    self.interp_between(indices[n], prev_key, key)
+            prev, prev_key = k, key
+    
+    def batch_cleanup(self):
+        self.telemetry_handler_remove()
+        self.persistent_data_restore()
+        bpy.ops.ttr.fo_prefixes(on=False)
+        self.clear_if_fo_remains()
+        self.frame_set(self.main_sc, self.frame_current)
+        for sc_obj in self.scenes:
+            self.frame_set(sc_obj.scene, sc_obj.start_frame)
+            if sc_obj.mb:
+                self.set_mb(sc_obj, sc_obj.shutter, sc_obj.samples)
+        self.main_sc.render.filepath = self.path
+        self.render_profile_restore()
+        ttr_state.reset()
+        self.frame_handler_add()
+
 class TTR_RenderSupport(TTR_CommonSupport):
     
     def __init__(self):
@@ -302,10 +1366,18 @@ class TTR_RenderSupport(TTR_CommonSupport):
             self.t2 = time.perf_counter()
             total_time = str(datetime.timedelta(seconds=(self.t2-self.t1)))
             msg = f'Total Render Time: {total_time[:-3]}'
+            report = ttr_telemetry.report()
+            if report:
+                msg += f'. {report}'
+            if getattr(self, 'cache', None) and self.cache.report():
+                msg += f'. {self.cache.report()}'
             bpy.ops.ttr.warning('INVOKE_DEFAULT', type = "INFO", msg = msg)
             bpy.ops.ttr.fo_prefixes(on=False)
             try: bpy.ops.ttr.fixnames()
             except AssertionError: print('TTR. No files to fix names')
+            if self.animation and self.ttr_store and self.ttr_store.finished:
+                self.cache_store(self.ttr_store.index)
+                self.progress_done(self.ttr_store.index)
             try: self.cleanup()
             except: print('TTR. Render cleanup failed')
 
@@ -326,8 +1398,10 @@ class TTR_RenderSupport(TTR_CommonSupport):
         self.final = final
         bpy.app.handlers.render_pre.append(self.pre)
         bpy.app.handlers.render_complete.append(self.complete)
+        self.telemetry_handler_add()
         
     def render_handler_remove(self):
+        self.telemetry_handler_remove()
         while self.complete in bpy.app.handlers.render_complete:
             bpy.app.handlers.render_complete.remove(self.complete)
         while self.final in bpy.app.handlers.render_complete:
@@ -341,17 +1415,7 @@ class TTR_RenderSupport(TTR_CommonSupport):
         while self.final in bpy.app.handlers.render_complete:
             bpy.app.handlers.render_complete.remove(self.final)
         bpy.app.handlers.render_complete.append(self.final)
-        
-    def restore_from_tmb(self, context):
-        '''Prepare project for instant native render'''
-        
-        sc = context.scene
-        if not self.main_sc.node_tree or not self.main_sc.node_tree.nodes:
-            return
-        #------------------------------- Turn off all TMB Mix (Alpha Over) nodes
-        for node in self.main_sc.node_tree.nodes:
-            if node.name.startswith('TMB_Mix') and node.type == 'ALPHAOVER':
-                node.inputs[0].default_value = 0
+
     
     def render(self):
         bpy.ops.render.render('INVOKE_DEFAULT', animation = False,
@@ -361,8 +1425,17 @@ class TTR_RenderSupport(TTR_CommonSupport):
         try: self.setup_and_abort(context)
         except ttr_exceptions: return {'FINISHED'}
         self.structure(context)
+        self.render_profile_set()
+        self.render_order()
+        self.cache_queue()
+        if self.animation:
+            self.sim_prebake(list(self.frames))
+        self.persistent_data_set()
         self.render_handler_add()
         bpy.ops.ttr.fo_prefixes()
+        self.interp = None
+        if self.animation and self.interp_setup():
+            self.interp_queue()
         self.ttr_store.ready = True
         self.ttr_store.started = False
         self.ttr_store.finished = False
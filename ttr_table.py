@@ -0,0 +1,367 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Remap table storage. Doesn't depend on bpy
+#  (c) 2020 Andrey Sokolov (so_records)
+
+import json, struct, hashlib, csv, os, numpy as np
+
+TTR_MAGIC = b'TTRT'         # remap table binary magic
+TTR_VERSION = 1             # remap table binary layout version
+TTR_HEADER = '<4sHI'        # magic, version, meta length
+
+class TableError(Exception): pass
+
+def ttr_fingerprint(*items):
+    '''Hash of remap table inputs. Items must have stable repr'''
+    sha = hashlib.sha1()
+    for item in items:
+        sha.update(item if isinstance(item, bytes) else repr(item).encode())
+    return sha.hexdigest()
+
+class TTR_TableScene():
+    '''Scene Motion Blur columns of the remap table'''
+
+    def __init__(self, name, shutter=(), samples=()):
+        self.name = name                                        # scene name
+        self.shutter = np.asarray(shutter, dtype=np.float64)    # MB shutter
+        self.samples = np.asarray(samples, dtype=np.int32)      # MB samples
+
+class TTR_Prefix():
+    '''
+    Speed mode accumulated state before each timeline frame iteration
+    and full (not cropped) frames and Motion Blur lists computed from it.
+    Lets recompute only the part after the first edited keyframe
+    '''
+
+    def __init__(self, base, keys, current, actual, remapped, mb):
+        self.base = base            # hash of inputs other than speed keys
+        self.keys = keys            # speed FCurve keyframes info list
+        self.current = np.asarray(current, dtype=np.float64) # frame positions
+        self.actual = np.asarray(actual, dtype=np.float64)   # actual frames
+        self.remapped = np.asarray(remapped, dtype=np.float64) # ranges
+        self.mb = mb                # {scene: (shutter list, samples list)}
+
+    def __len__(self):
+        '''Number of frames. State arrays have one more final item'''
+        return len(self.current)-1
+
+    def resume_index(self, keys, frame_start, frame_range):
+        '''
+        Index of the first iteration that depends on changed keyframes
+        or exceeds the new frame range. Keyframes are (co, handles...)
+        '''
+        index = len(self)
+        if keys != self.keys:
+            old, new = self.keys or [], keys or []
+            first = next((n for n, (a, b) in enumerate(zip(old, new))
+                          if a != b), min(len(old), len(new)))
+            if first == 0:
+                return 0
+            # ---- the segment from the previous keyframe is the first changed
+            frame = new[first-1][0][0]
+            index = min(index, max(0, int(np.floor(frame-frame_start))),
+                int(np.searchsorted(self.actual+0.011, frame, side='left')))
+        limit = int(np.searchsorted(self.remapped, frame_range+0.01,
+                                                                side='right'))
+        return min(index, limit)
+
+class TTR_ReverseIndex():
+    '''
+    Output indices by source subframe: subframes sorted once, each query is
+    a binary search plus the matches (O(log N + k)). In ping-pong or looping
+    Frames mode one source frame is shown by several output frames
+    '''
+
+    def __init__(self, frames):
+        frames = np.asarray(frames, dtype=np.float64)
+        self.order = np.argsort(frames, kind='stable')  # indices by subframe
+        self.keys = frames[self.order]                  # sorted subframes
+
+    def __len__(self):
+        return len(self.keys)
+
+    def range(self, low, high):
+        '''Output indices with low <= subframe < high, ascending'''
+        first = np.searchsorted(self.keys, low, side='left')
+        last = np.searchsorted(self.keys, high, side='left')
+        return np.sort(self.order[first:last])
+
+    def outputs(self, frame, radius=0.5):
+        '''Output indices showing the source frame (subframes within radius)'''
+        return self.range(frame-radius, frame+radius)
+
+    def step(self, index, frame, radius=0.5, forward=True):
+        '''
+        Next (previous) output index after the index showing the same source
+        frame, wrapping around. None if there are no matches
+        '''
+        matches = self.outputs(frame, radius)
+        if not len(matches):
+            return None
+        if forward:
+            n = np.searchsorted(matches, index, side='right')
+            return int(matches[n % len(matches)])
+        n = np.searchsorted(matches, index, side='left')-1
+        return int(matches[n])
+
+class TTR_Table():
+    '''
+    Computed remap table: subframe for each output index and
+    Motion Blur shutter/samples for each output index in each scene
+    '''
+
+    def __init__(self, frames=(), scenes=(), skip_start=0, fingerprint=""):
+        self.frames = np.asarray(frames, dtype=np.float64)  # source subframes
+        self.scenes = list(scenes)          # TTR_TableScene list
+        self.skip_start = skip_start        # output numbering offset
+        self.fingerprint = fingerprint      # remap inputs hash
+        self.shared = None  # shared memory/mmap the arrays are views into
+
+    def __len__(self):
+        return len(self.frames)
+
+    def scene(self, name):
+        '''Get TTR_TableScene by scene name'''
+        for sc in self.scenes:
+            if sc.name == name:
+                return sc
+        return None
+
+    def outputs(self):
+        '''Output frame numbers as used in render file names'''
+        return np.arange(len(self.frames)) + self.skip_start + 1
+
+    def check(self, length, skip_start, mb_scenes):
+        '''
+        Raise TableError unless the table has `length` frames numbered from
+        `skip_start` and full Motion Blur columns of the scenes names
+        '''
+        if len(self.frames) != length or self.skip_start != skip_start:
+            raise TableError(f"{len(self.frames)} frames from"
+                f" {self.skip_start} instead of {length} from {skip_start}")
+        for name in mb_scenes:
+            sc = self.scene(name)
+            if (not sc or len(sc.shutter) != length
+                       or len(sc.samples) != length):
+                raise TableError(f'No Motion Blur columns of "{name}" scene')
+    
+    def reverse(self):
+        '''Reverse index from source subframes to output indices'''
+        return TTR_ReverseIndex(self.frames)
+
+    def _mb_scenes(self):
+        return [sc for sc in self.scenes if len(sc.shutter) == len(self.frames)
+                                                        and len(self.frames)]
+
+    def _meta(self):
+        return {
+            "version" : TTR_VERSION,
+            "fingerprint" : self.fingerprint,
+            "skip_start" : self.skip_start,
+            "length" : len(self.frames),
+            "scenes" : [sc.name for sc in self.scenes],
+        }
+
+    def rows(self):
+        '''Yield (index, output, frame, {scene: (shutter, samples)})'''
+        mb_scenes = self._mb_scenes()
+        for n, (out, frame) in enumerate(zip(self.outputs(), self.frames)):
+            yield (n, int(out), float(frame),
+                {sc.name : (float(sc.shutter[n]), int(sc.samples[n]))
+                 for sc in mb_scenes})
+
+    #--------------------------------- binary ----------------------------------
+
+    def to_bytes(self):
+        '''
+        Versioned binary layout: header, JSON meta, raw arrays.
+        Meta is padded with spaces so the frames array is 8 bytes aligned
+        '''
+        meta = json.dumps({
+            "fingerprint" : self.fingerprint,
+            "skip_start" : self.skip_start,
+            "length" : len(self.frames),
+            "scenes" : [[sc.name, len(sc.shutter)] for sc in self.scenes],
+        }).encode()
+        meta += b' '*(-(struct.calcsize(TTR_HEADER)+len(meta)) % 8)
+        data = [struct.pack(TTR_HEADER, TTR_MAGIC, TTR_VERSION, len(meta)),
+                meta, self.frames.astype('<f8').tobytes()]
+        for sc in self.scenes:
+            data.append(sc.shutter.astype('<f8').tobytes())
+            data.append(sc.samples.astype('<i4').tobytes())
+        return b''.join(data)
+
+    @classmethod
+    def from_bytes(cls, data, copy=True):
+        '''
+        Table from `to_bytes` data. If not `copy`, arrays are read-only
+        views into the data (shared memory), which must outlive the table
+        '''
+        data = memoryview(data)
+        size = struct.calcsize(TTR_HEADER)
+        if len(data) < size:
+            raise TableError("Remap table data is too short")
+        magic, version, meta_len = struct.unpack_from(TTR_HEADER, data)
+        if magic != TTR_MAGIC:
+            raise TableError("Not a True Time Remapping table")
+        if version > TTR_VERSION:
+            raise TableError(f"Unsupported remap table version {version}")
+        meta = json.loads(bytes(data[size:size+meta_len]).decode())
+        offset = size+meta_len
+        def read(dtype, count):
+            nonlocal offset
+            arr = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+            offset += arr.nbytes
+            if copy:
+                return arr.astype(dtype[1:])
+            arr.flags.writeable = False
+            return arr
+        frames = read('<f8', meta["length"])
+        scenes = []
+        for name, count in meta["scenes"]:
+            shutter = read('<f8', count)
+            samples = read('<i4', count)
+            scenes.append(TTR_TableScene(name, shutter, samples))
+        return cls(frames, scenes, meta["skip_start"], meta["fingerprint"])
+
+    #------------------------------ export/import ------------------------------
+
+    def save(self, filepath):
+        '''Save table to .csv, .json or .npz file chosen by extension'''
+        ext = os.path.splitext(filepath)[1].lower()
+        if ext == '.csv':
+            self._save_csv(filepath)
+        elif ext == '.json':
+            self._save_json(filepath)
+        elif ext == '.npz':
+            self._save_npz(filepath)
+        else:
+            raise TableError(f"Unsupported remap table file format {ext}")
+
+    @classmethod
+    def load(cls, filepath):
+        '''Load table from .csv, .json or .npz file'''
+        ext = os.path.splitext(filepath)[1].lower()
+        if ext == '.csv':
+            return cls._load_csv(filepath)
+        elif ext == '.json':
+            return cls._load_json(filepath)
+        elif ext == '.npz':
+            return cls._load_npz(filepath)
+        raise TableError(f"Unsupported remap table file format {ext}")
+
+    @classmethod
+    def _from_meta(cls, meta, frames, mb):
+        if meta.get("version", 0) > TTR_VERSION:
+            raise TableError(
+                f"Unsupported remap table version {meta['version']}")
+        scenes = [TTR_TableScene(name, *mb.get(name, ((), ())))
+                  for name in meta["scenes"]]
+        return cls(frames, scenes, meta["skip_start"], meta["fingerprint"])
+
+    def _save_csv(self, filepath):
+        '''First line is "#" + JSON meta, then one row per output frame'''
+        mb_scenes = self._mb_scenes()
+        with open(filepath, 'w', newline='') as f:
+            f.write('#' + json.dumps(self._meta()) + '\n')
+            writer = csv.writer(f)
+            header = ['index', 'output', 'frame']
+            for sc in mb_scenes:
+                header += [f'{sc.name}:shutter', f'{sc.name}:samples']
+            writer.writerow(header)
+            for n, out, frame, mb in self.rows():
+                row = [n, out, repr(frame)]
+                for sc in mb_scenes:
+                    row += [repr(mb[sc.name][0]), mb[sc.name][1]]
+                writer.writerow(row)
+
+    @classmethod
+    def _load_csv(cls, filepath):
+        with open(filepath, newline='') as f:
+            line = f.readline()
+            if not line.startswith('#'):
+                raise TableError("No remap table info in the CSV file")
+            meta = json.loads(line[1:])
+            reader = csv.reader(f)
+            header = next(reader)
+            cols = list(zip(*reader)) or [()]*len(header)
+        frames = np.array(cols[header.index('frame')], dtype=np.float64)
+        mb = {}
+        for name in meta["scenes"]:
+            if f'{name}:shutter' in header:
+                mb[name] = (
+                    np.array(cols[header.index(f'{name}:shutter')], dtype=float),
+                    np.array(cols[header.index(f'{name}:samples')], dtype=int))
+        return cls._from_meta(meta, frames, mb)
+
+    def _save_json(self, filepath):
+        '''One output frame per line to be readable and line-streamable'''
+        meta = self._meta()
+        with open(filepath, 'w') as f:
+            f.write('{\n')
+            for key, value in meta.items():
+                f.write(f'"{key}": {json.dumps(value)},\n')
+            f.write('"frames": [')
+            for n, out, frame, mb in self.rows():
+                item = {"index" : n, "output" : out, "frame" : frame}
+                if mb:
+                    item["mb"] = {name : {"shutter" : shutter,
+                                          "samples" : samples}
+                                  for name, (shutter, samples) in mb.items()}
+                f.write((',\n' if n else '\n') + json.dumps(item))
+            f.write('\n]\n}\n')
+
+    @classmethod
+    def _load_json(cls, filepath):
+        with open(filepath) as f:
+            meta = json.load(f)
+        items = meta.pop("frames")
+        frames = [item["frame"] for item in items]
+        mb = {}
+        for name in meta["scenes"]:
+            if items and name in items[0].get("mb", {}):
+                mb[name] = ([item["mb"][name]["shutter"] for item in items],
+                            [item["mb"][name]["samples"] for item in items])
+        return cls._from_meta(meta, frames, mb)
+
+    def _save_npz(self, filepath):
+        arrays = {
+            "meta" : np.array(json.dumps(self._meta())),
+            "output" : self.outputs(),
+            "frame" : self.frames,
+        }
+        for n, sc in enumerate(self._mb_scenes()):
+            arrays[f"shutter_{n}"] = sc.shutter
+            arrays[f"samples_{n}"] = sc.samples
+            arrays[f"scene_{n}"] = np.array(sc.name)
+        with open(filepath, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+
+    @classmethod
+    def _load_npz(cls, filepath):
+        with np.load(filepath) as data:
+            meta = json.loads(str(data["meta"]))
+            mb = {}
+            n = 0
+            while f"scene_{n}" in data:
+                mb[str(data[f"scene_{n}"])] = (data[f"shutter_{n}"],
+                                               data[f"samples_{n}"])
+                n += 1
+            return cls._from_meta(meta, data["frame"], mb)
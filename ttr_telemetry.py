@@ -0,0 +1,117 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+#  TRUE TIME REMAPPING
+#  Render telemetry. Doesn't depend on bpy
+#  (c) 2020 Andrey Sokolov (so_records)
+
+import time
+
+# render statistics text showing that scene sync is over and sampling started
+TTR_RENDER_STATS = ('Sample', 'Path Tracing', 'Rendered', 'Denoising')
+
+class TTR_FrameTime():
+    '''Timings of one remapped frame render'''
+
+    def __init__(self, index, frame, start):
+        self.index = index      # output index
+        self.frame = frame      # rendered subframe
+        self.start = start      # render_pre time
+        self.sampling = None    # time of the first sampling statistics
+        self.end = None         # render_complete time
+
+    @property
+    def sync(self):
+        '''Seconds spent on scene export/BVH before sampling'''
+        return ((self.sampling or self.end)-self.start) if self.end else 0.0
+
+    @property
+    def render(self):
+        '''Seconds spent on sampling'''
+        return (self.end-self.sampling) if self.end and self.sampling else 0.0
+
+class TTR_Telemetry():
+    '''Per remapped frame sync vs render timings of a TTR render'''
+
+    def __init__(self):
+        self.frames = []            # TTR_FrameTime list
+        self.persistent = False     # render used Persistent Data
+        self.writes = 0             # scene state values written
+        self.skipped = 0            # unchanged scene state values not written
+
+    def reset(self, persistent=False):
+        self.frames = []
+        self.persistent = persistent
+        self.writes = 0
+        self.skipped = 0
+
+    #------------------------------ render events ------------------------------
+
+    def frame_start(self, index, frame):
+        self.frames.append(TTR_FrameTime(index, frame, time.perf_counter()))
+
+    def stats(self, text):
+        '''render_stats: the first sampling statistics ends the scene sync'''
+        if (self.frames and self.frames[-1].sampling is None
+                and any(mark in text for mark in TTR_RENDER_STATS)):
+            self.frames[-1].sampling = time.perf_counter()
+
+    def frame_end(self):
+        '''Returns finished TTR_FrameTime or None'''
+        if not self.frames or self.frames[-1].end is not None:
+            return None
+        self.frames[-1].end = time.perf_counter()
+        return self.frames[-1]
+
+    def write(self, changed):
+        '''Scene state value written, or skipped as unchanged'''
+        if changed:
+            self.writes += 1
+        else:
+            self.skipped += 1
+
+    #--------------------------------- report ----------------------------------
+
+    def summary(self):
+        done = [fr for fr in self.frames if fr.end is not None]
+        sync = sum(fr.sync for fr in done)
+        render = sum(fr.render for fr in done)
+        return {
+            "persistent" : self.persistent,
+            "frames" : len(done),
+            "sync" : sync,
+            "render" : render,
+            "sync_mean" : sync/len(done) if done else 0.0,
+            "render_mean" : render/len(done) if done else 0.0,
+            "writes" : self.writes,
+            "skipped" : self.skipped,
+        }
+
+    def report(self):
+        s = self.summary()
+        if not s["frames"]:
+            return ""
+        total = s["sync"]+s["render"]
+        return (f'Sync {s["sync"]:.2f}s ({s["sync_mean"]:.2f}s/frame,'
+                f' {100*s["sync"]/total if total else 0:.0f}%),'
+                f' Render {s["render"]:.2f}s ({s["render_mean"]:.2f}s/frame)'
+                f'{", Persistent Data" if s["persistent"] else ""}'
+                + (f', {s["skipped"]} of {s["writes"]+s["skipped"]} unchanged'
+                   f' scene state writes skipped' if s["skipped"] else ''))
+
+ttr_telemetry = TTR_Telemetry()
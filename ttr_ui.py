@@ -23,6 +23,7 @@
 import bpy, bpy.utils.previews, rna_keymap_ui, os
 from bpy.props import (
     BoolProperty,
+    CollectionProperty,
     EnumProperty,
     FloatProperty,
     IntProperty,
@@ -75,6 +76,7 @@ def ttr_keyconfig():
         return
     new = km.keymap_items.new
     kmi = new("ttr.update", 'U', 'PRESS', ctrl=True)
+    kmi.properties.deferred = True
     kmi.active = True
     ttr_keymaps.append((km, kmi))
     kmi = new("ttr.show", 'S', 'PRESS', ctrl=True, alt=True)
@@ -146,7 +148,7 @@ def ttr_activate(self, context):
         ttr_menu_extend()
         ttr_keyconfig()
         ttr_enabled = True
-    bpy.ops.ttr.update()
+    bpy.ops.ttr.update(deferred=True)
     print("TTR. Activated.")
     while ttr_activate in bpy.app.handlers.load_post:
         bpy.app.handlers.load_post.remove(ttr_activate)
@@ -154,6 +156,60 @@ def ttr_activate(self, context):
 
 #--------------------------------- Blender UI ----------------------------------
     
+class TTR_RenderProfile(bpy.types.PropertyGroup):
+    '''Reduced render settings for drafts and dailies'''
+    
+    name : StringProperty(
+        name="Name",
+        default="Dailies"
+    )
+    resolution : IntProperty(
+        name="Resolution %",
+        description="Resolution scale of all the rendered scenes",
+        default=50,
+        min=1,
+        max=100,
+        subtype='PERCENTAGE'
+    )
+    samples : IntProperty(
+        name="Samples",
+        description="Cycles or Eevee render samples. 0 keeps the scenes\
+ samples",
+        default=16,
+        min=0
+    )
+    mb_samples : IntProperty(
+        name="Max MB Samples",
+        description="Cap of time remapped Motion Blur samples.\
+ 0 keeps them",
+        default=4,
+        min=0
+    )
+    simplify : BoolProperty(
+        name="Simplify",
+        description="Render with simplified subdivision and child particles",
+        default=False
+    )
+    simplify_subdivision : IntProperty(
+        name="Max Subdivision",
+        default=1,
+        min=0,
+        max=6
+    )
+    simplify_particles : FloatProperty(
+        name="Child Particles",
+        default=0.2,
+        min=0.0,
+        max=1.0,
+        subtype='FACTOR'
+    )
+    suffix : StringProperty(
+        name="Output Suffix",
+        description="Appended to the output path before frame numbers,\
+ so profile renders don't overwrite the final ones",
+        default="_dailies"
+    )
+
 class TTR_Props(bpy.types.PropertyGroup):
     '''Properties Group for UI Panel'''
     
@@ -195,6 +251,98 @@ class TTR_Props(bpy.types.PropertyGroup):
         step = 1,
         update=ttr_setup_prop
     )
+    integration : EnumProperty(
+        name = "Integration",
+        description = "How the Speed curve is turned into frames positions",
+        items = [
+            ("SAMPLE", "Frame Samples",
+                "Speed is taken once per timeline frame"),
+            ("ADAPTIVE", "Adaptive",
+                "Speed is integrated over each timeline frame with sub-frame\
+ sampling where it changes quickly. Accurate for fast speed ramps"),
+        ],
+        default="SAMPLE",
+        options={"HIDDEN"},
+        update=ttr_setup_prop
+    )
+    tolerance : FloatProperty(
+        name="Tolerance",
+        description="Max integration error per timeline frame (in frames)",
+        default=1e-6,
+        min=1e-12,
+        max=.1,
+        precision=8,
+        options={"HIDDEN"},
+        update=ttr_setup_prop
+    )
+    budget : EnumProperty(
+        name = "MB Samples",
+        description = "How Motion Blur samples are set for remapped frames.\
+ Applies to EEVEE and True Motion Blur add-on",
+        items = [
+            ("NONE", "Linear",
+                "Samples are scaled by speed together with the shutter"),
+            ("SAMPLES", "Sample Budget",
+                "Total samples of the remapped frames are distributed\
+ according to speed within Min and Max samples per frame"),
+            ("TIME", "Time Budget",
+                "Samples are distributed to fit the target time per frame.\
+ Needs Time per Sample (Estimate Render Cost fills it)"),
+        ],
+        default="NONE",
+        options={"HIDDEN"},
+        update=ttr_setup_prop
+    )
+    budget_samples : IntProperty(
+        name="Sample Budget",
+        description="Total Motion Blur samples of all the remapped frames,\
+ shared by all the scenes with Motion Blur",
+        default=1000,
+        min=1,
+        options={"HIDDEN"},
+        update=ttr_setup_prop
+    )
+    budget_time : FloatProperty(
+        name="Target Time",
+        description="Seconds of Motion Blur sampling per remapped frame\
+ of all the scenes together",
+        default=10.0,
+        min=0,
+        options={"HIDDEN"},
+        update=ttr_setup_prop
+    )
+    sample_time : FloatProperty(
+        name="Time per Sample",
+        description="Seconds one Motion Blur sample takes at full resolution.\
+ Estimate Render Cost with calibration frames fills it",
+        default=0.0,
+        min=0,
+        precision=4,
+        options={"HIDDEN"},
+        update=ttr_setup_prop
+    )
+    samples_min : IntProperty(
+        name="Min",
+        description="Min Motion Blur samples per remapped frame",
+        default=1,
+        min=1,
+        options={"HIDDEN"},
+        update=ttr_setup_prop
+    )
+    samples_max : IntProperty(
+        name="Max",
+        description="Max Motion Blur samples per remapped frame",
+        default=64,
+        min=1,
+        options={"HIDDEN"},
+        update=ttr_setup_prop
+    )
+    mb_samples : IntProperty(
+        name="MB Samples",
+        description="Total Motion Blur samples of the remapped frames",
+        default=0,
+        options={"HIDDEN"}
+    )
     frames : IntProperty(
         name="Total",
         description="Total number of frames to be rendered",
@@ -220,6 +368,15 @@ For Playback, Render and Viewport Render",
         options={"HIDDEN"},
         update=ttr_setup_prop
     )
+    sparse : BoolProperty(
+        name="Compute on Demand",
+        description="Don't store the whole time remapped frames list.\n\
+Compute each frame when it is needed from the keyframes segments.\n\
+For huge frame ranges",
+        default=False,
+        options={"HIDDEN"},
+        update=ttr_setup_prop
+    )
     actual : FloatProperty(
         name="Frame",
         description="Hidden property to take the actual frame from",
@@ -263,6 +420,158 @@ For Playback, Render and Viewport Render",
         max=1.0,
         subtype="FACTOR",
     )
+    order : EnumProperty(
+        name = "Render Order",
+        description = "Order to render time remapped frames in.\
+ Files are always named by their output frame numbers",
+        items = [
+            ("OUTPUT", "Output",
+                "Render frames from the first to the last output frame"),
+            ("SOURCE", "Source Time",
+                "Render frames sorted by their actual (source) frame.\
+ Simulation caches and Persistent Data never go backwards"),
+            ("MINIMAL", "Minimal Jumps",
+                "Sweep source time from the current frame to the nearer end\
+ of the remapped range, then to the other one"),
+            ("PROGRESSIVE", "Progressive",
+                "Render every 16th frame first, then every 8th and so on,\
+ to review the full length early. Done frames are listed in\
+ ttr_progress.json next to the output files"),
+        ],
+        default="OUTPUT",
+        options={"HIDDEN"}
+    )
+    persistent : BoolProperty(
+        name="Persistent Data",
+        description="Keep Cycles render data between time remapped frames\
+ instead of exporting the scene and building BVH for each of them.\
+ Uses more memory. Your Persistent Data setting is restored after render",
+        default=False,
+        options={"HIDDEN"}
+    )
+    sim_bake : BoolProperty(
+        name="Pre-bake Simulations",
+        description="Bake unbaked cloth, soft body, rigid body, dynamic paint\
+ and particles caches once before rendering if remapped frames go backward\
+ or jump, instead of re-simulating them at such frames. Every whole frame is\
+ cached, subframes between them are interpolated. Caches stay baked",
+        default=False,
+        options={"HIDDEN"}
+    )
+    interpolate : BoolProperty(
+        name="Interpolate Slow Motion",
+        description="Render only every Nth output frame of slow motion\
+ sections with the Vector pass and make frames between them by motion\
+ vectors warping. Frames with high warp error are rendered",
+        default=False,
+        options={"HIDDEN"}
+    )
+    interp_stride : IntProperty(
+        name="Render Every",
+        description="Render every Nth output frame within one source frame,\
+ interpolate the others",
+        default=4,
+        min=2,
+        max=16,
+        options={"HIDDEN"}
+    )
+    interp_error : FloatProperty(
+        name="Max Error",
+        description="Max mean color difference of the two warped key frames\
+ in any 16x16 pixels tile. Interpolated frames above it are rendered",
+        default=0.02,
+        min=0,
+        max=1,
+        precision=3,
+        options={"HIDDEN"}
+    )
+    cache : BoolProperty(
+        name="Render Cache",
+        description="Keep rendered frames by their actual (source) subframe\
+ and Motion Blur settings. After Time Remapping changes only frames missing\
+ in the cache are rendered, others are copied into place.\
+ Not used with File Output nodes",
+        default=False,
+        options={"HIDDEN"}
+    )
+    cache_dir : StringProperty(
+        name="Cache Folder",
+        description="Folder to keep cached frames in",
+        default="//ttr_cache/",
+        subtype='DIR_PATH',
+        options={"HIDDEN"}
+    )
+    cache_steps : IntProperty(
+        name="Subframe Steps",
+        description="Subframes closer than 1/Steps of a frame reuse the same\
+ render. 0 to reuse only equal subframes",
+        default=0,
+        min=0,
+        max=1000,
+        options={"HIDDEN"}
+    )
+    cache_size : IntProperty(
+        name="Cache Size, MB",
+        description="Least recently used frames are removed above this size",
+        default=4096,
+        min=1,
+        options={"HIDDEN"}
+    )
+    thumbs : BoolProperty(
+        name="Scrub Thumbnails",
+        description="In Show mode keep low resolution viewport snapshots of\
+ visited and nearby frames. While scrolling they are shown instantly,\
+ the frame is evaluated when scrolling stops",
+        default=False,
+        options={"HIDDEN"}
+    )
+    thumbs_width : IntProperty(
+        name="Thumbnail Width",
+        description="Width of viewport snapshots in pixels",
+        default=480,
+        min=64,
+        max=4096,
+        options={"HIDDEN"}
+    )
+    thumbs_size : IntProperty(
+        name="Thumbnails Memory, MB",
+        description="Least recently used thumbnails are freed above it",
+        default=128,
+        min=1,
+        options={"HIDDEN"}
+    )
+    profile : BoolProperty(
+        name="Playback Simplify",
+        description="While Show and Play simplify subdivision and child\
+ particles (and hide the Heavy Collection) as much as needed to keep up\
+ with the scene frame rate. Settings are restored on exit",
+        default=False,
+        options={"HIDDEN"}
+    )
+    profile_collection : PointerProperty(
+        name="Heavy Collection",
+        description="Collection hidden in the viewport at the last\
+ Playback Simplify level",
+        type=bpy.types.Collection,
+        options={"HIDDEN"}
+    )
+    use_render_profile : BoolProperty(
+        name="Render Profile",
+        description="Render the whole time remapped sequence with the active\
+ render profile, e.g. at half resolution and low samples for dailies.\
+ Render settings are restored after render",
+        default=False,
+        options={"HIDDEN"}
+    )
+    render_profiles : CollectionProperty(
+        type=TTR_RenderProfile,
+        options={"HIDDEN"}
+    )
+    render_profile_index : IntProperty(
+        name="Active Render Profile",
+        default=0,
+        options={"HIDDEN"}
+    )
     preview : BoolProperty(
         name="Show in Viewport",
         description="While Viewport Render open Viewport to see results",
@@ -301,28 +610,69 @@ class TTR_PT_panel(bpy.types.Panel):
         col = layout.column()
         col.enabled = True if context.scene.ttr.type == 'SPEED' else False
         col.prop(props, "speed")
+        col.prop(props, "integration")
+        sub = col.column()
+        sub.enabled = props.integration == 'ADAPTIVE'
+        sub.prop(props, "tolerance")
         col = layout.column()
         col.enabled = True if context.scene.ttr.type == 'FRAMES' else False
         col.prop(props, "frame")
         col = layout.column()
         col.prop(props, "mb")
+        col.prop(props, "budget")
+        if props.budget != 'NONE':
+            sub = col.column(align=True)
+            if props.budget == 'SAMPLES':
+                sub.prop(props, "budget_samples")
+            else:
+                sub.prop(props, "budget_time")
+                sub.prop(props, "sample_time")
+            row = sub.row(align=True)
+            row.prop(props, "samples_min")
+            row.prop(props, "samples_max")
+        if props.mb_samples:
+            cost = (f", ~{props.mb_samples*props.sample_time:.0f}s"
+                    if props.sample_time else "")
+            col.label(text=f"MB Samples: {props.mb_samples}{cost}")
         col = layout.column()
         col.use_property_split = False
         tab = col.split(factor=.1)
-        tab.operator("ttr.update", text = "", icon = "FILE_REFRESH")
-        tab.prop(props, "frames", text="Total")
-        tab.prop(props, "actual_frame")
-        tab.prop(props, "actual_number", text="Number")
+        tab.operator("ttr.update", text = "", icon = "FILE_REFRESH"
+                                                            ).deferred = True
+        setup_op = getattr(bpy.types, "TTR_OT_setup", None)
+        if setup_op and setup_op.job:
+            tab.label(text=f"Computing frames: {setup_op.progress:.0%}",
+                                                            icon = "SORTTIME")
+        else:
+            tab.prop(props, "frames", text="Total")
+            tab.prop(props, "actual_frame")
+            tab.prop(props, "actual_number", text="Number")
+            row = col.row(align=True)
+            _prev = row.operator("ttr.jump", text="Previous Same Frame",
+                                                        icon = "TRIA_LEFT")
+            _prev.backward = True
+            _next = row.operator("ttr.jump", text="Next Same Frame",
+                                                        icon = "TRIA_RIGHT")
+            _next.backward = False
         col = layout.column()
         col.use_property_split = False
         tab = col.split()
         tab.prop(props, "skip_start")
         tab.prop(props, "skip_end")
+        col.prop(props, "sparse")
         col.use_property_split = True
         col.separator()
         col.operator("ttr.show", text = "Show Time Remapped Frame",
                         icon_value = ttr_icons['ttr_show_icon'].icon_id)
+        col.prop(props, "thumbs")
+        if props.thumbs:
+            row = col.row(align=True)
+            row.prop(props, "thumbs_width", text="Width")
+            row.prop(props, "thumbs_size", text="MB")
         col.operator("ttr.play", text="Play Time Remapped Animation", icon = "PLAY")
+        col.prop(props, "profile")
+        if props.profile:
+            col.prop(props, "profile_collection")
         col.separator()
         _still = col.operator("ttr.render", text="Render Time Remapped Frame",
                                                     icon = "RENDER_STILL")
@@ -331,7 +681,42 @@ class TTR_PT_panel(bpy.types.Panel):
         _anim = col.operator("ttr.render", text="Render Time Remapped Animation",
                                                     icon = "RENDER_ANIMATION")
         _anim.animation = True
-        
+        col.prop(props, "order")
+        col.prop(props, "use_render_profile")
+        if props.use_render_profile:
+            row = col.row()
+            row.template_list("UI_UL_list", "ttr_render_profiles", props,
+                "render_profiles", props, "render_profile_index", rows=2)
+            sub = row.column(align=True)
+            sub.operator("ttr.render_profile_add", text="", icon = "ADD")
+            sub.operator("ttr.render_profile_remove", text="", icon = "REMOVE")
+            if 0 <= props.render_profile_index < len(props.render_profiles):
+                profile = props.render_profiles[props.render_profile_index]
+                sub = col.column(align=True)
+                sub.prop(profile, "resolution")
+                sub.prop(profile, "samples")
+                sub.prop(profile, "mb_samples")
+                sub.prop(profile, "simplify")
+                if profile.simplify:
+                    sub.prop(profile, "simplify_subdivision")
+                    sub.prop(profile, "simplify_particles")
+                sub.prop(profile, "suffix")
+        col.prop(props, "persistent")
+        tab = col.split(factor=.7)
+        tab.prop(props, "sim_bake")
+        tab.operator("ttr.sim_bake", text="Bake Now", icon = "PHYSICS")
+        col.prop(props, "interpolate")
+        if props.interpolate:
+            row = col.row(align=True)
+            row.prop(props, "interp_stride")
+            row.prop(props, "interp_error")
+        col.prop(props, "cache")
+        if props.cache:
+            sub = col.column(align=True)
+            sub.prop(props, "cache_dir")
+            sub.prop(props, "cache_steps")
+            sub.prop(props, "cache_size")
+            sub.operator("ttr.cache_clear", icon = "TRASH")
         col.separator()
         _vstill = col.operator("ttr.opengl",
             text="Viewport Render Time Remapped Frame", icon = "RENDER_STILL")
@@ -340,6 +725,20 @@ class TTR_PT_panel(bpy.types.Panel):
             text="Viewport Render Time Remapped Animation", icon = "RENDER_ANIMATION")
         _vanim.animation = True
         col.prop(props, "preview")
+        col.separator()
+        tab = col.split()
+        tab.operator("ttr.table_export", icon = "EXPORT")
+        tab.operator("ttr.table_import", icon = "IMPORT")
+        col.operator("ttr.farm_manifest", icon = "NETWORK_DRIVE")
+        tab = col.split()
+        tab.operator("ttr.bake", icon = "ACTION")
+        tab.operator("ttr.bake_restore", text="Restore", icon = "LOOP_BACK")
+        col.operator("ttr.estimate", icon = "TIME")
+        lines = bpy.types.TTR_OT_estimate.results.get(scene.name)
+        if lines:
+            box = col.box()
+            for line in lines:
+                box.label(text=line)
         
 #---------------------------------- Register -----------------------------------
 def ttr_uninstall():
@@ -356,6 +755,7 @@ def ttr_uninstall():
 #---------------------------------- Register -----------------------------------
 
 classes = [
+    TTR_RenderProfile,
     TTR_Props,
     TTR_Preferences,
     TTR_PT_panel,
@@ -391,6 +791,9 @@ def register():
     bpy.app.handlers.load_post.append(foo)
     bpy.app.handlers.persistent(ttr_activate)
     bpy.app.handlers.load_post.append(ttr_activate)
+    bpy.app.handlers.persistent(ttr_table_save)
+    if ttr_table_save not in bpy.app.handlers.save_pre:
+        bpy.app.handlers.save_pre.append(ttr_table_save)
     bpy.app.handlers.persistent(ttr_frame_info_update)
     if ttr_frame_info_update not in bpy.app.handlers.frame_change_pre:
         bpy.app.handlers.frame_change_pre.append(ttr_frame_info_update)
@@ -413,6 +816,8 @@ def unregister():
         bpy.app.handlers.load_post.remove(ttr_activate)
     while ttr_frame_info_update in bpy.app.handlers.frame_change_pre:
         bpy.app.handlers.frame_change_pre.remove(ttr_frame_info_update)
+    while ttr_table_save in bpy.app.handlers.save_pre:
+        bpy.app.handlers.save_pre.remove(ttr_table_save)
     while foo in bpy.app.handlers.load_post:
         bpy.app.handlers.load_post.remove(foo)
     ttr_enabled = False